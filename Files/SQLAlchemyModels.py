@@ -1,11 +1,12 @@
 from sqlalchemy import Double, Float, create_engine, Column, Integer, String, DateTime, Boolean, Text, Date, ForeignKey, Enum
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, validates
 from datetime import datetime, timezone, date
 import os
 from dotenv import load_dotenv
 
 from database import db
+from utils.contact_numbers import normalize_contact_number
 
 # Load environment variables
 load_dotenv()
@@ -50,6 +51,8 @@ class Employee(db.Model):
 
     dateOfBirth = db.Column(db.Date, nullable=True)
     contactNo = db.Column(db.String, nullable=True)
+    # contactNo as normalize_contact_number() digits, set whenever contactNo is; lookups use it
+    contact_no_normalized = db.Column(db.String(20), nullable=True)
     gender = db.Column(db.String, nullable=True)
 
     # 🔗 Office Location (instead of latitude/longitude directly)
@@ -116,6 +119,20 @@ class Employee(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
     attendance = relationship("Attendance", back_populates="employee")
+
+    __table_args__ = (
+        # Inbound WhatsApp messages resolve the employee by normalised contact number
+        db.Index("ix_employee_contact_no_normalized", "contact_no_normalized"),
+        # Mood statistics scope and count employees by group/company, excluding deleted ones
+        db.Index("ix_employee_group_deleted", "group_id", "is_deleted", postgresql_include=["id"]),
+        db.Index("ix_employee_company_deleted", "company_id", "is_deleted", postgresql_include=["id"]),
+    )
+
+    @validates("contactNo")
+    def _normalize_contact_no(self, key, contact_no):
+        self.contact_no_normalized = normalize_contact_number(contact_no)
+        return contact_no
+
     def __repr__(self):
         return f"<Employee(id={self.id}, name='{self.name}')>"
     
@@ -282,6 +299,10 @@ class LeadMessageHistory(db.Model):
     role = db.Column(db.String)
     content = db.Column(db.Text)
     timestamp = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (
+        db.Index("ix_messages_contact_number_timestamp", "contact_number", "timestamp"),
+    )
     
     def __repr__(self):
         return f"<LeadMessageHistory(id={self.id}, contact_number='{self.contact_number}', role='{self.role}', timestamp='{self.timestamp}')>"
@@ -319,6 +340,13 @@ class SessionState(db.Model):
     session_value = db.Column(db.String, nullable=True)  # Store as string, convert as needed
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (
+        # SqlSessionBackend upserts one row per (contact, key)
+        db.UniqueConstraint("contact_number", "session_key", name="uq_session_state_contact_key"),
+        # Expired rows are purged by updated_at
+        db.Index("ix_session_state_updated_at", "updated_at"),
+    )
     
     def __repr__(self):
         return f"<SessionState(contact_number='{self.contact_number}', key='{self.session_key}', value='{self.session_value}')>"
@@ -436,10 +464,82 @@ class MoodCheck(db.Model):
     comments = db.Column(db.Text, nullable=True)
     checked_at = db.Column(db.DateTime, default=datetime.utcnow)
     date = db.Column(db.Date, nullable=False, default=date.today)
+
+    __table_args__ = (
+        # Statistics join mood_checks to employee and filter by date; mood is included
+        # so the per-date/per-employee GROUP BYs can run as index-only scans
+        db.Index("ix_mood_checks_employee_date", "employee_id", "date", postgresql_include=["mood"]),
+        db.Index("ix_mood_checks_company_date", "company_id", "date"),
+    )
     
     def __repr__(self):
         return f"<MoodCheck(id={self.id}, employee_id={self.employee_id}, mood='{self.mood}')>"
 
+class MoodDailyRollup(db.Model):
+    """
+    Per-day mood counters for a company/group, kept in step with mood_checks.
+    company_id/group_id are the employee's current ones (group 0 = no group);
+    checks of soft-deleted employees are not counted.
+    """
+    __tablename__ = "mood_daily_rollups"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), nullable=False)
+    group_id = db.Column(db.Integer, nullable=False, default=0)
+    date = db.Column(db.Date, nullable=False)
+
+    mood_1_count = db.Column(db.Integer, nullable=False, default=0)  # Great
+    mood_2_count = db.Column(db.Integer, nullable=False, default=0)  # Good
+    mood_3_count = db.Column(db.Integer, nullable=False, default=0)  # Okay
+    mood_4_count = db.Column(db.Integer, nullable=False, default=0)  # Not so good
+    commented_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("company_id", "group_id", "date", name="uq_mood_daily_rollups_company_group_date"),
+    )
+
+    def __repr__(self):
+        return f"<MoodDailyRollup(company_id={self.company_id}, group_id={self.group_id}, date={self.date})>"
+
+class MoodEmployeeRollup(db.Model):
+    """
+    Per-employee mood counters for one calendar month (month = first day of the month).
+    """
+    __tablename__ = "mood_employee_rollups"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), nullable=False)
+    group_id = db.Column(db.Integer, nullable=False, default=0)
+    employee_id = db.Column(db.Integer, db.ForeignKey("employee.id"), nullable=False)
+    month = db.Column(db.Date, nullable=False)
+
+    mood_1_count = db.Column(db.Integer, nullable=False, default=0)  # Great
+    mood_2_count = db.Column(db.Integer, nullable=False, default=0)  # Good
+    mood_3_count = db.Column(db.Integer, nullable=False, default=0)  # Okay
+    mood_4_count = db.Column(db.Integer, nullable=False, default=0)  # Not so good
+    commented_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("company_id", "group_id", "employee_id", "month", name="uq_mood_employee_rollups_key"),
+    )
+
+    def __repr__(self):
+        return f"<MoodEmployeeRollup(employee_id={self.employee_id}, month={self.month})>"
+
+class MoodRollupState(db.Model):
+    """
+    Marks a company as rolled up. Rollups are complete from covered_from onwards
+    (NULL = all history) since the last rebuild.
+    """
+    __tablename__ = "mood_rollup_state"
+
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), primary_key=True)
+    covered_from = db.Column(db.Date, nullable=True)
+    rebuilt_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<MoodRollupState(company_id={self.company_id}, covered_from={self.covered_from})>"
+
 class ShiftTemplate(db.Model):
     """
     Company-scoped reusable shift templates with policy rules.
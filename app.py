@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 import os
 
 from database import db, init_db
+from commands import register_commands
 
 def create_app():
     app = Flask(__name__)
@@ -16,6 +17,14 @@ def create_app():
     # Initialize migrations
     migrate = Migrate(app, db)
     
+    # Keep mood rollups and the statistics cache in step with mood_checks writes
+    import services.employee_mood_rollup_service
+    import services.mood_statistics_cache
+    # Drop cached employee lookups when employee rows change
+    import services.employee_record_cache
+    
+    register_commands(app)
+    
     return app
     
 app = create_app()
@@ -0,0 +1,321 @@
+import click
+
+
+def register_commands(app):
+    """Register the module's maintenance commands on the Flask CLI (`flask <command>`)."""
+
+    @app.cli.command("rebuild-mood-rollups")
+    @click.option("--company-id", "company_ids", type=int, multiple=True, help="Company to rebuild (repeatable). Defaults to every company with mood checks.")
+    @click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Only rebuild months from this date onwards.")
+    def rebuild_mood_rollups(company_ids, since):
+        """Recompute the mood rollup tables from raw mood_checks rows."""
+        from proxies.employee_mood_proxy import EmployeeMoodProxy
+
+        result = EmployeeMoodProxy.rebuild_mood_rollups(
+            company_ids=list(company_ids) or None,
+            start_date=since.date() if since else None
+        )
+        click.echo(f"Rebuilt mood rollups for {result['companies']} companies: "
+                   f"{result['daily_rows']} daily rows, {result['employee_rows']} employee rows")
+
+    @app.cli.command("backfill-employee-contacts")
+    @click.option("--batch-size", type=int, default=1000, show_default=True, help="Employees updated per transaction.")
+    def backfill_employee_contacts(batch_size):
+        """Set contact_no_normalized on employees written without the ORM (safe to re-run)."""
+        from sqlalchemy import update
+        from database import db
+        from Files.SQLAlchemyModels import Employee
+        from services.employee_record_cache import employee_record_cache
+        from utils.contact_numbers import normalize_contact_number
+
+        session = db.session
+        scanned = updated = 0
+        last_id = 0
+        while True:
+            rows = session.query(Employee.id, Employee.contactNo, Employee.contact_no_normalized).filter(
+                Employee.id > last_id
+            ).order_by(Employee.id).limit(batch_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            scanned += len(rows)
+            changes = [
+                {"id": row.id, "contact_no_normalized": normalize_contact_number(row.contactNo)}
+                for row in rows if row.contact_no_normalized != normalize_contact_number(row.contactNo)
+            ]
+            if changes:
+                # Bulk UPDATE by primary key, one statement per batch
+                session.execute(update(Employee), changes)
+                updated += len(changes)
+            session.commit()
+        # Bulk updates skip the mapper events that invalidate cached lookups
+        if updated:
+            employee_record_cache.invalidate()
+        click.echo(f"Normalised contact numbers: {updated} of {scanned} employees updated")
+
+    @app.cli.command("explain-mood-queries")
+    @click.option("--company-id", type=int, default=1, show_default=True, help="Company used for the statistics queries.")
+    @click.option("--group-id", type=int, default=1, show_default=True, help="Group used for the statistics queries.")
+    @click.option("--contact-number", default="971500000000", show_default=True, help="Contact number used for the lookup queries.")
+    @click.option("--days", type=int, default=90, show_default=True, help="Date range of the statistics queries, ending today.")
+    @click.option("--no-seqscan", is_flag=True, help="Disable seq scans so small development databases show which indexes apply.")
+    def explain_mood_queries(company_id, group_id, contact_number, days, no_seqscan):
+        """EXPLAIN the mood-check hot queries and check they use their indexes."""
+        from datetime import date, timedelta
+        from sqlalchemy import func
+        from database import db
+        from Files.SQLAlchemyModels import Employee, MoodCheck, LeadMessageHistory
+        from services.employee_mood_service import EmployeeMoodService
+        from utils.contact_numbers import normalize_contact_number
+        from utils.query_plans import explain_query, plan_index_names, plan_node_types
+
+        session = db.session
+        start_date = date.today() - timedelta(days=days)
+        company_filters = EmployeeMoodService._employee_scope_filters([company_id], None)
+        group_filters = EmployeeMoodService._employee_scope_filters(None, group_id)
+
+        def grouped_by_date(filters):
+            return EmployeeMoodService._scoped_mood_query(session, filters, start_date).with_entities(
+                MoodCheck.date, MoodCheck.mood, func.count(MoodCheck.id)
+            ).group_by(MoodCheck.date, MoodCheck.mood)
+
+        checks = [
+            ("employee lookup by contact number",
+             session.query(Employee).filter(Employee.contact_no_normalized == normalize_contact_number(contact_number)),
+             "ix_employee_contact_no_normalized"),
+            ("statistics employee count (company)",
+             session.query(func.count(Employee.id)).filter(*company_filters),
+             "ix_employee_company_deleted"),
+            ("statistics employee count (group)",
+             session.query(func.count(Employee.id)).filter(*group_filters),
+             "ix_employee_group_deleted"),
+            ("statistics per-date counts (company)",
+             grouped_by_date(company_filters),
+             "ix_mood_checks_employee_date"),
+            ("statistics per-date counts (group)",
+             grouped_by_date(group_filters),
+             "ix_mood_checks_employee_date"),
+            ("message history by contact number",
+             session.query(LeadMessageHistory).filter_by(contact_number=contact_number).order_by(LeadMessageHistory.timestamp.asc()),
+             "ix_messages_contact_number_timestamp"),
+        ]
+
+        failures = 0
+        for name, query, expected_index in checks:
+            plan = explain_query(session, query, disable_seqscan=no_seqscan)
+            used = plan_index_names(plan)
+            ok = expected_index in used
+            failures += 0 if ok else 1
+            click.echo(f"[{'PASS' if ok else 'FAIL'}] {name}: expects {expected_index}")
+            click.echo(f"       indexes used: {', '.join(sorted(used)) or 'none'}")
+            click.echo(f"       plan: {' > '.join(plan_node_types(plan))}")
+
+        if failures:
+            raise SystemExit(1)
+
+    @app.cli.command("benchmark-mood-statistics")
+    @click.option("--company-id", "company_ids", type=int, multiple=True, help="Company to benchmark (repeatable).")
+    @click.option("--group-id", type=int, default=None, help="Group to benchmark instead of companies.")
+    @click.option("--days", type=int, default=365, show_default=True, help="Date range of the statistics, ending today.")
+    @click.option("--sections", default="summary,mood_distribution", show_default=True, help="Comma-separated sections compared against the full payload.")
+    @click.option("--repeat", type=int, default=20, show_default=True, help="Timed runs per variant.")
+    def benchmark_mood_statistics(company_ids, group_id, days, sections, repeat):
+        """Time the full statistics payload against a subset of its sections."""
+        import statistics
+        import time
+        from datetime import date, timedelta
+        from database import db
+        from services.employee_mood_service import EmployeeMoodService
+
+        company_ids = list(company_ids) or ([1] if group_id is None else None)
+        start_date = date.today() - timedelta(days=days)
+        variants = [("full payload", None), (f"sections={sections}", [name.strip() for name in sections.split(",") if name.strip()])]
+
+        timings = {}
+        for label, requested in variants:
+            # Warm-up run so connection setup is not timed
+            EmployeeMoodService.get_mood_check_statistics(db.session, company_ids, group_id, start_date, sections=requested)
+            runs = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                EmployeeMoodService.get_mood_check_statistics(db.session, company_ids, group_id, start_date, sections=requested)
+                runs.append((time.perf_counter() - started) * 1000)
+            timings[label] = statistics.median(runs)
+            click.echo(f"{label}: median {timings[label]:.2f} ms, min {min(runs):.2f} ms, max {max(runs):.2f} ms ({repeat} runs)")
+
+        full, partial = timings.values()
+        click.echo(f"speedup: {full / partial:.1f}x" if partial else "speedup: n/a")
+
+    @app.cli.command("migrate-session-keys")
+    @click.option("--dry-run", is_flag=True, help="Only count the plain keys that would be moved.")
+    @click.option("--scan-count", type=int, default=500, show_default=True, help="SCAN batch size.")
+    def migrate_session_keys(dry_run, scan_count):
+        """Move Redis sessions from plain keys to hash-tagged keys (SESSION_KEY_SCHEME=tagged)."""
+        from services.session_key_migration import migrate_session_keys
+        from utils.redis_client import get_redis_client, redis_cluster_enabled
+        from utils.session_keys import TAGGED_SESSION_KEYS
+
+        if not TAGGED_SESSION_KEYS and not dry_run:
+            raise click.ClickException("Set SESSION_KEY_SCHEME=tagged (on every worker) before migrating")
+        if redis_cluster_enabled():
+            raise click.ClickException("Migrate on standalone Redis, before setting REDIS_CLUSTER=1")
+        moved = migrate_session_keys(get_redis_client(), dry_run=dry_run, count=scan_count)
+        for name, count in moved.items():
+            click.echo(f"{name}: {count} {'to move' if dry_run else 'moved'}")
+
+    @app.cli.command("purge-session-state")
+    @click.option("--batch-size", type=int, default=5000, show_default=True, help="Expired rows deleted per transaction.")
+    def purge_session_state(batch_size):
+        """Delete expired session_state rows left by the SQL session backend."""
+        from services.session_backends import SqlSessionBackend
+
+        backend = SqlSessionBackend()
+        purged = 0
+        while True:
+            deleted = backend.purge_expired(batch_size)
+            purged += deleted
+            if deleted < batch_size:
+                break
+        click.echo(f"Purged {purged} expired session_state rows")
+
+    @app.cli.command("benchmark-session-backends")
+    @click.option("--backend", "backends", type=click.Choice(["redis", "sql", "memory"]), multiple=True, help="Backend to benchmark (repeatable; default all).")
+    @click.option("--turns", type=int, default=200, show_default=True, help="Mood-check conversations (ask turn + answer turn) per backend.")
+    @click.option("--contacts", type=int, default=20, show_default=True, help="Distinct contacts the conversations rotate through.")
+    def benchmark_session_backends(backends, turns, contacts):
+        """Time the mood-check flow's session operations on each session backend."""
+        import statistics
+        import time
+        from services.employee_mood_session_service import EmployeeMoodSessionService
+        from services.session_backends import create_session_backend
+
+        prompt = {"role": "user", "content": "May I know what made you feel that way?"}
+
+        def summary(runs):
+            runs = sorted(runs)
+            return f"median {statistics.median(runs):.3f} ms, p95 {runs[int(len(runs) * 0.95) - 1]:.3f} ms"
+
+        for name in backends or ("memory", "sql", "redis"):
+            try:
+                service = EmployeeMoodSessionService(backend=create_session_backend(name))
+                contact_numbers = [f"benchmark:{index}" for index in range(contacts)]
+                # Warm-up conversation so connection setup and script loading are not timed
+                for contact_number in contact_numbers:
+                    service.clear_session(contact_number)
+                service.start_feedback_turn(contact_numbers[0], prompt, last_messages=2)
+                service.start_feedback_turn(contact_numbers[0], prompt, last_messages=2)
+                service.finish_feedback_turn(contact_numbers[0])
+            except Exception as e:
+                click.echo(f"{name}: unavailable ({e})")
+                continue
+
+            ask_runs, answer_runs = [], []
+            for turn in range(turns):
+                contact_number = contact_numbers[turn % contacts]
+                # Ask turn: one transition records the prompt
+                started = time.perf_counter()
+                service.start_feedback_turn(contact_number, prompt, last_messages=2)
+                ask_runs.append((time.perf_counter() - started) * 1000)
+                # Answer turn: claim the answer with the recent messages, then reset the session
+                started = time.perf_counter()
+                service.start_feedback_turn(contact_number, prompt, last_messages=2)
+                service.finish_feedback_turn(contact_number)
+                answer_runs.append((time.perf_counter() - started) * 1000)
+
+            for contact_number in contact_numbers:
+                service.clear_session(contact_number)
+            click.echo(f"{name}: ask turn {summary(ask_runs)}; answer turn {summary(answer_runs)} ({turns} conversations)")
+
+    @app.cli.command("benchmark-session-bulk")
+    @click.option("--backend", "backend_name", type=click.Choice(["redis", "sql", "memory"]), default="redis", show_default=True, help="Session backend to benchmark.")
+    @click.option("--contacts", type=int, default=2000, show_default=True, help="Contacts in the simulated campaign.")
+    def benchmark_session_bulk(backend_name, contacts):
+        """Time a campaign kickoff (set, read and clear a flag) per contact vs. with the bulk APIs."""
+        import time
+        from services.employee_mood_session_service import EmployeeMoodSessionService
+        from services.session_backends import create_session_backend
+
+        service = EmployeeMoodSessionService(backend=create_session_backend(backend_name))
+        contact_numbers = [f"benchmark:campaign:{index}" for index in range(contacts)]
+
+        def per_contact():
+            for contact_number in contact_numbers:
+                service.set_employee_asked_user_feedback(contact_number, True)
+            flags = [service.get_employee_asked_user_feedback(contact_number) for contact_number in contact_numbers]
+            for contact_number in contact_numbers:
+                service.clear_session(contact_number)
+            return flags
+
+        def bulk():
+            service.set_employee_asked_user_feedback_many(contact_numbers, True)
+            flags = list(service.get_employee_asked_user_feedback_many(contact_numbers).values())
+            service.clear_sessions(contact_numbers)
+            return flags
+
+        timings = {}
+        for label, run in (("per contact", per_contact), ("bulk", bulk)):
+            started = time.perf_counter()
+            flags = run()
+            timings[label] = time.perf_counter() - started
+            if not all(flags):
+                raise click.ClickException(f"{label}: flags were not set for every contact")
+            click.echo(f"{label}: {timings[label]:.2f} s for {contacts} contacts (set, read, clear)")
+        click.echo(f"speedup: {timings['per contact'] / timings['bulk']:.1f}x" if timings["bulk"] else "speedup: n/a")
+
+    @app.cli.command("benchmark-session-codec")
+    @click.option("--conversations", type=int, default=200, show_default=True, help="Simulated conversations.")
+    @click.option("--messages", type=int, default=20, show_default=True, help="Session messages per conversation.")
+    @click.option("--compress-min", type=int, default=1024, show_default=True, help="Smallest payload (bytes) zstd compresses.")
+    def benchmark_session_codec(conversations, messages, compress_min):
+        """Compare session payload size and encode/decode time of each SESSION_CODEC."""
+        import json
+        import random
+        import time
+        from utils.session_codec import SESSION_CODECS, SessionCodec, orjson, zstandard
+
+        # Mood-check style traffic: short replies, emoji, Arabic, and longer assistant turns
+        samples = [
+            ("user", "😀"),
+            ("user", "work was stressful today, the shift ran two hours over"),
+            ("user", "الحمد لله، كان يوماً جيداً"),
+            ("user", "Thank you so much for your feedback. May I know what made you feel that way?"),
+            ("assistant", "Thanks for sharing. I've noted that today felt stressful. If anything at the "
+                          "office is making your shifts harder, your manager and HR are here to help, and "
+                          "you can reply at any time to add more detail to today's check-in."),
+            ("assistant", "شكراً لمشاركتك. سنتابع معك غداً."),
+        ]
+        generator = random.Random(42)
+        payloads = [
+            [{"role": role, "content": content} for role, content in (generator.choice(samples) for _ in range(messages))]
+            for _ in range(conversations)
+        ]
+        locations = [["Dubai Marina Office", "Abu Dhabi HQ", "مكتب الشارقة"] for _ in range(conversations)]
+        values = [message for conversation in payloads for message in conversation] + locations
+
+        click.echo(f"orjson: {'installed' if orjson else 'not installed'}; zstandard: {'installed' if zstandard else 'not installed'}")
+        # The first row is the code before the codec layer: json.dumps/json.loads per entry
+        variants = [("before (json.dumps/json.loads)", json.dumps, json.loads)] + [
+            (name, codec.encode, codec.decode)
+            for name, codec in ((name, SessionCodec(name, compress_min_bytes=compress_min)) for name in SESSION_CODECS)
+        ]
+        baseline = None
+        for name, encode, decode in variants:
+            started = time.perf_counter()
+            encoded = [encode(value) for value in values]
+            encode_ms = (time.perf_counter() - started) * 1000
+            started = time.perf_counter()
+            for raw in encoded:
+                decode(raw)
+            decode_ms = (time.perf_counter() - started) * 1000
+            size = sum(len(raw.encode()) for raw in encoded)
+            # Whole conversations stored as one payload, as the SQL backend does with its lists
+            bulk_size = sum(len(encode(conversation).encode()) for conversation in payloads)
+
+            if baseline is None:
+                baseline = (size, bulk_size, encode_ms, decode_ms)
+            click.echo(
+                f"{name}: {size / 1024:.1f} KiB per-message ({100 * (1 - size / baseline[0]):.1f}% saved), "
+                f"{bulk_size / 1024:.1f} KiB per-conversation ({100 * (1 - bulk_size / baseline[1]):.1f}% saved), "
+                f"encode {encode_ms:.1f} ms ({baseline[2] / encode_ms:.1f}x), "
+                f"decode {decode_ms:.1f} ms ({baseline[3] / decode_ms:.1f}x) for {len(values)} payloads"
+            )
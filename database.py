@@ -1,9 +1,18 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import Session
 import os
 
 # Create the SQLAlchemy instance
 db = SQLAlchemy()
 
+# Session of the unit of work open in this thread/task, if any
+_unit_of_work_session: ContextVar[Optional[Session]] = ContextVar("unit_of_work_session", default=None)
+# session.info key of the callbacks run once the unit of work has committed
+_AFTER_COMMIT_KEY = "unit_of_work_after_commit"
+
 def init_db(app):
     """Initialize the database with the Flask app"""
     # Database configuration
@@ -15,4 +24,58 @@ def init_db(app):
     # Initialize the db with the app
     db.init_app(app)
     
-    return db 
\ No newline at end of file
+    return db
+
+@contextmanager
+def unit_of_work() -> Iterator[Session]:
+    """
+    One database session and transaction for a block of proxy calls, e.g. a mood-check turn.
+
+    Proxies called inside the block use this session instead of opening their own app
+    context. The services' commit() and rollback() then only release or roll back a
+    savepoint; the transaction is committed once when the block ends, or rolled back
+    if it raises. A nested unit_of_work() joins the open one. Also usable as a decorator.
+    """
+    session = _unit_of_work_session.get()
+    if session is not None:
+        yield session
+        return
+    from app import app
+    with app.app_context():
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            session = Session(bind=connection, join_transaction_mode="create_savepoint")
+            session.info[_AFTER_COMMIT_KEY] = []
+            token = _unit_of_work_session.set(session)
+            try:
+                yield session
+                session.flush()
+                transaction.commit()
+            except BaseException:
+                transaction.rollback()
+                raise
+            finally:
+                _unit_of_work_session.reset(token)
+                callbacks = session.info.pop(_AFTER_COMMIT_KEY)
+                session.close()
+            for callback in callbacks:
+                callback()
+
+@contextmanager
+def db_session() -> Iterator[Session]:
+    """The open unit of work's session, or db.session in a fresh app context."""
+    session = _unit_of_work_session.get()
+    if session is not None:
+        yield session
+        return
+    from app import app
+    with app.app_context():
+        yield db.session
+
+def run_after_commit(session: Session, callback: Callable[[], None]):
+    """Run callback after session's commit; inside a unit of work, once the whole unit commits."""
+    callbacks = session.info.get(_AFTER_COMMIT_KEY)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
@@ -1,10 +1,11 @@
 from utils.dummy_functions import send_whatsapp_message, clear_session
 from proxies.proxy import EmployeeProxy
-from proxies.employee_session_proxy import EmployeeSessionProxy
 from proxies.employee_mood_session_proxy import EmployeeMoodSessionProxy
+from services.employee_mood_session_service import FEEDBACK_ASK, FEEDBACK_BUSY
 from proxies.employee_message_proxy import EmployeeMessageHistoryProxy
 from proxies.employee_mood_proxy import EmployeeMoodProxy
 from utils.agents import get_employee_mood_check_extraction, mood_check_response
+from database import unit_of_work
 
 
 def employee_mood_check(contact_number: str, user_message: str, mood_record_id: int = None):
@@ -12,45 +13,65 @@ def employee_mood_check(contact_number: str, user_message: str, mood_record_id:
     employee_record = EmployeeProxy.get_employee_record(contact_number)
     print(f"[MoodCheck] Employee record found: {bool(employee_record)}")
 
-    asked_user_feedback = EmployeeMoodSessionProxy.get_employee_asked_user_feedback(contact_number)
-    print(f"[MoodCheck] Asked user feedback flag: {asked_user_feedback}")
+    # One atomic round trip decides the turn: ask for feedback, or claim the answer.
+    # Concurrent messages from the same contact cannot both take the same branch.
+    follow_up_prompt = "Thank you so much for your feedback. May I know what made you feel that way?"
+    # Only the newest messages are fetched; the turn logs at most the last three
+    feedback_state, session_messages = EmployeeMoodSessionProxy.start_feedback_turn(
+        contact_number, {"role": "user", "content": follow_up_prompt}, last_messages=2
+    )
+    print(f"[MoodCheck] Feedback turn state: {feedback_state}")
 
-    if asked_user_feedback is not True:
-        follow_up_prompt = "Thank you so much for your feedback. May I know what made you feel that way?"
+    if feedback_state == FEEDBACK_ASK:
         send_whatsapp_message(contact_number, follow_up_prompt)
         print("[MoodCheck] Sent feedback follow-up prompt")
-        EmployeeMessageHistoryProxy.save_message(contact_number, "user", follow_up_prompt)
-        EmployeeSessionProxy.add_message(contact_number, {"role": "user", "content": follow_up_prompt})
-        EmployeeMoodSessionProxy.set_employee_asked_user_feedback(contact_number, True)
+        with unit_of_work():
+            EmployeeMessageHistoryProxy.save_message(contact_number, "user", follow_up_prompt)
         print("[MoodCheck] Marked asked_user_feedback in session")
         return True
 
+    if feedback_state == FEEDBACK_BUSY:
+        with unit_of_work():
+            EmployeeMessageHistoryProxy.save_message(contact_number, "user", user_message)
+        print("[MoodCheck] Another worker is handling this contact's answer; message saved only")
+        return True
+
     print(f"[MoodCheck] Recording user message: {user_message}")
-    EmployeeMessageHistoryProxy.save_message(contact_number, "user", user_message)
-    EmployeeSessionProxy.add_message(contact_number, {"role": "user", "content": user_message})
-    if mood_record_id is not None:
-        if not isinstance(mood_record_id, int) or mood_record_id <= 0:
-            print(f"[MoodCheck] Invalid mood_record_id supplied: {mood_record_id}")
-        elif user_message is None or user_message.strip() == "":
-            print("[MoodCheck] Skipping comment update because user message is empty")
-        else:
-            try:
-                EmployeeMoodProxy.add_comment_to_mood_record_by_id(mood_record_id, user_message.strip())
-                print(f"[MoodCheck] Added comment to mood record {mood_record_id}")
-            except Exception as e:
-                print(f"[MoodCheck] Failed to add comment to mood record {mood_record_id}: {e}")
-    session_messages = EmployeeSessionProxy.get_messages(contact_number)
-    print(f"[MoodCheck] Loaded {len(session_messages)} session messages")
-    # feedback_extraction = get_employee_mood_check_extraction(session_messages[-1:])
-    # print(f"[MoodCheck] Feedback extraction: {feedback_extraction}")
-    print(f"[MoodCheck] Latest session messages: {session_messages[-3:]}")  # show recent entries
-    mood_check_response_message = mood_check_response(user_message)
-    send_whatsapp_message(contact_number, mood_check_response_message.message_to_user)
-    print(f"[MoodCheck] Sent response: {mood_check_response_message.message_to_user}")
+    try:
+        # One database transaction for the turn's writes, committed before the LLM and
+        # WhatsApp calls so it holds no locks or connection while they run, and their
+        # failure does not undo the saved message and comment
+        with unit_of_work():
+            EmployeeMessageHistoryProxy.save_message(contact_number, "user", user_message)
+            if mood_record_id is not None:
+                if not isinstance(mood_record_id, int) or mood_record_id <= 0:
+                    print(f"[MoodCheck] Invalid mood_record_id supplied: {mood_record_id}")
+                elif user_message is None or user_message.strip() == "":
+                    print("[MoodCheck] Skipping comment update because user message is empty")
+                else:
+                    try:
+                        EmployeeMoodProxy.add_comment_to_mood_record_by_id(mood_record_id, user_message.strip())
+                        print(f"[MoodCheck] Added comment to mood record {mood_record_id}")
+                    except Exception as e:
+                        print(f"[MoodCheck] Failed to add comment to mood record {mood_record_id}: {e}")
+        # The session messages are cleared at the end of this turn, so the user message is
+        # appended locally instead of being pushed to Redis and read back
+        session_messages = session_messages + [{"role": "user", "content": user_message}]
+        print(f"[MoodCheck] Loaded {len(session_messages)} recent session messages")
+        # feedback_extraction = get_employee_mood_check_extraction(session_messages[-1:])
+        # print(f"[MoodCheck] Feedback extraction: {feedback_extraction}")
+        print(f"[MoodCheck] Latest session messages: {session_messages[-3:]}")  # show recent entries
+        mood_check_response_message = mood_check_response(user_message)
+        send_whatsapp_message(contact_number, mood_check_response_message.message_to_user)
+        print(f"[MoodCheck] Sent response: {mood_check_response_message.message_to_user}")
+    except Exception:
+        # Let the contact's next message retry the answer
+        EmployeeMoodSessionProxy.release_feedback_answer(contact_number)
+        raise
     clear_session(contact_number)
     print("[MoodCheck] Cleared employee session data")
-    EmployeeMoodSessionProxy.clear_employee_asked_user_feedback(contact_number)
-    EmployeeSessionProxy.clear_messages(contact_number)
+    # Second round trip: reset the flag, the claim and the messages atomically
+    EmployeeMoodSessionProxy.finish_feedback_turn(contact_number)
     print("[MoodCheck] Reset asked_user_feedback flag and cleared messages\n")
     return True
 
@@ -0,0 +1,82 @@
+import asyncio
+from functools import partial
+from utils.dummy_functions import send_whatsapp_message, clear_session
+from proxies.proxy import EmployeeProxy
+from proxies.employee_mood_session_proxy import AsyncEmployeeMoodSessionProxy
+from services.employee_mood_session_service import FEEDBACK_ASK, FEEDBACK_BUSY
+from proxies.employee_message_proxy import EmployeeMessageHistoryProxy
+from proxies.employee_mood_proxy import EmployeeMoodProxy
+from utils.agents import mood_check_response
+from utils.redis_client import close_async_redis_pool
+
+
+async def _blocking(func, *args):
+    """Run a blocking call (database, OpenAI, WhatsApp) on the default thread pool."""
+    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args))
+
+
+async def employee_mood_check(contact_number: str, user_message: str, mood_record_id: int = None):
+    """employee_mood_check.employee_mood_check for asyncio workers: the session calls
+    await redis.asyncio, so many conversations share one thread."""
+    print(f"[MoodCheck] Processing message from {contact_number}")
+    employee_record = await _blocking(EmployeeProxy.get_employee_record, contact_number)
+    print(f"[MoodCheck] Employee record found: {bool(employee_record)}")
+
+    follow_up_prompt = "Thank you so much for your feedback. May I know what made you feel that way?"
+    feedback_state, session_messages = await AsyncEmployeeMoodSessionProxy.start_feedback_turn(
+        contact_number, {"role": "user", "content": follow_up_prompt}, last_messages=2
+    )
+    print(f"[MoodCheck] Feedback turn state: {feedback_state}")
+
+    if feedback_state == FEEDBACK_ASK:
+        await _blocking(send_whatsapp_message, contact_number, follow_up_prompt)
+        print("[MoodCheck] Sent feedback follow-up prompt")
+        await _blocking(EmployeeMessageHistoryProxy.save_message, contact_number, "user", follow_up_prompt)
+        return True
+
+    if feedback_state == FEEDBACK_BUSY:
+        await _blocking(EmployeeMessageHistoryProxy.save_message, contact_number, "user", user_message)
+        print("[MoodCheck] Another worker is handling this contact's answer; message saved only")
+        return True
+
+    print(f"[MoodCheck] Recording user message: {user_message}")
+    try:
+        await _blocking(EmployeeMessageHistoryProxy.save_message, contact_number, "user", user_message)
+        if mood_record_id is not None:
+            if not isinstance(mood_record_id, int) or mood_record_id <= 0:
+                print(f"[MoodCheck] Invalid mood_record_id supplied: {mood_record_id}")
+            elif user_message is None or user_message.strip() == "":
+                print("[MoodCheck] Skipping comment update because user message is empty")
+            else:
+                try:
+                    await _blocking(EmployeeMoodProxy.add_comment_to_mood_record_by_id, mood_record_id, user_message.strip())
+                    print(f"[MoodCheck] Added comment to mood record {mood_record_id}")
+                except Exception as e:
+                    print(f"[MoodCheck] Failed to add comment to mood record {mood_record_id}: {e}")
+        session_messages = session_messages + [{"role": "user", "content": user_message}]
+        print(f"[MoodCheck] Latest session messages: {session_messages[-3:]}")
+        mood_check_response_message = await _blocking(mood_check_response, user_message)
+        await _blocking(send_whatsapp_message, contact_number, mood_check_response_message.message_to_user)
+        print(f"[MoodCheck] Sent response: {mood_check_response_message.message_to_user}")
+    except Exception:
+        # Let the contact's next message retry the answer
+        await AsyncEmployeeMoodSessionProxy.release_feedback_answer(contact_number)
+        raise
+    clear_session(contact_number)
+    await AsyncEmployeeMoodSessionProxy.finish_feedback_turn(contact_number)
+    print("[MoodCheck] Reset asked_user_feedback flag and cleared messages\n")
+    return True
+
+
+async def main():
+    try:
+        while True:
+            user_message = await _blocking(input, "\nUser: ")
+            print("[MoodCheck] --- New Interaction ---")
+            await employee_mood_check(contact_number="+971509784398", user_message=user_message, mood_record_id=53)
+    finally:
+        await close_async_redis_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
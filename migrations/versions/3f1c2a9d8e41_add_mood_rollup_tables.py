@@ -0,0 +1,62 @@
+"""add mood rollup tables
+
+Revision ID: 3f1c2a9d8e41
+Revises: 
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a9d8e41'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('mood_daily_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('mood_1_count', sa.Integer(), nullable=False),
+    sa.Column('mood_2_count', sa.Integer(), nullable=False),
+    sa.Column('mood_3_count', sa.Integer(), nullable=False),
+    sa.Column('mood_4_count', sa.Integer(), nullable=False),
+    sa.Column('commented_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'group_id', 'date', name='uq_mood_daily_rollups_company_group_date')
+    )
+    op.create_table('mood_employee_rollups',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('group_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('mood_1_count', sa.Integer(), nullable=False),
+    sa.Column('mood_2_count', sa.Integer(), nullable=False),
+    sa.Column('mood_3_count', sa.Integer(), nullable=False),
+    sa.Column('mood_4_count', sa.Integer(), nullable=False),
+    sa.Column('commented_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.ForeignKeyConstraint(['employee_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('company_id', 'group_id', 'employee_id', 'month', name='uq_mood_employee_rollups_key')
+    )
+    op.create_table('mood_rollup_state',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('covered_from', sa.Date(), nullable=True),
+    sa.Column('rebuilt_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('company_id')
+    )
+
+
+def downgrade():
+    op.drop_table('mood_rollup_state')
+    op.drop_table('mood_employee_rollups')
+    op.drop_table('mood_daily_rollups')
@@ -0,0 +1,29 @@
+"""rebuild mood rollups by employee scope
+
+Revision ID: 5d2f8a1c9b37
+Revises: 8b7e05c4d2a6
+Create Date: 2026-10-18 17:20:14.902331
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2f8a1c9b37'
+down_revision = '8b7e05c4d2a6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rollups are now keyed by the employee's current company/group and skip deleted
+    # employees. Drop the old counters and coverage so statistics read mood_checks
+    # until 'flask rebuild-mood-rollups' has run.
+    op.execute("DELETE FROM mood_rollup_state")
+    op.execute("DELETE FROM mood_employee_rollups")
+    op.execute("DELETE FROM mood_daily_rollups")
+
+
+def downgrade():
+    op.execute("DELETE FROM mood_rollup_state")
@@ -0,0 +1,27 @@
+"""add session state updated_at index
+
+Revision ID: 7a9c2e4b6d18
+Revises: e6b4d0a8f352
+Create Date: 2026-10-19 09:12:37.610254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a9c2e4b6d18'
+down_revision = 'e6b4d0a8f352'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SqlSessionBackend purges expired rows by updated_at
+    with op.get_context().autocommit_block():
+        op.create_index('ix_session_state_updated_at', 'session_state', ['updated_at'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_session_state_updated_at', table_name='session_state', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,37 @@
+"""add mood check hot query indexes
+
+Revision ID: 8b7e05c4d2a6
+Revises: 3f1c2a9d8e41
+Create Date: 2026-10-18 11:47:09.215563
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7e05c4d2a6'
+down_revision = '3f1c2a9d8e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build the indexes without locking writes on the live tables
+    with op.get_context().autocommit_block():
+        op.create_index('ix_employee_contact_no', 'employee', ['contactNo'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_employee_group_deleted', 'employee', ['group_id', 'is_deleted'], unique=False, postgresql_include=['id'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_employee_company_deleted', 'employee', ['company_id', 'is_deleted'], unique=False, postgresql_include=['id'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_mood_checks_employee_date', 'mood_checks', ['employee_id', 'date'], unique=False, postgresql_include=['mood'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_mood_checks_company_date', 'mood_checks', ['company_id', 'date'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_messages_contact_number_timestamp', 'messages', ['contact_number', 'timestamp'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_messages_contact_number_timestamp', table_name='messages', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_mood_checks_company_date', table_name='mood_checks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_mood_checks_employee_date', table_name='mood_checks', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_employee_company_deleted', table_name='employee', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_employee_group_deleted', table_name='employee', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_employee_contact_no', table_name='employee', postgresql_concurrently=True, if_exists=True)
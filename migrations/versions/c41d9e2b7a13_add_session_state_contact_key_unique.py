@@ -0,0 +1,37 @@
+"""add session state contact key unique constraint
+
+Revision ID: c41d9e2b7a13
+Revises: 5d2f8a1c9b37
+Create Date: 2026-10-18 15:02:41.538107
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41d9e2b7a13'
+down_revision = '5d2f8a1c9b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep the newest row of any duplicated (contact_number, session_key) before adding the constraint
+    op.execute("""
+        DELETE FROM session_state
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY contact_number, session_key ORDER BY updated_at DESC NULLS LAST, id DESC
+                ) AS position
+                FROM session_state
+            ) ranked
+            WHERE position > 1
+        )
+    """)
+    op.create_unique_constraint('uq_session_state_contact_key', 'session_state', ['contact_number', 'session_key'])
+
+
+def downgrade():
+    op.drop_constraint('uq_session_state_contact_key', 'session_state', type_='unique')
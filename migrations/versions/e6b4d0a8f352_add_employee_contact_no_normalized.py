@@ -0,0 +1,38 @@
+"""add normalized employee contact number
+
+Revision ID: e6b4d0a8f352
+Revises: c41d9e2b7a13
+Create Date: 2026-10-18 18:05:12.904361
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b4d0a8f352'
+down_revision = 'c41d9e2b7a13'
+branch_labels = None
+depends_on = None
+
+# utils.contact_numbers.normalize_contact_number() in SQL, as of this revision
+NORMALIZE_CONTACT_NO = """NULLIF(regexp_replace(regexp_replace("contactNo", '[^0-9]', '', 'g'), '^00', ''), '')"""
+
+
+def upgrade():
+    op.add_column('employee', sa.Column('contact_no_normalized', sa.String(length=20), nullable=True))
+    # Backfill existing rows; the ORM keeps the column in step from now on
+    # (flask backfill-employee-contacts fixes rows written without it)
+    op.execute(f'UPDATE employee SET contact_no_normalized = {NORMALIZE_CONTACT_NO} WHERE "contactNo" IS NOT NULL')
+    # Not unique: existing data may hold the same number on several (e.g. deleted) employees
+    with op.get_context().autocommit_block():
+        op.create_index('ix_employee_contact_no_normalized', 'employee', ['contact_no_normalized'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        # Lookups no longer filter on the raw number
+        op.drop_index('ix_employee_contact_no', table_name='employee', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_employee_contact_no', 'employee', ['contactNo'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_employee_contact_no_normalized', table_name='employee', postgresql_concurrently=True, if_exists=True)
+    op.drop_column('employee', 'contact_no_normalized')
@@ -1,26 +1,35 @@
+from database import db_session
 from services.employee_message_service import EmployeeMessageHistoryService
+from services.message_write_buffer import message_write_buffer
 
 class EmployeeMessageHistoryProxy:
     @staticmethod
     def get_message_history(contact_number):
-        from app import app, db
-        with app.app_context():
+        with db_session() as session:
             return EmployeeMessageHistoryService.get_message_history(
-                db.session, contact_number
+                session, contact_number
             )
 
     @staticmethod
     def save_message(contact_number, role, content):
-        from app import app, db
-        with app.app_context():
+        with db_session() as session:
             return EmployeeMessageHistoryService.save_message(
-                db.session, contact_number, role, content
+                session, contact_number, role, content
             )
 
     @staticmethod
     def clear_message_history(contact_number):
-        from app import app, db
-        with app.app_context():
+        with db_session() as session:
             return EmployeeMessageHistoryService.clear_message_history(
-                db.session, contact_number
-            )
\ No newline at end of file
+                session, contact_number
+            )
+
+    @staticmethod
+    def flush_pending_messages():
+        """Write the messages queued by MESSAGE_WRITE_BEHIND now; returns how many."""
+        return message_write_buffer.flush()
+
+    @staticmethod
+    def get_write_buffer_stats():
+        """Queued messages and flush counters of the write-behind buffer."""
+        return message_write_buffer.stats()
\ No newline at end of file
@@ -1,23 +1,70 @@
+from database import db_session
 from services.employee_mood_service import EmployeeMoodService
+from services.employee_mood_rollup_service import EmployeeMoodRollupService
+from services.mood_statistics_cache import mood_statistics_cache
 from Files.SQLAlchemyModels import MoodCheck
 
 class EmployeeMoodProxy:
     @staticmethod
-    def get_mood_check_statistics(company_ids=None, group_id=None, start_date=None, end_date=None):
-        from app import app, db
-        with app.app_context():
-            return EmployeeMoodService.get_mood_check_statistics(db.session, company_ids, group_id, start_date, end_date)
+    def get_mood_check_statistics(company_ids=None, group_id=None, start_date=None, end_date=None, aggregate_in_db=False, use_rollups=True, use_cache=True, granularity="day", rolling_window=None, sections=None):
+        """Get mood statistics, served from the statistics cache when possible."""
+        if use_cache:
+            cache_key = mood_statistics_cache.make_key(
+                company_ids=company_ids, group_id=group_id, start_date=start_date, end_date=end_date,
+                aggregate_in_db=aggregate_in_db, use_rollups=use_rollups,
+                granularity=granularity, rolling_window=rolling_window,
+                sections=sorted(sections) if sections is not None else None
+            )
+            cached = mood_statistics_cache.get(cache_key, company_ids, group_id)
+            if cached is not None:
+                return cached
+            # Read generations before computing so a concurrent write marks the result stale
+            generations = mood_statistics_cache.generations_for(company_ids, group_id)
+        
+        with db_session() as session:
+            statistics = EmployeeMoodService.get_mood_check_statistics(session, company_ids, group_id, start_date, end_date, aggregate_in_db, use_rollups, granularity, rolling_window, sections)
+        
+        if use_cache:
+            mood_statistics_cache.set(cache_key, statistics, generations=generations)
+        return statistics
+    
+    @staticmethod
+    def get_mood_check_statistics_batch(company_ids=None, group_ids=None, start_date=None, end_date=None):
+        """Get mood statistics for many companies/groups in one pass, keyed by "company:<id>" / "group:<id>"."""
+        with db_session() as session:
+            return EmployeeMoodService.get_mood_check_statistics_batch(session, company_ids, group_ids, start_date, end_date)
+    
+    @staticmethod
+    def get_employee_mood_page(company_ids=None, group_id=None, start_date=None, end_date=None, sort_by="average_mood", descending=True, limit=50, cursor=None, at_risk_only=False):
+        """One keyset-paginated page of per-employee mood statistics."""
+        with db_session() as session:
+            return EmployeeMoodService.get_employee_mood_page(session, company_ids, group_id, start_date, end_date, sort_by, descending, limit, cursor, at_risk_only)
+    
+    @staticmethod
+    def stream_employee_mood_ndjson(company_ids=None, group_id=None, start_date=None, end_date=None, sort_by="average_mood", descending=True, at_risk_only=False, batch_size=500):
+        """Generator of NDJSON lines, one per employee; the app context stays open while it is consumed."""
+        with db_session() as session:
+            yield from EmployeeMoodService.stream_employee_mood_ndjson(session, company_ids, group_id, start_date, end_date, sort_by, descending, at_risk_only, batch_size)
+    
+    @staticmethod
+    def get_statistics_cache_stats():
+        """Hit/miss counters and size of the statistics cache."""
+        return mood_statistics_cache.stats()
+    
+    @staticmethod
+    def rebuild_mood_rollups(company_ids=None, start_date=None):
+        """Recompute the mood rollups from raw mood checks (all companies by default)."""
+        with db_session() as session:
+            return EmployeeMoodRollupService.rebuild_rollups(session, company_ids, start_date)
     
     @staticmethod
     def add_comment_to_mood_record(mood_record: MoodCheck, comment: str):
         """Add or update a comment to a mood check record."""
-        from app import app, db
-        with app.app_context():
-            return EmployeeMoodService.add_comment_to_mood_record(db.session, mood_record, comment)
+        with db_session() as session:
+            return EmployeeMoodService.add_comment_to_mood_record(session, mood_record, comment)
     
     @staticmethod
     def add_comment_to_mood_record_by_id(mood_id: int, comment: str):
         """Add or update a comment to a mood check record by ID."""
-        from app import app, db
-        with app.app_context():
-            return EmployeeMoodService.add_comment_to_mood_record_by_id(db.session, mood_id, comment)
+        with db_session() as session:
+            return EmployeeMoodService.add_comment_to_mood_record_by_id(session, mood_id, comment)
@@ -1,4 +1,5 @@
-from services.employee_mood_session_service import EmployeeMoodSessionService
+from services.employee_mood_session_service import EmployeeMoodSessionService, AsyncEmployeeMoodSessionService
+from utils.session_keys import SESSION_MAX_MESSAGES
 
 class EmployeeMoodSessionProxy:
     # Create one instance to use everywhere
@@ -17,4 +18,54 @@ class EmployeeMoodSessionProxy:
     @classmethod
     def clear_employee_asked_user_feedback(cls, contact_number):
         """Clear asked user feedback status for an employee"""
-        return cls._service.clear_employee_asked_user_feedback(contact_number)
\ No newline at end of file
+        return cls._service.clear_employee_asked_user_feedback(contact_number)
+    
+    @classmethod
+    def set_employee_asked_user_feedback_many(cls, contact_numbers, asked_feedback):
+        """Set asked user feedback status for many employees (chunked pipelines)"""
+        return cls._service.set_employee_asked_user_feedback_many(contact_numbers, asked_feedback)
+    
+    @classmethod
+    def get_employee_asked_user_feedback_many(cls, contact_numbers):
+        """Asked user feedback status of many employees, by contact number"""
+        return cls._service.get_employee_asked_user_feedback_many(contact_numbers)
+    
+    @classmethod
+    def clear_employee_asked_user_feedback_many(cls, contact_numbers):
+        """Clear asked user feedback status for many employees (chunked pipelines)"""
+        return cls._service.clear_employee_asked_user_feedback_many(contact_numbers)
+    
+    @classmethod
+    def get_sessions(cls, contact_numbers):
+        """Sessions of many contacts as {contact_number: EmployeeSession} (chunked pipelines)"""
+        return cls._service.get_sessions(contact_numbers)
+    
+    @classmethod
+    def clear_sessions(cls, contact_numbers):
+        """Delete the whole session of many contacts (batched UNLINK on Redis)"""
+        return cls._service.clear_sessions(contact_numbers)
+    
+    @classmethod
+    def start_feedback_turn(cls, contact_number, prompt_message, last_messages=SESSION_MAX_MESSAGES):
+        """Atomically ask for feedback or claim the answer: (state, newest session messages)"""
+        return cls._service.start_feedback_turn(contact_number, prompt_message, last_messages)
+    
+    @classmethod
+    def release_feedback_answer(cls, contact_number):
+        """Release an answer claim after a failed turn"""
+        return cls._service.release_feedback_answer(contact_number)
+    
+    @classmethod
+    def finish_feedback_turn(cls, contact_number):
+        """Atomically reset the feedback flag and session messages"""
+        return cls._service.finish_feedback_turn(contact_number)
+    
+    @classmethod
+    def unit_of_work(cls):
+        """Queue session reads/writes and run them together (one round trip on Redis)"""
+        return cls._service.unit_of_work()
+
+
+class AsyncEmployeeMoodSessionProxy(EmployeeMoodSessionProxy):
+    """The same calls on redis.asyncio: await each one, and use `async with` for unit_of_work()"""
+    _service = AsyncEmployeeMoodSessionService()
@@ -1,4 +1,6 @@
-from services.employee_session_service import EmployeeSessionService
+from services.employee_session_service import EmployeeSessionService, AsyncEmployeeSessionService
+from services.session_near_cache import NearCacheSessionBackend
+from utils.redis_client import get_redis_pool_stats
 
 class EmployeeSessionProxy:
     # Create one instance to use everywhere
@@ -28,6 +30,11 @@ class EmployeeSessionProxy:
     def clear_employee_session(cls, contact_number):
         """Clear all employee data for this contact"""
         return cls._service.clear_employee_session(contact_number)
+    
+    @classmethod
+    def clear_employee_session_many(cls, contact_numbers):
+        """Clear the employee data of many contacts (chunked pipelines)"""
+        return cls._service.clear_employee_session_many(contact_numbers)
 
     @classmethod
     def add_to_list(cls, contact_number, items):
@@ -59,6 +66,11 @@ class EmployeeSessionProxy:
         """Get all messages for a given contact number"""
         return cls._service.get_messages(contact_number)
     
+    @classmethod
+    def get_last_messages(cls, contact_number, count):
+        """Get only the newest `count` messages (oldest first)"""
+        return cls._service.get_last_messages(contact_number, count)
+    
     @classmethod
     def set_multiple_office_locations(cls, contact_number, location_names):
         """Set the multiple office locations list for a contact"""
@@ -119,6 +131,21 @@ class EmployeeSessionProxy:
     def clear_employee_asked_user_feedback(cls, contact_number):
         """Clear asked user feedback status for an employee"""
         return cls._service.clear_employee_asked_user_feedback(contact_number)
+    
+    @classmethod
+    def set_employee_asked_user_feedback_many(cls, contact_numbers, asked_feedback):
+        """Set asked user feedback status for many employees (chunked pipelines)"""
+        return cls._service.set_employee_asked_user_feedback_many(contact_numbers, asked_feedback)
+    
+    @classmethod
+    def get_employee_asked_user_feedback_many(cls, contact_numbers):
+        """Asked user feedback status of many employees, by contact number"""
+        return cls._service.get_employee_asked_user_feedback_many(contact_numbers)
+    
+    @classmethod
+    def clear_employee_asked_user_feedback_many(cls, contact_numbers):
+        """Clear asked user feedback status for many employees (chunked pipelines)"""
+        return cls._service.clear_employee_asked_user_feedback_many(contact_numbers)
 
     @classmethod
     def set_update_agent_confirmation(cls, contact_number, confirmation):
@@ -230,5 +257,44 @@ class EmployeeSessionProxy:
     def clear_shift_time(cls, contact_number):
         """Clear shift time for a contact"""
         return cls._service.clear_shift_time(contact_number)
+    
+    @classmethod
+    def get_session(cls, contact_number):
+        """All session fields of a contact as an EmployeeSession, in one round trip"""
+        return cls._service.get_session(contact_number)
+    
+    @classmethod
+    def clear_session(cls, contact_number):
+        """Delete the contact's whole session (fields, messages and lists) at once"""
+        return cls._service.clear_session(contact_number)
+    
+    @classmethod
+    def get_sessions(cls, contact_numbers):
+        """Sessions of many contacts as {contact_number: EmployeeSession} (chunked pipelines)"""
+        return cls._service.get_sessions(contact_numbers)
+    
+    @classmethod
+    def clear_sessions(cls, contact_numbers):
+        """Delete the whole session of many contacts (batched UNLINK on Redis)"""
+        return cls._service.clear_sessions(contact_numbers)
+    
+    @classmethod
+    def get_redis_pool_stats(cls):
+        """Connections created, in use and idle in the shared Redis pool"""
+        return get_redis_pool_stats()
+    
+    @classmethod
+    def get_near_cache_stats(cls):
+        """Hit rate and size of the session near cache (None unless SESSION_NEAR_CACHE=1)"""
+        backend = cls._service.backend
+        return backend.stats() if isinstance(backend, NearCacheSessionBackend) else None
+    
+    @classmethod
+    def unit_of_work(cls):
+        """Queue session reads/writes and run them together (one round trip on Redis)"""
+        return cls._service.unit_of_work()
+
 
-    
\ No newline at end of file
+class AsyncEmployeeSessionProxy(EmployeeSessionProxy):
+    """The same session calls on redis.asyncio: await each one, and use `async with` for unit_of_work()"""
+    _service = AsyncEmployeeSessionService()
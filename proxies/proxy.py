@@ -1,13 +1,19 @@
 from typing import List, Tuple, Optional
+from database import db_session
 from services.service import EmployeeService
+from services.employee_record_cache import employee_record_cache
 
 class EmployeeProxy:
 
     @staticmethod
     def get_employee_record(contact_number: str):
-        from app import app, db
-        with app.app_context():
-            return EmployeeService.get_employee_record(contact_number, db.session)
+        with db_session() as session:
+            return EmployeeService.get_employee_record(contact_number, session)
+
+    @staticmethod
+    def get_employee_cache_stats():
+        """Hit/miss counters (including unknown numbers) and size of the employee lookup cache."""
+        return employee_record_cache.stats()
         
 
    
\ No newline at end of file
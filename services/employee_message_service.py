@@ -1,4 +1,5 @@
 from Files.SQLAlchemyModels import LeadMessageHistory
+from services.message_write_buffer import message_write_buffer
 
 class EmployeeMessageHistoryService:
     @staticmethod
@@ -7,9 +8,17 @@ class EmployeeMessageHistoryService:
             Retrieve all message history for a contact (optionally filtered by session).
             """
         try:
+            # Read the write-behind queue first: a message flushed meanwhile is then
+            # found twice (and dropped once) rather than not at all
+            pending = message_write_buffer.pending(contact_number) if message_write_buffer.enabled else []
             query = session.query(LeadMessageHistory).filter_by(contact_number=contact_number)
             history = query.order_by(LeadMessageHistory.timestamp.asc()).all()
-            return [{"role": m.role, "content": m.content, "timestamp": m.timestamp.isoformat() if m.timestamp else None} for m in history]
+            rows = [{"role": m.role, "content": m.content, "timestamp": m.timestamp} for m in history]
+            if pending:
+                stored = {(m["timestamp"], m["role"], m["content"]) for m in rows}
+                rows += [m for m in pending if (m["timestamp"], m["role"], m["content"]) not in stored]
+                rows.sort(key=lambda m: (m["timestamp"] is None, m["timestamp"] or 0))
+            return [{"role": m["role"], "content": m["content"], "timestamp": m["timestamp"].isoformat() if m["timestamp"] else None} for m in rows]
         except Exception as e:
             print(f"Error retrieving message history: {e}")
             raise
@@ -17,8 +26,12 @@ class EmployeeMessageHistoryService:
     @staticmethod
     def save_message(session, contact_number, role, content):
         """
-        Save a message to the lead message history.
+        Save a message to the lead message history. With MESSAGE_WRITE_BEHIND enabled
+        the message is queued for a bulk insert and None is returned instead of its id.
         """
+        if message_write_buffer.enabled:
+            message_write_buffer.save(contact_number, role, content)
+            return None
         try:
             msg = LeadMessageHistory(
                 contact_number=contact_number,
@@ -38,6 +51,10 @@ class EmployeeMessageHistoryService:
         """
         Delete all message history for a contact (optionally for a specific session).
         """
+        if message_write_buffer.enabled:
+            # Queued messages would otherwise be inserted after the delete; if they cannot
+            # be written, the history is not cleared either
+            message_write_buffer.flush(raise_errors=True)
         try:
             query = session.query(LeadMessageHistory).filter_by(contact_number=contact_number)
             deleted = query.delete()
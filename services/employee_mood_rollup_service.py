@@ -0,0 +1,390 @@
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import event, func, select, case, cast, and_, Date
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+from Files.SQLAlchemyModels import MoodCheck, Employee, MoodDailyRollup, MoodEmployeeRollup, MoodRollupState
+from services.mood_statistics_cache import mood_statistics_cache
+
+# Rollup counter column for each mood value (1=Great, 2=Good, 3=Okay, 4=Not so good)
+MOOD_COUNT_COLUMNS = {'1': 'mood_1_count', '2': 'mood_2_count', '3': 'mood_3_count', '4': 'mood_4_count'}
+COUNTER_COLUMNS = list(MOOD_COUNT_COLUMNS.values()) + ['commented_count']
+
+
+def _has_comment(comments) -> bool:
+    return comments is not None and comments.strip() != ""
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _counter_sums():
+    """SUM expressions for COUNTER_COLUMNS over MoodCheck rows."""
+    return [
+        func.sum(case((MoodCheck.mood == mood, 1), else_=0)) for mood in MOOD_COUNT_COLUMNS
+    ] + [
+        func.sum(case((and_(MoodCheck.comments.isnot(None), func.trim(MoodCheck.comments) != ''), 1), else_=0))
+    ]
+
+
+def _upsert_counters(connection, model, keys: Dict[str, Any], deltas: Dict[str, int]):
+    """Insert a rollup row or add the deltas to the existing one."""
+    values = dict(keys)
+    values.update({column: deltas.get(column, 0) for column in COUNTER_COLUMNS})
+    stmt = insert(model).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys.keys()),
+        set_={column: getattr(model, column) + stmt.excluded[column] for column in COUNTER_COLUMNS}
+    )
+    connection.execute(stmt)
+
+
+class EmployeeMoodRollupService:
+    """
+    Per-day and per-employee (monthly) mood counters keyed by the employee's current
+    company and group, counting only employees that are not soft-deleted, so they
+    match what get_mood_check_statistics reads from mood_checks.
+
+    The counters are updated from ORM events on every MoodCheck insert, update and
+    delete, and an Employee changing company or group or being (un)deleted moves its
+    counters. Bulk SQL writes bypass the events, so run rebuild_rollups afterwards.
+    """
+
+    @staticmethod
+    def _employee_scope(connection, employee_id: int) -> Optional[Tuple[int, int]]:
+        """(company_id, group_id) an employee's checks are counted under, or None if not counted."""
+        row = connection.execute(
+            select(Employee.company_id, Employee.group_id, Employee.is_deleted).where(Employee.id == employee_id)
+        ).first()
+        if row is None or row.company_id is None or row.is_deleted:
+            return None
+        return row.company_id, row.group_id or 0
+
+    @staticmethod
+    def apply_mood_check_delta(connection, employee_id: int, mood_date: date, mood: str, commented: bool, delta: int):
+        """Add (delta=1) or remove (delta=-1) one mood check from the rollups."""
+        if mood not in MOOD_COUNT_COLUMNS or mood_date is None:
+            return
+        scope = EmployeeMoodRollupService._employee_scope(connection, employee_id)
+        if scope is None:
+            return
+        deltas = {MOOD_COUNT_COLUMNS[mood]: delta, 'commented_count': delta if commented else 0}
+        EmployeeMoodRollupService._apply_deltas(connection, scope, employee_id, mood_date, deltas)
+
+    @staticmethod
+    def apply_comment_delta(connection, employee_id: int, mood_date: date, delta: int):
+        """Count (delta=1) or uncount (delta=-1) a comment on an existing mood check."""
+        if mood_date is None:
+            return
+        scope = EmployeeMoodRollupService._employee_scope(connection, employee_id)
+        if scope is None:
+            return
+        EmployeeMoodRollupService._apply_deltas(connection, scope, employee_id, mood_date, {'commented_count': delta})
+
+    @staticmethod
+    def _apply_deltas(connection, scope: Tuple[int, int], employee_id: int, mood_date: date, deltas: Dict[str, int]):
+        company_id, group_id = scope
+        _upsert_counters(connection, MoodDailyRollup, {
+            'company_id': company_id,
+            'group_id': group_id,
+            'date': mood_date
+        }, deltas)
+        _upsert_counters(connection, MoodEmployeeRollup, {
+            'company_id': company_id,
+            'group_id': group_id,
+            'employee_id': employee_id,
+            'month': mood_date.replace(day=1)
+        }, deltas)
+
+    @staticmethod
+    def move_employee_counts(connection, employee_id: int, old_scope: Optional[Tuple[int, int]], new_scope: Optional[Tuple[int, int]]):
+        """Move all of an employee's counters from old_scope to new_scope (None = not counted).
+
+        Used when an employee changes company or group, or is soft-deleted or restored.
+        """
+        if old_scope == new_scope:
+            return
+        rows = connection.execute(
+            select(MoodCheck.date, *_counter_sums()).where(MoodCheck.employee_id == employee_id).group_by(MoodCheck.date)
+        ).all()
+        for row in rows:
+            if row[0] is None:
+                continue
+            counts = dict(zip(COUNTER_COLUMNS, (int(value or 0) for value in row[1:])))
+            if old_scope is not None:
+                EmployeeMoodRollupService._apply_deltas(
+                    connection, old_scope, employee_id, row[0], {column: -count for column, count in counts.items()}
+                )
+            if new_scope is not None:
+                EmployeeMoodRollupService._apply_deltas(connection, new_scope, employee_id, row[0], counts)
+
+    @staticmethod
+    def rollups_cover(db: Session, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None) -> bool:
+        """True when every company in scope has been rebuilt from on or before start_date."""
+        if group_id:
+            company_rows = db.query(Employee.company_id).filter(
+                Employee.group_id == group_id,
+                Employee.is_deleted == False
+            ).distinct().all()
+            company_ids = [row[0] for row in company_rows]
+            # Employees without a company are not rolled up
+            if None in company_ids:
+                return False
+
+        if not company_ids:
+            return False
+
+        states = db.query(MoodRollupState).filter(MoodRollupState.company_id.in_(company_ids)).all()
+        if len(states) != len(set(company_ids)):
+            return False
+
+        return all(
+            state.covered_from is None or (start_date is not None and start_date >= state.covered_from)
+            for state in states
+        )
+
+    @staticmethod
+    def get_rollup_mood_counts(db: Session, raw_query, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, by_date: bool = True, by_employee: bool = True):
+        """
+        Mood counts overall, per date and per employee read from the rollups.
+
+        Returns None when the rollups do not cover the request. Employee counts use whole
+        months from the monthly rollups; partial months at the range edges are grouped
+        from raw_query (the filtered MoodCheck query), so only those days are scanned.
+        Per-date or per-employee counts that are not asked for are not read and are
+        returned as None; the overall counts come from whichever one is read.
+        """
+        if not EmployeeMoodRollupService.rollups_cover(db, company_ids, group_id, start_date):
+            return None
+
+        mood_counts = {'1': 0, '2': 0, '3': 0, '4': 0}
+        date_counts = EmployeeMoodRollupService._rollup_date_counts(db, company_ids, group_id, start_date, end_date, mood_counts) if by_date else None
+        if not by_employee:
+            return mood_counts, date_counts, None
+
+        employee_counts = EmployeeMoodRollupService._rollup_employee_counts(db, raw_query, company_ids, group_id, start_date, end_date)
+        if not by_date:
+            for counts in employee_counts.values():
+                for mood, count in counts.items():
+                    mood_counts[mood] += count
+        return mood_counts, date_counts, employee_counts
+
+    @staticmethod
+    def _rollup_date_counts(db: Session, company_ids, group_id, start_date, end_date, mood_counts: Dict[str, int]) -> Dict[str, Dict[str, int]]:
+        """Per-date counts from the daily rollups, adding them to mood_counts."""
+        date_counts = {}
+        daily_query = db.query(
+            MoodDailyRollup.date,
+            *[func.sum(getattr(MoodDailyRollup, column)) for column in MOOD_COUNT_COLUMNS.values()]
+        )
+        if group_id:
+            daily_query = daily_query.filter(MoodDailyRollup.group_id == group_id)
+        else:
+            daily_query = daily_query.filter(MoodDailyRollup.company_id.in_(company_ids))
+        if start_date:
+            daily_query = daily_query.filter(MoodDailyRollup.date >= start_date)
+        if end_date:
+            daily_query = daily_query.filter(MoodDailyRollup.date <= end_date)
+
+        for row in daily_query.group_by(MoodDailyRollup.date).all():
+            counts = {mood: int(row[index + 1] or 0) for index, mood in enumerate(MOOD_COUNT_COLUMNS)}
+            if not sum(counts.values()):
+                continue
+            date_counts[row[0].isoformat()] = counts
+            for mood, count in counts.items():
+                mood_counts[mood] += count
+        return date_counts
+
+    @staticmethod
+    def _rollup_employee_counts(db: Session, raw_query, company_ids, group_id, start_date, end_date) -> Dict[int, Dict[str, int]]:
+        """Per-employee counts from whole-month rollups plus raw rows for partial edge months."""
+        employee_counts = {}
+
+        # Whole months
+        full_from, full_to, edges = EmployeeMoodRollupService._split_months(start_date, end_date)
+        if full_from is None or full_to is None or full_from <= full_to:
+            employee_query = db.query(
+                MoodEmployeeRollup.employee_id,
+                *[func.sum(getattr(MoodEmployeeRollup, column)) for column in MOOD_COUNT_COLUMNS.values()]
+            ).join(Employee, Employee.id == MoodEmployeeRollup.employee_id).filter(Employee.is_deleted == False)
+            if group_id:
+                employee_query = employee_query.filter(MoodEmployeeRollup.group_id == group_id)
+            else:
+                employee_query = employee_query.filter(MoodEmployeeRollup.company_id.in_(company_ids))
+            if full_from:
+                employee_query = employee_query.filter(MoodEmployeeRollup.month >= full_from)
+            if full_to:
+                employee_query = employee_query.filter(MoodEmployeeRollup.month <= full_to)
+
+            for row in employee_query.group_by(MoodEmployeeRollup.employee_id).order_by(MoodEmployeeRollup.employee_id).all():
+                counts = {mood: int(row[index + 1] or 0) for index, mood in enumerate(MOOD_COUNT_COLUMNS)}
+                if sum(counts.values()):
+                    employee_counts[row[0]] = counts
+
+        # Partial months at the edges of the range
+        for edge_start, edge_end in edges:
+            edge_rows = raw_query.filter(MoodCheck.date >= edge_start, MoodCheck.date <= edge_end).with_entities(
+                MoodCheck.employee_id, MoodCheck.mood, func.count(MoodCheck.id)
+            ).group_by(MoodCheck.employee_id, MoodCheck.mood).all()
+            for employee_id, mood, count in edge_rows:
+                if mood not in MOOD_COUNT_COLUMNS:
+                    continue
+                if employee_id not in employee_counts:
+                    employee_counts[employee_id] = {'1': 0, '2': 0, '3': 0, '4': 0}
+                employee_counts[employee_id][mood] += count
+
+        return employee_counts
+
+    @staticmethod
+    def _split_months(start_date: Optional[date], end_date: Optional[date]):
+        """Split [start_date, end_date] into a whole-month span and partial edge ranges.
+
+        Returns (full_from, full_to, edges) where full_from/full_to bound the month starts
+        (None = unbounded) and edges lists the (start, end) date ranges outside whole months.
+        """
+        edges = []
+        full_from = start_date
+        full_to = end_date
+
+        if start_date and start_date.day != 1:
+            next_month = _next_month(start_date)
+            if end_date and end_date < next_month:
+                # The whole range sits inside one partial month
+                return date.max, date.min, [(start_date, end_date)]
+            edges.append((start_date, next_month - timedelta(days=1)))
+            full_from = next_month
+
+        if end_date and _next_month(end_date) - timedelta(days=1) != end_date:
+            month_start = end_date.replace(day=1)
+            edges.append((month_start, end_date))
+            full_to = month_start - timedelta(days=1)
+
+        return full_from, full_to, edges
+
+    @staticmethod
+    def rebuild_rollups(db: Session, company_ids: Optional[List[int]] = None, start_date: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Recompute the rollups from raw MoodCheck rows and mark the companies as covered.
+        start_date is moved back to the first of its month so monthly rollups stay whole.
+        """
+        try:
+            if start_date:
+                start_date = start_date.replace(day=1)
+
+            if company_ids is None:
+                company_ids = [row[0] for row in db.query(Employee.company_id).filter(Employee.company_id.isnot(None)).distinct().all()]
+            if not company_ids:
+                return {"companies": 0, "daily_rows": 0, "employee_rows": 0}
+
+            daily_delete = db.query(MoodDailyRollup).filter(MoodDailyRollup.company_id.in_(company_ids))
+            employee_delete = db.query(MoodEmployeeRollup).filter(MoodEmployeeRollup.company_id.in_(company_ids))
+            if start_date:
+                daily_delete = daily_delete.filter(MoodDailyRollup.date >= start_date)
+                employee_delete = employee_delete.filter(MoodEmployeeRollup.month >= start_date)
+            daily_delete.delete(synchronize_session=False)
+            employee_delete.delete(synchronize_session=False)
+
+            group_expr = func.coalesce(Employee.group_id, 0)
+            month_expr = cast(func.date_trunc('month', MoodCheck.date), Date)
+            counters = _counter_sums()
+            filters = [Employee.company_id.in_(company_ids), Employee.is_deleted == False]
+            if start_date:
+                filters.append(MoodCheck.date >= start_date)
+
+            daily_select = select(Employee.company_id, group_expr, MoodCheck.date, *counters).join(
+                Employee, Employee.id == MoodCheck.employee_id
+            ).where(*filters).group_by(Employee.company_id, group_expr, MoodCheck.date)
+            daily_result = db.execute(insert(MoodDailyRollup).from_select(
+                ['company_id', 'group_id', 'date'] + COUNTER_COLUMNS, daily_select
+            ))
+
+            employee_select = select(Employee.company_id, group_expr, MoodCheck.employee_id, month_expr, *counters).join(
+                Employee, Employee.id == MoodCheck.employee_id
+            ).where(*filters).group_by(Employee.company_id, group_expr, MoodCheck.employee_id, month_expr)
+            employee_result = db.execute(insert(MoodEmployeeRollup).from_select(
+                ['company_id', 'group_id', 'employee_id', 'month'] + COUNTER_COLUMNS, employee_select
+            ))
+
+            for company_id in set(company_ids):
+                state = db.query(MoodRollupState).filter(MoodRollupState.company_id == company_id).first()
+                if state is None:
+                    db.add(MoodRollupState(company_id=company_id, covered_from=start_date))
+                    continue
+                # Keep an earlier covered_from; months before start_date were left untouched
+                if start_date is None or (state.covered_from is not None and start_date < state.covered_from):
+                    state.covered_from = start_date
+                state.rebuilt_at = datetime.now()
+
+            # Groups of the rebuilt companies, for invalidating cached group statistics
+            group_ids = [row[0] for row in db.query(Employee.group_id).filter(
+                Employee.company_id.in_(company_ids), Employee.group_id.isnot(None)
+            ).distinct().all()]
+
+            db.commit()
+
+            # The bulk insert bypasses the MoodCheck events that normally invalidate the cache
+            for company_id in set(company_ids):
+                mood_statistics_cache.invalidate(company_id)
+            for group_id in group_ids:
+                mood_statistics_cache.invalidate(group_id=group_id)
+
+            return {
+                "companies": len(set(company_ids)),
+                "daily_rows": daily_result.rowcount,
+                "employee_rows": employee_result.rowcount
+            }
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Error rebuilding mood rollups: {str(e)}")
+
+
+def _previous_value(target, attribute: str):
+    history = get_history(target, attribute)
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+@event.listens_for(MoodCheck, "after_insert")
+def _rollup_mood_check_insert(mapper, connection, target):
+    EmployeeMoodRollupService.apply_mood_check_delta(
+        connection, target.employee_id, target.date, target.mood, _has_comment(target.comments), 1
+    )
+
+
+@event.listens_for(MoodCheck, "after_update")
+def _rollup_mood_check_update(mapper, connection, target):
+    old = {attribute: _previous_value(target, attribute) for attribute in ('employee_id', 'date', 'mood', 'comments')}
+    key_changed = any(old[attribute] != getattr(target, attribute) for attribute in ('employee_id', 'date', 'mood'))
+
+    if key_changed:
+        EmployeeMoodRollupService.apply_mood_check_delta(
+            connection, old['employee_id'], old['date'], old['mood'], _has_comment(old['comments']), -1
+        )
+        EmployeeMoodRollupService.apply_mood_check_delta(
+            connection, target.employee_id, target.date, target.mood, _has_comment(target.comments), 1
+        )
+    elif _has_comment(old['comments']) != _has_comment(target.comments):
+        EmployeeMoodRollupService.apply_comment_delta(
+            connection, target.employee_id, target.date, 1 if _has_comment(target.comments) else -1
+        )
+
+
+@event.listens_for(MoodCheck, "after_delete")
+def _rollup_mood_check_delete(mapper, connection, target):
+    EmployeeMoodRollupService.apply_mood_check_delta(
+        connection, target.employee_id, target.date, target.mood, _has_comment(target.comments), -1
+    )
+
+
+def _rollup_scope(company_id, group_id, is_deleted) -> Optional[Tuple[int, int]]:
+    if company_id is None or is_deleted:
+        return None
+    return company_id, group_id or 0
+
+
+@event.listens_for(Employee, "after_update")
+def _rollup_employee_update(mapper, connection, target):
+    old_scope = _rollup_scope(*(_previous_value(target, attribute) for attribute in ('company_id', 'group_id', 'is_deleted')))
+    new_scope = _rollup_scope(target.company_id, target.group_id, target.is_deleted)
+    EmployeeMoodRollupService.move_employee_counts(connection, target.id, old_scope, new_scope)
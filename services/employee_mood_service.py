@@ -1,8 +1,19 @@
+import json
 from sqlalchemy.orm import Session
 from typing import Optional, List, Dict, Any
 from datetime import date
 from Files.SQLAlchemyModels import MoodCheck, Employee
-from sqlalchemy import func
+from sqlalchemy import func, or_, tuple_, case, cast, select, Float, Integer, String
+from utils.mood_statistics import MoodHistogram, linear_trend_slope
+from utils.pagination import encode_cursor, decode_cursor
+from services.employee_mood_rollup_service import EmployeeMoodRollupService
+
+# Trend bucket sizes accepted by get_mood_check_statistics and their payload labels
+TREND_GRANULARITIES = {"day": "daily", "week": "weekly", "month": "monthly"}
+# Payload sections of get_mood_check_statistics, in payload order ("filter" is always included)
+STATISTICS_SECTIONS = ("summary", "mood_distribution", "statistics", "trend", "outliers", "date_wise", "employee_wise", "risk_analysis")
+# Sort keys accepted by get_employee_mood_page and stream_employee_mood_ndjson
+EMPLOYEE_SORT_KEYS = ("average_mood", "total_checks")
 
 class EmployeeMoodService:
     
@@ -57,250 +68,584 @@ class EmployeeMoodService:
             raise Exception(f"Error adding comment to mood record: {str(e)}")
     
     @staticmethod
-    def get_mood_check_statistics(db: Session, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
-        """Get mood statistics with raw values for dashboards and visualization."""
+    def get_mood_check_statistics(db: Session, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, aggregate_in_db: bool = False, use_rollups: bool = True, granularity: str = "day", rolling_window: Optional[int] = None, sections: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Get mood statistics with raw values for dashboards and visualization.
+        
+        When aggregate_in_db is True the per-mood, per-date and per-employee counts are
+        grouped by the database instead of loading every MoodCheck row into Python.
+        When use_rollups is True and the mood rollups cover the request, the counts are
+        read from the rollup tables instead of mood_checks.
+        granularity ("day", "week" or "month") sets the bucket size of trend and date_wise,
+        and rolling_window adds a moving average over that many buckets; both are
+        computed by the database.
+        sections limits the payload to some of STATISTICS_SECTIONS; per-date counts are
+        only built for trend/date_wise by day and per-employee counts only for
+        employee_wise/risk_analysis, and summary/mood_distribution/statistics/outliers
+        alone are served by a single aggregate query.
+        """
         try:
+            if granularity not in TREND_GRANULARITIES:
+                raise ValueError(f"Unsupported granularity: {granularity}")
+            if rolling_window is not None and rolling_window < 1:
+                raise ValueError("rolling_window must be at least 1")
+            if sections is not None:
+                unknown = set(sections) - set(STATISTICS_SECTIONS)
+                if unknown:
+                    raise ValueError(f"Unsupported sections: {', '.join(sorted(unknown))}")
+            else:
+                sections = STATISTICS_SECTIONS
+            needs_dates = "trend" in sections or "date_wise" in sections
+            needs_employees = "employee_wise" in sections or "risk_analysis" in sections
+            
             # Normalize company_ids to list
             if company_ids is not None and not isinstance(company_ids, list):
                 company_ids = [company_ids]
             
-            if group_id:
-                employees = db.query(Employee).filter(Employee.group_id == group_id, Employee.is_deleted == False).all()
-            elif company_ids:
-                employees = db.query(Employee).filter(Employee.company_id.in_(company_ids), Employee.is_deleted == False).all()
-            else:
+            employee_filters = EmployeeMoodService._employee_scope_filters(company_ids, group_id)
+            if employee_filters is None:
                 return {"total_records": 0, "message": "No filter criteria provided"}
             
-            if not employees:
+            total_employees = db.query(func.count(Employee.id)).filter(*employee_filters).scalar()
+            
+            if not total_employees:
                 return {"total_records": 0, "message": "No employees found"}
             
-            employee_ids = [emp.id for emp in employees]
-            query = db.query(MoodCheck).filter(MoodCheck.employee_id.in_(employee_ids))
+            query = EmployeeMoodService._scoped_mood_query(db, employee_filters, start_date, end_date)
             
-            if start_date:
-                query = query.filter(MoodCheck.date >= start_date)
-            if end_date:
-                query = query.filter(MoodCheck.date <= end_date)
+            # Week/month buckets and rolling averages replace the per-date counts
+            needs_buckets = needs_dates and (granularity != "day" or bool(rolling_window))
+            by_date = needs_dates and not needs_buckets
+            by_employee = needs_employees
             
-            records = query.all()
+            overview = None
+            if not by_date and not by_employee:
+                # The remaining sections only need the overall counts
+                mood_counts, overview = EmployeeMoodService._summary_mood_counts(query)
+                date_counts = employee_counts = None
+            else:
+                counts = None
+                if use_rollups:
+                    counts = EmployeeMoodRollupService.get_rollup_mood_counts(db, query, company_ids, group_id, start_date, end_date, by_date, by_employee)
+                if counts is None and aggregate_in_db:
+                    counts = EmployeeMoodService._aggregate_mood_counts_in_db(query, by_date, by_employee)
+                elif counts is None:
+                    counts = EmployeeMoodService._aggregate_mood_counts(query.all(), by_date, by_employee)
+                mood_counts, date_counts, employee_counts = counts
+                if "summary" in sections and not (by_date and by_employee):
+                    # Participation and date range without building the skipped counts
+                    overview = EmployeeMoodService._summary_mood_counts(query)[1]
+            
+            buckets = None
+            if needs_buckets:
+                buckets = EmployeeMoodService._bucketed_mood_counts(query, granularity, rolling_window)
+            
+            filters = EmployeeMoodService._filter_block(company_ids, group_id, start_date, end_date)
+            if buckets is not None:
+                filters["granularity"] = granularity
+                filters["rolling_window"] = rolling_window
+            
+            return EmployeeMoodService._build_statistics_payload(
+                mood_counts, date_counts, employee_counts, total_employees, filters,
+                buckets, granularity, rolling_window, sections, overview
+            )
             
-            if not records:
-                return {"total_records": 0, "message": "No mood data found", "employee_count": len(employee_ids)}
+        except Exception as e:
+            raise Exception(f"Error getting mood statistics: {str(e)}")
+    
+    @staticmethod
+    def get_mood_check_statistics_batch(db: Session, company_ids: Optional[List[int]] = None, group_ids: Optional[List[int]] = None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+        """Get mood statistics for many companies and/or groups in one pass over mood_checks.
+        
+        Returns a dict keyed by "company:<id>" and "group:<id>"; every value has the same
+        shape as get_mood_check_statistics for that single company or group.
+        """
+        try:
+            if company_ids is not None and not isinstance(company_ids, list):
+                company_ids = [company_ids]
+            if group_ids is not None and not isinstance(group_ids, list):
+                group_ids = [group_ids]
+            company_ids = sorted(set(company_ids or []))
+            group_ids = sorted(set(group_ids or []))
+            
+            scope_filters = []
+            if company_ids:
+                scope_filters.append(Employee.company_id.in_(company_ids))
+            if group_ids:
+                scope_filters.append(Employee.group_id.in_(group_ids))
+            if not scope_filters:
+                return {}
+            employee_filters = [or_(*scope_filters), Employee.is_deleted == False]
+            
+            company_set, group_set = set(company_ids), set(group_ids)
+            
+            def tenant_keys(company_id, group_id):
+                keys = []
+                if company_id in company_set:
+                    keys.append(f"company:{company_id}")
+                if group_id in group_set:
+                    keys.append(f"group:{group_id}")
+                return keys
+            
+            tenants = {f"company:{company_id}": {} for company_id in company_ids}
+            tenants.update({f"group:{group_id}": {} for group_id in group_ids})
+            for counts in tenants.values():
+                counts.update(employees=0, moods=EmployeeMoodService._empty_mood_counts(), dates={}, by_employee={})
+            
+            # Employee totals for every tenant from one grouped count
+            employee_rows = db.query(
+                Employee.company_id, Employee.group_id, func.count(Employee.id)
+            ).filter(*employee_filters).group_by(Employee.company_id, Employee.group_id).all()
+            for company_id, group_id, count in employee_rows:
+                for key in tenant_keys(company_id, group_id):
+                    tenants[key]["employees"] += count
+            
+            # Per-date and per-employee counts come out of a single scan via GROUPING SETS
+            query = EmployeeMoodService._scoped_mood_query(db, employee_filters, start_date, end_date)
+            mood_rows = query.with_entities(
+                Employee.company_id, Employee.group_id, MoodCheck.date, MoodCheck.employee_id, MoodCheck.mood,
+                func.grouping(MoodCheck.employee_id), func.count(MoodCheck.id)
+            ).group_by(func.grouping_sets(
+                tuple_(Employee.company_id, Employee.group_id, MoodCheck.date, MoodCheck.mood),
+                tuple_(Employee.company_id, Employee.group_id, MoodCheck.employee_id, MoodCheck.mood)
+            )).order_by(MoodCheck.employee_id).all()
+            
+            for company_id, group_id, mood_date, employee_id, mood, by_date, count in mood_rows:
+                if mood not in ('1', '2', '3', '4'):
+                    continue
+                for key in tenant_keys(company_id, group_id):
+                    counts = tenants[key]
+                    if by_date:
+                        counts["moods"][mood] += count
+                        if mood_date:
+                            date_str = mood_date.isoformat()
+                            if date_str not in counts["dates"]:
+                                counts["dates"][date_str] = EmployeeMoodService._empty_mood_counts()
+                            counts["dates"][date_str][mood] += count
+                    else:
+                        if employee_id not in counts["by_employee"]:
+                            counts["by_employee"][employee_id] = EmployeeMoodService._empty_mood_counts()
+                        counts["by_employee"][employee_id][mood] += count
+            
+            results = {}
+            for key, counts in tenants.items():
+                if not counts["employees"]:
+                    results[key] = {"total_records": 0, "message": "No employees found"}
+                    continue
+                scope, tenant_id = key.split(":")
+                filters = EmployeeMoodService._filter_block(
+                    [int(tenant_id)] if scope == "company" else None,
+                    int(tenant_id) if scope == "group" else None,
+                    start_date, end_date
+                )
+                results[key] = EmployeeMoodService._build_statistics_payload(
+                    counts["moods"], counts["dates"], counts["by_employee"], counts["employees"], filters
+                )
+            return results
             
-            # Aggregate data
-            mood_counts = {'1': 0, '2': 0, '3': 0, '4': 0}  # 1=Great, 2=Good, 3=Okay, 4=Not so good
-            date_moods = {}
-            employee_moods = {}
-            mood_values = []
+        except Exception as e:
+            raise Exception(f"Error getting batch mood statistics: {str(e)}")
+    
+    @staticmethod
+    def get_employee_mood_page(db: Session, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, sort_by: str = "average_mood", descending: bool = True, limit: int = 50, cursor: Optional[str] = None, at_risk_only: bool = False) -> Dict[str, Any]:
+        """One page of the employee_wise section, sorted by average_mood or total_checks.
+        
+        Pages use keyset cursors on (sort value, employee_id): pass the returned
+        next_cursor to get the following page. at_risk_only limits the rows to
+        employees averaging Okay or worse (risk_analysis.employees_at_risk_ids).
+        """
+        try:
+            if not 1 <= limit <= 1000:
+                raise ValueError("limit must be between 1 and 1000")
             
-            for rec in records:
-                mood_counts[rec.mood] = mood_counts.get(rec.mood, 0) + 1
-                date_str = rec.date.isoformat() if rec.date else None
-                
-                if date_str:
-                    if date_str not in date_moods:
-                        date_moods[date_str] = {'moods': [], 'counts': {'1': 0, '2': 0, '3': 0, '4': 0}}
-                    date_moods[date_str]['moods'].append(int(rec.mood))
-                    date_moods[date_str]['counts'][rec.mood] += 1
-                
-                if rec.employee_id not in employee_moods:
-                    employee_moods[rec.employee_id] = {'moods': [], 'mood_counts': {'1': 0, '2': 0, '3': 0, '4': 0}}
-                employee_moods[rec.employee_id]['moods'].append(int(rec.mood))
-                employee_moods[rec.employee_id]['mood_counts'][rec.mood] += 1
-                
-                try:
-                    mood_values.append(int(rec.mood))
-                except:
-                    pass
-            
-            if not mood_values:
-                return {"total_records": len(records), "message": "No valid mood data"}
-            
-            import numpy as np
-            from scipy import stats as scipy_stats
-            
-            mood_array = np.array(mood_values)
-            
-            # Calculate statistics
-            mean_mood = float(np.mean(mood_array))
-            median_mood = float(np.median(mood_array))
-            mode_result = scipy_stats.mode(mood_array, keepdims=True)
-            mode_mood = int(mode_result.mode[0])
-            std_mood = float(np.std(mood_array, ddof=1))
-            variance = float(np.var(mood_array, ddof=1))
-            min_mood = int(np.min(mood_array))
-            max_mood = int(np.max(mood_array))
-            
-            # Percentiles
-            q1 = float(np.percentile(mood_array, 25))
-            q2 = float(np.percentile(mood_array, 50))
-            q3 = float(np.percentile(mood_array, 75))
-            iqr = q3 - q1
+            statement = EmployeeMoodService._employee_mood_statement(db, company_ids, group_id, start_date, end_date, sort_by, descending, at_risk_only, cursor)
+            if statement is None:
+                return {"employees": [], "next_cursor": None, "message": "No filter criteria provided"}
             
-            # Distribution percentages (1=Great, 2=Good, 3=Okay, 4=Not so good)
-            mood_1_pct = (mood_counts.get('1', 0) / len(records)) * 100  # Great
-            mood_2_pct = (mood_counts.get('2', 0) / len(records)) * 100  # Good
-            mood_3_pct = (mood_counts.get('3', 0) / len(records)) * 100  # Okay
-            mood_4_pct = (mood_counts.get('4', 0) / len(records)) * 100  # Not so good
+            rows = db.execute(statement.limit(limit + 1)).mappings().all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor([sort_by, rows[-1][sort_by], rows[-1]["employee_id"]])
             
+            return {
+                "employees": [EmployeeMoodService._employee_entry(row) for row in rows],
+                "next_cursor": next_cursor,
+                "sort_by": sort_by,
+                "descending": descending,
+                "limit": limit
+            }
+            
+        except Exception as e:
+            raise Exception(f"Error getting employee mood page: {str(e)}")
+    
+    @staticmethod
+    def stream_employee_mood_ndjson(db: Session, company_ids: Optional[List[int]] = None, group_id: Optional[int] = None, start_date: Optional[date] = None, end_date: Optional[date] = None, sort_by: str = "average_mood", descending: bool = True, at_risk_only: bool = False, batch_size: int = 500):
+        """Yield every employee_wise row as an NDJSON line, fetched batch_size rows at a time."""
+        try:
+            statement = EmployeeMoodService._employee_mood_statement(db, company_ids, group_id, start_date, end_date, sort_by, descending, at_risk_only)
+            if statement is None:
+                return
+            
+            result = db.execute(statement.execution_options(yield_per=batch_size))
+            for row in result.mappings():
+                yield json.dumps(EmployeeMoodService._employee_entry(row)) + "\n"
+                
+        except Exception as e:
+            raise Exception(f"Error streaming employee moods: {str(e)}")
+    
+    @staticmethod
+    def _employee_mood_statement(db: Session, company_ids=None, group_id=None, start_date: Optional[date] = None, end_date: Optional[date] = None, sort_by: str = "average_mood", descending: bool = True, at_risk_only: bool = False, cursor: Optional[str] = None):
+        """Ordered select of per-employee mood counts and averages, or None without filters."""
+        if sort_by not in EMPLOYEE_SORT_KEYS:
+            raise ValueError(f"Unsupported sort_by: {sort_by}")
+        if company_ids is not None and not isinstance(company_ids, list):
+            company_ids = [company_ids]
+        
+        employee_filters = EmployeeMoodService._employee_scope_filters(company_ids, group_id)
+        if employee_filters is None:
+            return None
+        
+        mood_value = cast(cast(MoodCheck.mood, String), Integer)
+        summary = EmployeeMoodService._scoped_mood_query(db, employee_filters, start_date, end_date).with_entities(
+            MoodCheck.employee_id.label("employee_id"),
+            func.count(MoodCheck.id).label("total_checks"),
+            *[func.count(case((MoodCheck.mood == mood, 1))).label(f"mood_{mood}") for mood in ('1', '2', '3', '4')],
+            (cast(func.sum(mood_value), Float) / func.count(MoodCheck.id)).label("average_mood")
+        ).group_by(MoodCheck.employee_id).subquery()
+        
+        sort_key = tuple_(summary.c[sort_by], summary.c.employee_id)
+        statement = select(summary)
+        if at_risk_only:
+            statement = statement.where(summary.c.average_mood >= 3.0)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != 3 or values[0] != sort_by:
+                raise ValueError(f"Cursor does not match sort_by={sort_by}")
+            last_key = tuple_(*values[1:])
+            statement = statement.where(sort_key < last_key if descending else sort_key > last_key)
+        
+        if descending:
+            return statement.order_by(summary.c[sort_by].desc(), summary.c.employee_id.desc())
+        return statement.order_by(summary.c[sort_by], summary.c.employee_id)
+    
+    @staticmethod
+    def _employee_entry(row) -> Dict[str, Any]:
+        """An employee_wise entry from a _employee_mood_statement row."""
+        return {
+            "employee_id": row["employee_id"],
+            "total_checks": row["total_checks"],
+            "average_mood": round(row["average_mood"], 2),
+            "mood_counts": {mood: row[f"mood_{mood}"] for mood in ('1', '2', '3', '4')},
+            "is_at_risk": row["average_mood"] >= 3.0  # At risk if average is Okay or worse
+        }
+    
+    @staticmethod
+    def _filter_block(company_ids=None, group_id=None, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict[str, Any]:
+        return {
+            "company_ids": company_ids,
+            "group_id": group_id,
+            "start_date": start_date.isoformat() if start_date else None,
+            "end_date": end_date.isoformat() if end_date else None
+        }
+    
+    @staticmethod
+    def _build_statistics_payload(mood_counts: Dict[str, int], date_counts: Optional[Dict[str, Dict[str, int]]], employee_counts: Optional[Dict[int, Dict[str, int]]], total_employees: int, filters: Dict[str, Any], buckets: Optional[List[Dict[str, Any]]] = None, granularity: str = "day", rolling_window: Optional[int] = None, sections: Optional[List[str]] = None, overview: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Statistics payload from overall, per-date and per-employee mood counts.
+        
+        When buckets (from _bucketed_mood_counts) are given, trend and date_wise are
+        built from them instead of from the per-date counts. Only the requested
+        sections are built; when date_counts/employee_counts were skipped, overview
+        supplies employees_participated and the date range for the summary.
+        """
+        sections = STATISTICS_SECTIONS if sections is None else sections
+        total_records = sum(mood_counts.values())
+        
+        if not total_records:
+            return {"total_records": 0, "message": "No mood data found", "employee_count": total_employees}
+        
+        payload = {}
+        
+        if "summary" in sections:
+            if overview is None:
+                # Participation and date range come from the same per-employee and per-date counts
+                overview = {
+                    "employees_participated": len(employee_counts),
+                    "start": min(date_counts) if date_counts else None,
+                    "end": max(date_counts) if date_counts else None
+                }
+            participated = overview["employees_participated"]
+            payload["summary"] = {
+                "total_records": total_records,
+                "total_employees": total_employees,
+                "employees_participated": participated,
+                "employees_not_participated": total_employees - participated,
+                "participation_rate": round((participated / total_employees) * 100, 2),
+                "date_range": {
+                    "start": overview["start"],
+                    "end": overview["end"]
+                }
+            }
+        
+        if "mood_distribution" in sections:
+            # Distribution percentages (1=Great, 2=Good, 3=Okay, 4=Not so good)
+            payload["mood_distribution"] = {
+                "counts": mood_counts,
+                "percentages": {
+                    "mood_1": round((mood_counts.get('1', 0) / total_records) * 100, 2),  # Great
+                    "mood_2": round((mood_counts.get('2', 0) / total_records) * 100, 2),  # Good
+                    "mood_3": round((mood_counts.get('3', 0) / total_records) * 100, 2),  # Okay
+                    "mood_4": round((mood_counts.get('4', 0) / total_records) * 100, 2)   # Not so good
+                },
+                "labels": {
+                    "1": "Great",
+                    "2": "Good",
+                    "3": "Okay",
+                    "4": "Not so good"
+                }
+            }
+        
+        # Overall statistics come straight from the 4-bin mood histogram
+        if "statistics" in sections:
+            payload["statistics"] = MoodHistogram(mood_counts).statistics_block()
+        
+        if "trend" in sections or "date_wise" in sections:
+            # Trend series: per-date counts by default, or SQL-computed week/month buckets
+            if buckets is None:
+                series = [
+                    {"date": d, "mood_counts": date_counts[d], "average_mood": MoodHistogram(date_counts[d]).mean()}
+                    for d in sorted(date_counts.keys())
+                ]
+            else:
+                series = buckets
+        
+        if "trend" in sections:
             # Trend calculation (lower mood = better, so negative slope = worsening, positive = improving)
             trend_slope = 0
             trend_direction = "stable"
-            daily_averages = {}
-            
-            if len(date_moods) >= 3:
-                sorted_dates = sorted(date_moods.keys())
-                daily_avgs = []
-                for d in sorted_dates:
-                    avg = np.mean(date_moods[d]['moods'])
-                    daily_averages[d] = round(float(avg), 2)
-                    daily_avgs.append(avg)
-                
-                if len(daily_avgs) > 1:
-                    trend_slope = float(np.polyfit(range(len(daily_avgs)), daily_avgs, 1)[0])
-                    # Since higher mood number = worse, positive slope = worsening
-                    if trend_slope > 0.05:
-                        trend_direction = "worsening"
-                    elif trend_slope < -0.05:
-                        trend_direction = "improving"
-            else:
-                for d, data in date_moods.items():
-                    daily_averages[d] = round(float(np.mean(data['moods'])), 2)
-            
+            bucket_averages = {point["date"]: round(float(point["average_mood"]), 2) for point in series}
+            
+            if len(series) >= 3:
+                # Slope per bucket (per day by default); higher mood number = worse, positive slope = worsening
+                trend_slope = linear_trend_slope([point["average_mood"] for point in series])
+                if trend_slope > 0.05:
+                    trend_direction = "worsening"
+                elif trend_slope < -0.05:
+                    trend_direction = "improving"
+            
+            trend = {
+                "direction": trend_direction,
+                "slope": round(trend_slope, 4),
+                f"{TREND_GRANULARITIES[granularity]}_averages": bucket_averages
+            }
+            if buckets is not None:
+                trend["granularity"] = granularity
+            if rolling_window:
+                trend["rolling_window"] = rolling_window
+                trend["rolling_averages"] = {point["date"]: round(float(point["rolling_average"]), 2) for point in series}
+            payload["trend"] = trend
+        
+        if "outliers" in sections:
+            payload["outliers"] = MoodHistogram(mood_counts).outliers_block()
+        
+        if "date_wise" in sections:
+            # Format date-wise (or bucket-wise) data for dashboard
+            date_wise_data = []
+            for point in series:
+                counts = point["mood_counts"]
+                total_responses = sum(counts.values())
+                entry = {
+                    "date": point["date"],
+                    "average_mood": round(point["average_mood"], 2),
+                    "total_responses": total_responses,
+                    "mood_counts": counts,
+                    "mood_1_pct": round((counts['1'] / total_responses) * 100, 1),  # Great
+                    "mood_2_pct": round((counts['2'] / total_responses) * 100, 1),  # Good
+                    "mood_3_pct": round((counts['3'] / total_responses) * 100, 1),  # Okay
+                    "mood_4_pct": round((counts['4'] / total_responses) * 100, 1)   # Not so good
+                }
+                if rolling_window:
+                    entry["rolling_average"] = round(float(point["rolling_average"]), 2)
+                date_wise_data.append(entry)
+            payload["date_wise"] = date_wise_data
+        
+        if "employee_wise" in sections or "risk_analysis" in sections:
             # Employee-level analysis (higher mood = worse, so at risk if >= 3.0)
             employee_stats = []
             employees_at_risk_ids = []
+            build_rows = "employee_wise" in sections
             
-            for emp_id, data in employee_moods.items():
-                emp_mean = float(np.mean(data['moods']))
+            for emp_id, counts in employee_counts.items():
+                emp_mean = MoodHistogram(counts).mean()
                 is_at_risk = emp_mean >= 3.0  # At risk if average is Okay or worse
-                employee_stats.append({
-                    "employee_id": emp_id,
-                    "total_checks": len(data['moods']),
-                    "average_mood": round(emp_mean, 2),
-                    "mood_counts": data['mood_counts'],
-                    "is_at_risk": is_at_risk
-                })
+                if build_rows:
+                    employee_stats.append({
+                        "employee_id": emp_id,
+                        "total_checks": sum(counts.values()),
+                        "average_mood": round(emp_mean, 2),
+                        "mood_counts": counts,
+                        "is_at_risk": is_at_risk
+                    })
                 if is_at_risk:
                     employees_at_risk_ids.append(emp_id)
             
-            # Skewness and Kurtosis
-            skewness = float(scipy_stats.skew(mood_array)) if len(mood_array) >= 3 else None
-            kurtosis = float(scipy_stats.kurtosis(mood_array)) if len(mood_array) >= 3 else None
-            
-            # Outliers
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            outliers = mood_array[(mood_array < lower_bound) | (mood_array > upper_bound)]
-            outlier_values = [int(x) for x in outliers.tolist()]
-            
-            # Date range
-            date_range_query = db.query(
-                func.min(MoodCheck.date).label('earliest'),
-                func.max(MoodCheck.date).label('latest')
-            ).filter(MoodCheck.employee_id.in_(employee_ids))
-            
-            if start_date:
-                date_range_query = date_range_query.filter(MoodCheck.date >= start_date)
-            if end_date:
-                date_range_query = date_range_query.filter(MoodCheck.date <= end_date)
-            
-            date_range_result = date_range_query.first()
-            
-            # Format date-wise data for dashboard
-            date_wise_data = []
-            for date_str in sorted(date_moods.keys()):
-                data = date_moods[date_str]
-                date_wise_data.append({
-                    "date": date_str,
-                    "average_mood": round(float(np.mean(data['moods'])), 2),
-                    "total_responses": len(data['moods']),
-                    "mood_counts": data['counts'],
-                    "mood_1_pct": round((data['counts']['1'] / len(data['moods'])) * 100, 1),  # Great
-                    "mood_2_pct": round((data['counts']['2'] / len(data['moods'])) * 100, 1),  # Good
-                    "mood_3_pct": round((data['counts']['3'] / len(data['moods'])) * 100, 1),  # Okay
-                    "mood_4_pct": round((data['counts']['4'] / len(data['moods'])) * 100, 1)   # Not so good
-                })
-            
-            return {
-                "summary": {
-                    "total_records": len(records),
-                    "total_employees": len(employee_ids),
-                    "employees_participated": len(employee_moods),
-                    "employees_not_participated": len(employee_ids) - len(employee_moods),
-                    "participation_rate": round((len(employee_moods) / len(employee_ids)) * 100, 2),
-                    "date_range": {
-                        "start": date_range_result.earliest.isoformat() if date_range_result and date_range_result.earliest else None,
-                        "end": date_range_result.latest.isoformat() if date_range_result and date_range_result.latest else None
-                    }
-                },
-                "mood_distribution": {
-                    "counts": mood_counts,
-                    "percentages": {
-                        "mood_1": round(mood_1_pct, 2),  # Great
-                        "mood_2": round(mood_2_pct, 2),  # Good
-                        "mood_3": round(mood_3_pct, 2),  # Okay
-                        "mood_4": round(mood_4_pct, 2)   # Not so good
-                    },
-                    "labels": {
-                        "1": "Great",
-                        "2": "Good",
-                        "3": "Okay",
-                        "4": "Not so good"
-                    }
-                },
-                "statistics": {
-                    "mean": round(mean_mood, 2),
-                    "median": round(median_mood, 2),
-                    "mode": mode_mood,
-                    "std_deviation": round(std_mood, 4),
-                    "variance": round(variance, 4),
-                    "min": min_mood,
-                    "max": max_mood,
-                    "range": max_mood - min_mood,
-                    "quartiles": {
-                        "q1": round(q1, 2),
-                        "q2": round(q2, 2),
-                        "q3": round(q3, 2)
-                    },
-                    "iqr": round(iqr, 2),
-                    "percentiles": {
-                        "p10": round(float(np.percentile(mood_array, 10)), 2),
-                        "p25": round(q1, 2),
-                        "p50": round(q2, 2),
-                        "p75": round(q3, 2),
-                        "p90": round(float(np.percentile(mood_array, 90)), 2)
-                    },
-                    "skewness": round(skewness, 4) if skewness is not None else None,
-                    "kurtosis": round(kurtosis, 4) if kurtosis is not None else None
-                },
-                "trend": {
-                    "direction": trend_direction,
-                    "slope": round(trend_slope, 4),
-                    "daily_averages": daily_averages
-                },
-                "outliers": {
-                    "count": len(outlier_values),
-                    "values": outlier_values,
-                    "bounds": {
-                        "lower": round(lower_bound, 2),
-                        "upper": round(upper_bound, 2)
-                    }
-                },
-                "date_wise": date_wise_data,
-                "employee_wise": employee_stats,
-                "risk_analysis": {
+            if build_rows:
+                payload["employee_wise"] = employee_stats
+            if "risk_analysis" in sections:
+                payload["risk_analysis"] = {
                     "employees_at_risk_count": len(employees_at_risk_ids),
                     "employees_at_risk_ids": employees_at_risk_ids,
-                    "risk_percentage": round((len(employees_at_risk_ids) / len(employee_moods)) * 100, 2) if len(employee_moods) > 0 else 0
-                },
-                "filter": {
-                    "company_ids": company_ids,
-                    "group_id": group_id,
-                    "start_date": start_date.isoformat() if start_date else None,
-                    "end_date": end_date.isoformat() if end_date else None
+                    "risk_percentage": round((len(employees_at_risk_ids) / len(employee_counts)) * 100, 2) if len(employee_counts) > 0 else 0
                 }
+        
+        payload["filter"] = filters
+        return payload
+
+    @staticmethod
+    def _employee_scope_filters(company_ids: Optional[List[int]] = None, group_id: Optional[int] = None):
+        """Employee filters for a group or company scope, or None when neither is given."""
+        if group_id:
+            return [Employee.group_id == group_id, Employee.is_deleted == False]
+        if company_ids:
+            return [Employee.company_id.in_(company_ids), Employee.is_deleted == False]
+        return None
+    
+    @staticmethod
+    def _scoped_mood_query(db: Session, employee_filters, start_date: Optional[date] = None, end_date: Optional[date] = None):
+        """MoodCheck query scoped through a join on Employee instead of an employee-ID IN list."""
+        query = db.query(MoodCheck).join(Employee, Employee.id == MoodCheck.employee_id).filter(*employee_filters)
+        if start_date:
+            query = query.filter(MoodCheck.date >= start_date)
+        if end_date:
+            query = query.filter(MoodCheck.date <= end_date)
+        return query
+    
+    @staticmethod
+    def _bucketed_mood_counts(query, granularity: str = "week", rolling_window: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Mood counts and averages per day/week/month bucket, oldest first.
+        
+        Buckets come from date_trunc and the moving average from a window function, so
+        only one row per bucket reaches Python.
+        """
+        bucket = func.date_trunc(granularity, MoodCheck.date)
+        mood_value = cast(cast(MoodCheck.mood, String), Integer)
+        bucket_counts = query.with_entities(
+            bucket.label("bucket"),
+            *[func.count(case((MoodCheck.mood == mood, 1))).label(f"mood_{mood}") for mood in ('1', '2', '3', '4')],
+            func.count(MoodCheck.id).label("responses"),
+            func.sum(mood_value).label("mood_sum")
+        ).group_by(bucket).subquery()
+        
+        average = cast(bucket_counts.c.mood_sum, Float) / bucket_counts.c.responses
+        columns = [bucket_counts, average.label("average_mood")]
+        if rolling_window:
+            columns.append(func.avg(average).over(
+                order_by=bucket_counts.c.bucket, rows=(-(rolling_window - 1), 0)
+            ).label("rolling_average"))
+        
+        buckets = []
+        for row in query.session.execute(select(*columns).order_by(bucket_counts.c.bucket)).mappings():
+            point = {
+                "date": row["bucket"].date().isoformat(),
+                "mood_counts": {mood: row[f"mood_{mood}"] for mood in ('1', '2', '3', '4')},
+                "average_mood": row["average_mood"]
             }
-            
-        except Exception as e:
-            raise Exception(f"Error getting mood statistics: {str(e)}")
+            if rolling_window:
+                point["rolling_average"] = row["rolling_average"]
+            buckets.append(point)
+        return buckets
+    
+    @staticmethod
+    def _summary_mood_counts(query):
+        """Mood counts, participation and date range from one aggregate query.
+        
+        Used when no requested section needs per-date or per-employee counts.
+        """
+        row = query.with_entities(
+            *[func.count(case((MoodCheck.mood == mood, 1))) for mood in ('1', '2', '3', '4')],
+            func.count(func.distinct(MoodCheck.employee_id)),
+            func.min(MoodCheck.date),
+            func.max(MoodCheck.date)
+        ).one()
+        
+        mood_counts = dict(zip(('1', '2', '3', '4'), row[:4]))
+        overview = {
+            "employees_participated": row[4],
+            "start": row[5].isoformat() if row[5] else None,
+            "end": row[6].isoformat() if row[6] else None
+        }
+        return mood_counts, overview
+    
+    @staticmethod
+    def _empty_mood_counts() -> Dict[str, int]:
+        return {'1': 0, '2': 0, '3': 0, '4': 0}  # 1=Great, 2=Good, 3=Okay, 4=Not so good
+    
+    @staticmethod
+    def _aggregate_mood_counts(records: List[MoodCheck], by_date: bool = True, by_employee: bool = True):
+        """Count moods overall, per date and per employee from loaded MoodCheck rows.
+        
+        Per-date or per-employee counts that are not asked for are returned as None.
+        """
+        mood_counts = EmployeeMoodService._empty_mood_counts()
+        date_counts = {} if by_date else None
+        employee_counts = {} if by_employee else None
+        
+        for rec in records:
+            if rec.mood not in mood_counts:
+                continue
+            mood_counts[rec.mood] += 1
+            
+            if by_date and rec.date:
+                date_str = rec.date.isoformat()
+                if date_str not in date_counts:
+                    date_counts[date_str] = EmployeeMoodService._empty_mood_counts()
+                date_counts[date_str][rec.mood] += 1
+            
+            if by_employee:
+                if rec.employee_id not in employee_counts:
+                    employee_counts[rec.employee_id] = EmployeeMoodService._empty_mood_counts()
+                employee_counts[rec.employee_id][rec.mood] += 1
+        
+        return mood_counts, date_counts, employee_counts
+    
+    @staticmethod
+    def _aggregate_mood_counts_in_db(query, by_date: bool = True, by_employee: bool = True):
+        """Same counts as _aggregate_mood_counts, grouped by the database.
+        
+        Only the (date, mood) and (employee_id, mood) groups are returned, so the
+        result size depends on days and employees rather than on records; a grouping
+        that is not asked for is not queried.
+        """
+        mood_counts = EmployeeMoodService._empty_mood_counts()
+        date_counts = {} if by_date else None
+        employee_counts = {} if by_employee else None
+        
+        if by_date:
+            date_rows = query.with_entities(
+                MoodCheck.date, MoodCheck.mood, func.count(MoodCheck.id)
+            ).group_by(MoodCheck.date, MoodCheck.mood).all()
+            
+            for mood_date, mood, count in date_rows:
+                if mood not in mood_counts:
+                    continue
+                mood_counts[mood] += count
+                if mood_date:
+                    date_str = mood_date.isoformat()
+                    if date_str not in date_counts:
+                        date_counts[date_str] = EmployeeMoodService._empty_mood_counts()
+                    date_counts[date_str][mood] += count
+        
+        if by_employee:
+            employee_rows = query.with_entities(
+                MoodCheck.employee_id, MoodCheck.mood, func.count(MoodCheck.id)
+            ).group_by(MoodCheck.employee_id, MoodCheck.mood).order_by(MoodCheck.employee_id).all()
+            
+            for employee_id, mood, count in employee_rows:
+                if mood not in mood_counts:
+                    continue
+                if employee_id not in employee_counts:
+                    employee_counts[employee_id] = EmployeeMoodService._empty_mood_counts()
+                employee_counts[employee_id][mood] += count
+                if not by_date:
+                    mood_counts[mood] += count
+        
+        return mood_counts, date_counts, employee_counts
@@ -1,30 +1,63 @@
-import redis
-import json
+from typing import Optional, Tuple
+from services.session_backends import FEEDBACK_ASK, FEEDBACK_ANSWER, FEEDBACK_BUSY, FEEDBACK_CLAIM_TIMEOUT
+from services.session_store import SessionStore, AsyncSessionStore
+from utils.session_keys import SESSION_MAX_MESSAGES
+from utils.session_codec import encode_session_payload, decode_session_payload
 
-class EmployeeMoodSessionService:
-    def __init__(self):
-        # Connect to Redis Cloud server
-        self.redis_client = redis.Redis(
-            host='redis-10661.c17.us-east-1-4.ec2.redns.redis-cloud.com',
-            port=10661,
-            decode_responses=True,
-            username="default",
-            password="RKWH5tuWOhrxTsrAsJucYSCuUjdBXpPa"
-        )
+class EmployeeMoodSessionService(SessionStore):
+    """Mood-check flags, stored in the same per-contact session as EmployeeSessionService."""
     
     def set_employee_asked_user_feedback(self, contact_number: str, asked_feedback: bool):
         """Set asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        value = "1" if asked_feedback else "0"
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "employee_asked_user_feedback", asked_feedback)
     
     def get_employee_asked_user_feedback(self, contact_number: str) -> bool:
         """Get asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "employee_asked_user_feedback")
     
     def clear_employee_asked_user_feedback(self, contact_number: str):
         """Clear asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        self.redis_client.delete(key)
\ No newline at end of file
+        return self._clear_fields(contact_number, "employee_asked_user_feedback")
+
+    def set_employee_asked_user_feedback_many(self, contact_numbers: list, asked_feedback: bool):
+        """Set asked user feedback status for many employees in chunked pipelines"""
+        return self._set_field_many(contact_numbers, "employee_asked_user_feedback", asked_feedback)
+    
+    def get_employee_asked_user_feedback_many(self, contact_numbers: list) -> dict:
+        """Asked user feedback status of many employees, by contact number"""
+        return self._get_field_many(contact_numbers, "employee_asked_user_feedback")
+    
+    def clear_employee_asked_user_feedback_many(self, contact_numbers: list):
+        """Clear asked user feedback status for many employees in chunked pipelines"""
+        return self._clear_fields_many(contact_numbers, "employee_asked_user_feedback")
+    
+    def start_feedback_turn(self, contact_number: str, prompt_message: dict, last_messages: int = SESSION_MAX_MESSAGES) -> Tuple[str, Optional[list]]:
+        """Atomically decide what an incoming mood-check message is (one round trip on Redis).
+        
+        Returns (FEEDBACK_ASK, None) after setting the flag and recording prompt_message,
+        (FEEDBACK_ANSWER, newest last_messages session messages) after claiming the
+        answer, or (FEEDBACK_BUSY, None) while another worker holds the claim.
+        """
+        transition = self.backend.start_feedback_turn(
+            contact_number, encode_session_payload(prompt_message), SESSION_MAX_MESSAGES, last_messages
+        )
+        return self._result(transition, self._decode_feedback_turn)
+    
+    @staticmethod
+    def _decode_feedback_turn(transition) -> Tuple[str, Optional[list]]:
+        state, messages = transition
+        if state == FEEDBACK_ANSWER:
+            return state, [decode_session_payload(msg) for msg in messages]
+        return state, None
+    
+    def release_feedback_answer(self, contact_number: str):
+        """Drop the answer claim so the next message can be handled (e.g. after an error)"""
+        return self.backend.release_feedback_answer(contact_number)
+    
+    def finish_feedback_turn(self, contact_number: str):
+        """Atomically reset the feedback flag, the answer claim and the session messages"""
+        return self.backend.finish_feedback_turn(contact_number)
+
+
+class AsyncEmployeeMoodSessionService(AsyncSessionStore, EmployeeMoodSessionService):
+    """EmployeeMoodSessionService on redis.asyncio: the same methods, each returning an awaitable."""
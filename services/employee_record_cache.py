@@ -0,0 +1,164 @@
+import os
+import threading
+from functools import partial
+from typing import Any, Dict, Optional, Union
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from Files.SQLAlchemyModels import Employee
+from database import run_after_commit
+from utils.contact_numbers import normalize_contact_number
+from utils.ttl_cache import TTLCache
+
+# Employee columns copied into a snapshot (credentials are left out)
+SNAPSHOT_COLUMNS = (
+    "id", "employeeId", "first_name", "middle_name", "last_name", "name", "emailId", "designation",
+    "contactNo", "gender", "company_id", "group_id", "department_id", "role_id", "office_location_id",
+    "work_policy_id", "reporting_manager_id", "reminders", "is_hr", "hr_scope", "is_deleted"
+)
+
+
+def contact_key(contact_number) -> Optional[str]:
+    """Cache key of a contact number: its normalized form, as get_employee_record looks it up."""
+    return normalize_contact_number(contact_number)
+
+
+class EmployeeSnapshot:
+    """Plain copy of an Employee row, safe to share across sessions and threads."""
+    __slots__ = SNAPSHOT_COLUMNS
+
+    def __init__(self, **values):
+        for column in SNAPSHOT_COLUMNS:
+            setattr(self, column, values.get(column))
+
+    @classmethod
+    def from_employee(cls, employee: Employee) -> "EmployeeSnapshot":
+        return cls(**{column: getattr(employee, column) for column in SNAPSHOT_COLUMNS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {column: getattr(self, column) for column in SNAPSHOT_COLUMNS}
+
+    def __repr__(self):
+        return f"<EmployeeSnapshot(id={self.id}, name='{self.name}', contactNo='{self.contactNo}')>"
+
+
+# Cached answer for a contact number with no employee
+UNKNOWN_CONTACT = object()
+
+
+class EmployeeRecordCache:
+    """
+    Bounded LRU/TTL cache of contact number -> EmployeeSnapshot for get_employee_record.
+
+    Numbers without an employee are cached too (UNKNOWN_CONTACT), for negative_ttl
+    seconds, so repeated messages from unknown numbers do not query Postgres. Employee
+    inserts, updates and deletes invalidate the affected numbers once their transaction
+    commits; changes made by other processes or by bulk UPDATEs are picked up when the
+    entry expires. A lookup only stores its result if no invalidation happened while
+    it was querying.
+    """
+
+    def __init__(self, maxsize: int = 5000, ttl: float = 300, negative_ttl: float = 60):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Union[EmployeeSnapshot, object, None]:
+        """The snapshot, UNKNOWN_CONTACT, or None when the number is not cached."""
+        value = self._entries.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            elif value is UNKNOWN_CONTACT:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, snapshot: Optional[EmployeeSnapshot], generation: int):
+        """Cache a lookup that started at `generation`; None caches the number as unknown."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            if snapshot is None:
+                self._entries.set(key, UNKNOWN_CONTACT, ttl=self.negative_ttl)
+            else:
+                self._entries.set(key, snapshot)
+
+    def invalidate(self, *keys: str):
+        """Forget the given contact numbers, or every number when none are given."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            if not keys:
+                self._entries.clear()
+            for key in keys:
+                self._entries.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, negative_hits, misses, invalidations = self.hits, self.negative_hits, self.misses, self.invalidations
+        lookups = hits + negative_hits + misses
+        stats = self._entries.stats()
+        stats.update({
+            "hits": hits,
+            "negative_hits": negative_hits,
+            "misses": misses,
+            "hit_rate": round((hits + negative_hits) / lookups, 4) if lookups else 0.0,
+            "invalidations": invalidations,
+            "negative_ttl": self.negative_ttl
+        })
+        return stats
+
+
+employee_record_cache = EmployeeRecordCache(
+    maxsize=int(os.getenv("EMPLOYEE_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("EMPLOYEE_CACHE_TTL", "300")),
+    negative_ttl=float(os.getenv("EMPLOYEE_CACHE_NEGATIVE_TTL", "60"))
+)
+
+
+# Invalidate after the writing transaction commits, so a concurrent lookup cannot
+# cache the old row between the flush and the commit.
+_PENDING_KEY = "employee_record_cache_pending"
+
+
+def _queue_invalidation(target: Employee, contact_numbers):
+    keys = {contact_key(number) for number in contact_numbers} - {None}
+    if not keys:
+        return
+    session = object_session(target)
+    if session is None:
+        employee_record_cache.invalidate(*keys)
+        return
+    session.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(Employee, "after_insert")
+@event.listens_for(Employee, "after_delete")
+def _invalidate_on_insert_or_delete(mapper, connection, target):
+    # An insert may turn a cached unknown number into an employee
+    _queue_invalidation(target, {target.contactNo})
+
+
+@event.listens_for(Employee, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    history = get_history(target, "contactNo")
+    _queue_invalidation(target, {target.contactNo, *history.deleted})
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session):
+    keys = session.info.pop(_PENDING_KEY, set())
+    if keys:
+        run_after_commit(session, partial(employee_record_cache.invalidate, *keys))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
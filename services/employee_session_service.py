@@ -1,276 +1,213 @@
-import redis
-import json
+from services.session_store import SessionStore, AsyncSessionStore
+from utils.session_codec import encode_session_payload, decode_session_payload
+from utils.session_keys import SESSION_MAX_MESSAGES
 
-class EmployeeSessionService:
-    def __init__(self):
-        # Connect to Redis Cloud server
-        self.redis_client = redis.Redis(
-            host='redis-10661.c17.us-east-1-4.ec2.redns.redis-cloud.com',
-            port=10661,
-            decode_responses=True,
-            username="default",
-            password="RKWH5tuWOhrxTsrAsJucYSCuUjdBXpPa"
-        )
+class EmployeeSessionService(SessionStore):
+    """Per-contact session state, kept in the configured session backend (see SessionStore)."""
     
     def set_employee_identified(self, contact_number, is_identified):
         """Set employee identified status"""
-        key = f"employee:identified:{contact_number}"
-        value = "1" if is_identified else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "employee_identified", is_identified)
     
     def get_employee_identified(self, contact_number):
         """Get employee identified status"""
-        key = f"employee:identified:{contact_number}"
-        value = self.redis_client.get(key)
-        return value == "1"
+        return self._get_field(contact_number, "employee_identified")
     
     def set_employee_id(self, contact_number, employee_id):
         """Set employee ID"""
-        key = f"employee:id:{contact_number}"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, employee_id, ex=86400)
+        return self._set_field(contact_number, "employee_id", employee_id)
     
     def get_employee_id(self, contact_number):
         """Get employee ID"""
-        key = f"employee:id:{contact_number}"
-        return self.redis_client.get(key)
+        return self._get_field(contact_number, "employee_id")
     
     def clear_employee_session(self, contact_number):
         """Clear all employee data for this contact"""
-        identified_key = f"employee:identified:{contact_number}"
-        id_key = f"employee:id:{contact_number}"
-        
-        self.redis_client.delete(identified_key)
-        self.redis_client.delete(id_key)
+        return self._clear_fields(contact_number, "employee_identified", "employee_id")
+
+    def clear_employee_session_many(self, contact_numbers: list):
+        """Clear the employee data of many contacts in chunked pipelines"""
+        return self._clear_fields_many(contact_numbers, "employee_identified", "employee_id")
 
     def add_to_list(self, contact_number, items):
-        key = f"contact_list:{contact_number}"
-        for item in items:
-            self.redis_client.rpush(key, item)
+        if not items:
+            return self._value(None)
+        return self.backend.push_list(contact_number, "contact_list", list(items))
     
     def clear_list(self, contact_number):
-        key = f"contact_list:{contact_number}"
-        self.redis_client.delete(key)
+        return self.backend.delete_collection(contact_number, "contact_list")
     
     def get_list(self, contact_number):
-        key = f"contact_list:{contact_number}"
-        return self.redis_client.lrange(key, 0, -1)
+        return self.backend.get_list(contact_number, "contact_list")
     
     def clear_messages(self, contact_number: str):
         """Clear all messages for a given contact number"""
-        key = f"contact:{contact_number}:messages"
-        self.redis_client.delete(key)
+        return self.backend.delete_collection(contact_number, "messages")
     
     def add_message(self, contact_number: str, message: dict):
-        """Add a message to the contact's history"""
-        key = f"contact:{contact_number}:messages"
-        self.redis_client.rpush(key, json.dumps(message))
+        """Add a message to the contact's history, keeping the newest SESSION_MAX_MESSAGES"""
+        return self.backend.push_list(contact_number, "messages", [encode_session_payload(message)], max_length=SESSION_MAX_MESSAGES)
     
     def get_messages(self, contact_number: str) -> list:
         """Get all messages for a given contact number"""
-        key = f"contact:{contact_number}:messages"
-        messages = self.redis_client.lrange(key, 0, -1)
-        return [json.loads(msg) for msg in messages]
+        messages = self.backend.get_list(contact_number, "messages")
+        return self._result(messages, lambda items: [decode_session_payload(msg) for msg in items])
+    
+    def get_last_messages(self, contact_number: str, count: int) -> list:
+        """Get the newest `count` messages, oldest first; only those are fetched and decoded"""
+        if count <= 0:
+            return self._value([])
+        messages = self.backend.get_list(contact_number, "messages", -count, -1)
+        return self._result(messages, lambda items: [decode_session_payload(msg) for msg in items])
     
     def set_multiple_office_locations(self, contact_number: str, location_names: list):
         """Set the multiple office locations list for a contact"""
-        key = f"contact:{contact_number}:multiple_office_locations"
-        # Store as JSON string for 24 hours (86400 seconds)
-        self.redis_client.set(key, json.dumps(location_names), ex=86400)
+        return self._set_field(contact_number, "multiple_office_locations", location_names)
     
     def get_multiple_office_locations(self, contact_number: str) -> list:
         """Get the multiple office locations list for a contact"""
-        key = f"contact:{contact_number}:multiple_office_locations"
-        data = self.redis_client.get(key)
-        if data:
-            return json.loads(data)
-        return []
+        return self._get_field(contact_number, "multiple_office_locations")
     
     def clear_multiple_office_locations(self, contact_number: str):
         """Clear the multiple office locations list for a contact"""
-        key = f"contact:{contact_number}:multiple_office_locations"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "multiple_office_locations")
     
     def set_asked_confirmation(self, contact_number: str, asked_confirmation: bool):
         """Set asked confirmation status for a contact"""
-        key = f"contact:{contact_number}:asked_confirmation"
-        value = "1" if asked_confirmation else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "asked_confirmation", asked_confirmation)
     
     def get_asked_confirmation(self, contact_number: str) -> bool:
         """Get asked confirmation status for a contact"""
-        key = f"contact:{contact_number}:asked_confirmation"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "asked_confirmation")
     
     def clear_asked_confirmation(self, contact_number: str):
         """Clear asked confirmation status for a contact"""
-        key = f"contact:{contact_number}:asked_confirmation"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "asked_confirmation")
 
     def set_employee_asked_confirmation(self, contact_number: str, asked_confirmation: bool):
         """Set asked confirmation status for an employee"""
-        key = f"employee:{contact_number}:asked_confirmation"
-        value = "1" if asked_confirmation else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "employee_asked_confirmation", asked_confirmation)
     
     def get_employee_asked_confirmation(self, contact_number: str) -> bool:
         """Get asked confirmation status for an employee"""
-        key = f"employee:{contact_number}:asked_confirmation"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "employee_asked_confirmation")
     
     def clear_employee_asked_confirmation(self, contact_number: str):
         """Clear asked confirmation status for an employee"""
-        key = f"employee:{contact_number}:asked_confirmation"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "employee_asked_confirmation")
     
     def set_employee_asked_user_feedback(self, contact_number: str, asked_feedback: bool):
         """Set asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        value = "1" if asked_feedback else "0"
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "employee_asked_user_feedback", asked_feedback)
     
     def get_employee_asked_user_feedback(self, contact_number: str) -> bool:
         """Get asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "employee_asked_user_feedback")
     
     def clear_employee_asked_user_feedback(self, contact_number: str):
         """Clear asked user feedback status for an employee"""
-        key = f"employee:{contact_number}:asked_user_feedback"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "employee_asked_user_feedback")
+
+    def set_employee_asked_user_feedback_many(self, contact_numbers: list, asked_feedback: bool):
+        """Set asked user feedback status for many employees in chunked pipelines"""
+        return self._set_field_many(contact_numbers, "employee_asked_user_feedback", asked_feedback)
+    
+    def get_employee_asked_user_feedback_many(self, contact_numbers: list) -> dict:
+        """Asked user feedback status of many employees, by contact number"""
+        return self._get_field_many(contact_numbers, "employee_asked_user_feedback")
+    
+    def clear_employee_asked_user_feedback_many(self, contact_numbers: list):
+        """Clear asked user feedback status for many employees in chunked pipelines"""
+        return self._clear_fields_many(contact_numbers, "employee_asked_user_feedback")
         
     def set_update_agent_confirmation(self, contact_number: str, confirmation: bool):
         """Set update agent confirmation status for a contact"""
-        key = f"contact:{contact_number}:update_agent_confirmation"
-        value = "1" if confirmation else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "update_agent_confirmation", confirmation)
     
     def get_update_agent_confirmation(self, contact_number: str) -> bool:
         """Get update agent confirmation status for a contact"""
-        key = f"contact:{contact_number}:update_agent_confirmation"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "update_agent_confirmation")
     
     def clear_update_agent_confirmation(self, contact_number: str):
         """Clear update agent confirmation status for a contact"""
-        key = f"contact:{contact_number}:update_agent_confirmation"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "update_agent_confirmation")
     
     def set_user_trying_to_add_new_employee(self, contact_number: str, trying_to_add: bool):
         """Set user trying to add new employee status for a contact"""
-        key = f"contact:{contact_number}:user_trying_to_add_new_employee"
-        value = "1" if trying_to_add else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "user_trying_to_add_new_employee", trying_to_add)
     
     def get_user_trying_to_add_new_employee(self, contact_number: str) -> bool:
         """Get user trying to add new employee status for a contact"""
-        key = f"contact:{contact_number}:user_trying_to_add_new_employee"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "user_trying_to_add_new_employee")
     
     def clear_user_trying_to_add_new_employee(self, contact_number: str):
         """Clear user trying to add new employee status for a contact"""
-        key = f"contact:{contact_number}:user_trying_to_add_new_employee"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "user_trying_to_add_new_employee")
     
     def set_asked_user_draft_continuation(self, contact_number: str, asked_continuation: bool):
         """Set asked user draft continuation status for a contact"""
-        key = f"contact:{contact_number}:asked_user_draft_continuation"
-        value = "1" if asked_continuation else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "asked_user_draft_continuation", asked_continuation)
     
     def get_asked_user_draft_continuation(self, contact_number: str) -> bool:
         """Get asked user draft continuation status for a contact"""
-        key = f"contact:{contact_number}:asked_user_draft_continuation"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "asked_user_draft_continuation")
     
     def clear_asked_user_draft_continuation(self, contact_number: str):
         """Clear asked user draft continuation status for a contact"""
-        key = f"contact:{contact_number}:asked_user_draft_continuation"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "asked_user_draft_continuation")
     
     def set_correcting_final_confirmation_changes(self, contact_number: str, correcting_changes: bool):
         """Set correcting final confirmation changes status for a contact"""
-        key = f"contact:{contact_number}:correcting_final_confirmation_changes"
-        value = "1" if correcting_changes else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "correcting_final_confirmation_changes", correcting_changes)
     
     def get_correcting_final_confirmation_changes(self, contact_number: str) -> bool:
         """Get correcting final confirmation changes status for a contact"""
-        key = f"contact:{contact_number}:correcting_final_confirmation_changes"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "correcting_final_confirmation_changes")
     
     def clear_correcting_final_confirmation_changes(self, contact_number: str):
         """Clear correcting final confirmation changes status for a contact"""
-        key = f"contact:{contact_number}:correcting_final_confirmation_changes"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "correcting_final_confirmation_changes")
     
     def get_field_confirmation_list(self, contact_number: str) -> dict:
         """Get all field-value pairs that were asked for confirmation"""
-        key = f"contact:{contact_number}:field_confirmation_list"
-        field_values = self.redis_client.hgetall(key)
-        return field_values
+        return self.backend.get_map(contact_number, "field_confirmation_list")
     
     def add_field_to_confirmation_list(self, contact_number: str, field_name: str, field_value: str):
-        """Add a field-value pair to the confirmation list"""
-        key = f"contact:{contact_number}:field_confirmation_list"
-        self.redis_client.hset(key, field_name, field_value)
-        # Set expiration for 24 hours (86400 seconds)
-        self.redis_client.expire(key, 86400)
+        """Add a field-value pair to the confirmation list (expires after SESSION_TTL)"""
+        return self.backend.set_map_field(contact_number, "field_confirmation_list", field_name, field_value)
     
     def remove_field_from_confirmation_list(self, contact_number: str, field_name: str):
         """Remove a specific field from the confirmation list"""
-        key = f"contact:{contact_number}:field_confirmation_list"
-        self.redis_client.hdel(key, field_name)
+        return self.backend.delete_map_field(contact_number, "field_confirmation_list", field_name)
     
     def clear_field_confirmation_list(self, contact_number: str):
         """Clear all field confirmation data for a contact"""
-        key = f"contact:{contact_number}:field_confirmation_list"
-        self.redis_client.delete(key)
+        return self.backend.delete_collection(contact_number, "field_confirmation_list")
     
     def set_name_extracted(self, contact_number: str, name_extracted: bool):
         """Set name extracted status for a contact"""
-        key = f"contact:{contact_number}:name_extracted"
-        value = "1" if name_extracted else "0"
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "name_extracted", name_extracted)
     
     def get_name_extracted(self, contact_number: str) -> bool:
         """Get name extracted status for a contact"""
-        key = f"contact:{contact_number}:name_extracted"
-        value = self.redis_client.get(key)
-        return value == "1" if value is not None else False
+        return self._get_field(contact_number, "name_extracted")
     
     def clear_name_extracted(self, contact_number: str):
         """Clear name extracted status for a contact"""
-        key = f"contact:{contact_number}:name_extracted"
-        self.redis_client.delete(key)
+        return self._clear_fields(contact_number, "name_extracted")
     
     def set_shift_time(self, contact_number: str, time_value):
         """Set shift time for a contact (can be any type - will be stored as string)"""
-        key = f"contact:{contact_number}:shift_time"
-        value = str(time_value)
-        # Store for 24 hours (86400 seconds)
-        self.redis_client.set(key, value, ex=86400)
+        return self._set_field(contact_number, "shift_time", time_value)
     
     def get_shift_time(self, contact_number: str):
         """Get shift time for a contact (returns None if not found)"""
-        key = f"contact:{contact_number}:shift_time"
-        return self.redis_client.get(key)
+        return self._get_field(contact_number, "shift_time")
     
     def clear_shift_time(self, contact_number: str):
         """Clear shift time for a contact"""
-        key = f"contact:{contact_number}:shift_time"
-        self.redis_client.delete(key)
\ No newline at end of file
+        return self._clear_fields(contact_number, "shift_time")
+
+
+class AsyncEmployeeSessionService(AsyncSessionStore, EmployeeSessionService):
+    """EmployeeSessionService on redis.asyncio: the same methods, each returning an awaitable."""
@@ -0,0 +1,170 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from Files.SQLAlchemyModels import LeadMessageHistory
+
+MESSAGE_WRITE_MODES = ("off", "background", "inline")
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer for LeadMessageHistory rows.
+
+    save() queues a message, stamped with its arrival time, instead of committing it.
+    Queued messages are written with one bulk INSERT once max_size are waiting or the
+    oldest has waited flush_interval seconds. In "background" mode a daemon thread
+    flushes on the interval; in "inline" mode (tests, scripts) there is no thread and
+    the save() that reaches a threshold, or a flush() call, writes the queue in the
+    caller's thread. Either way messages are written later than save() returns.
+    close() is registered with atexit and flushes what is left. A failed flush keeps
+    its messages for the next one, up to max_pending: beyond that the oldest are
+    dropped and logged.
+
+    Flushes use their own session and transaction, independent of the caller's.
+    """
+
+    def __init__(self, mode: str = "off", max_size: int = 100, flush_interval: float = 1.0, max_pending: int = 10000):
+        if mode not in MESSAGE_WRITE_MODES:
+            raise ValueError(f"Unknown message write mode: {mode} (expected one of {', '.join(MESSAGE_WRITE_MODES)})")
+        self.mode = mode
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Dict[str, Any]] = []
+        # Taken by a flush and not committed yet; still visible to pending()
+        self._in_flight: List[Dict[str, Any]] = []
+        self._oldest_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def save(self, contact_number, role, content):
+        row = {"contact_number": contact_number, "role": role, "content": content, "timestamp": datetime.now()}
+        now = time.monotonic()
+        thread = None
+        with self._lock:
+            if not self._pending:
+                self._oldest_at = now
+            self._pending.append(row)
+            self._drop_overflow()
+            due = len(self._pending) >= self.max_size or now - self._oldest_at >= self.flush_interval
+            # Started on first use, so a forking server starts it in each worker
+            if self.mode == "background" and self._thread is None:
+                thread = self._thread = threading.Thread(target=self._run, name="message-write-buffer", daemon=True)
+        if thread is not None:
+            thread.start()
+        if not due:
+            return
+        if self.mode == "inline":
+            self.flush()
+        else:
+            self._wake.set()
+
+    def _drop_overflow(self):
+        """Drop the oldest queued messages beyond max_pending; called with _lock held."""
+        overflow = len(self._pending) - self.max_pending
+        if overflow > 0:
+            del self._pending[:overflow]
+            self.dropped += overflow
+            print(f"[MessageWriteBuffer] Dropped the {overflow} oldest unwritten messages ({self.max_pending} queued at most)")
+
+    def pending(self, contact_number) -> List[Dict[str, Any]]:
+        """Queued messages of one contact that are not committed yet, oldest first."""
+        with self._lock:
+            return [dict(row) for row in self._in_flight + self._pending if row["contact_number"] == contact_number]
+
+    def flush(self, raise_errors: bool = False) -> int:
+        """
+        Write every queued message in one bulk INSERT; returns the number written. A
+        failed write is retried by the next flush, and re-raised if raise_errors.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending, self._oldest_at = self._pending, [], None
+                self._in_flight = rows
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception as e:
+                print(f"[MessageWriteBuffer] Flush of {len(rows)} messages failed, will retry: {e}")
+                with self._lock:
+                    self._pending = rows + self._pending
+                    self._oldest_at = time.monotonic()
+                    self._in_flight = []
+                    self.failures += 1
+                    self._drop_overflow()
+                if raise_errors:
+                    raise
+                return 0
+            with self._lock:
+                self._in_flight = []
+                self.flushes += 1
+                self.flushed += len(rows)
+            return len(rows)
+
+    @staticmethod
+    def _write(rows: List[Dict[str, Any]]):
+        from app import app, db
+        with app.app_context():
+            try:
+                db.session.execute(insert(LeadMessageHistory), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the flusher thread and write what is still queued."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._lock:
+            if self._pending:
+                print(f"[MessageWriteBuffer] {len(self._pending)} messages could not be written at shutdown")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "pending": len(self._pending) + len(self._in_flight),
+                "flushes": self.flushes,
+                "flushed": self.flushed,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "max_pending": self.max_pending,
+                "max_size": self.max_size,
+                "flush_interval": self.flush_interval
+            }
+
+
+message_write_buffer = MessageWriteBuffer(
+    os.getenv("MESSAGE_WRITE_BEHIND", "off"),
+    max_size=int(os.getenv("MESSAGE_WRITE_BEHIND_MAX_SIZE", "100")),
+    flush_interval=float(os.getenv("MESSAGE_WRITE_BEHIND_INTERVAL", "1.0")),
+    max_pending=int(os.getenv("MESSAGE_WRITE_BEHIND_MAX_PENDING", "10000"))
+)
+if message_write_buffer.enabled:
+    atexit.register(message_write_buffer.close)
@@ -0,0 +1,215 @@
+import copy
+import os
+import threading
+from functools import partial
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from Files.SQLAlchemyModels import MoodCheck, Employee
+from database import run_after_commit
+from utils.ttl_cache import TTLCache
+from utils.redis_client import get_redis_client
+
+
+class MoodStatisticsCache:
+    """
+    Result cache for get_mood_check_statistics payloads.
+
+    Entries live in an in-process TTL/LRU cache and remember the generation of every
+    company (or group) they cover. Writing a MoodCheck bumps the generation of its
+    company and group, so only the entries for that tenant become stale. When a Redis
+    client is given, generations are kept in Redis so writes in one worker invalidate
+    entries in all of them.
+    """
+
+    GENERATIONS_KEY = "mood_statistics_cache:generations"
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300, redis_client=None):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._redis = redis_client
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(**filters) -> Tuple:
+        """Hashable key for a set of statistics filters."""
+        company_ids = filters.get("company_ids")
+        if company_ids is not None and not isinstance(company_ids, list):
+            company_ids = [company_ids]
+        filters["company_ids"] = tuple(sorted(set(company_ids))) if company_ids else None
+        return tuple(sorted((name, str(value) if value is not None else None) for name, value in filters.items()))
+
+    @staticmethod
+    def _scopes(company_ids=None, group_id=None) -> List[str]:
+        if group_id:
+            return [f"group:{group_id}"]
+        if company_ids is not None and not isinstance(company_ids, list):
+            company_ids = [company_ids]
+        return [f"company:{company_id}" for company_id in sorted(set(company_ids or []))]
+
+    def _current_generations(self, scopes: List[str]) -> Tuple:
+        if not scopes:
+            return ()
+        if self._redis is not None:
+            values = self._redis.hmget(self.GENERATIONS_KEY, scopes)
+            return tuple(int(value or 0) for value in values)
+        with self._lock:
+            return tuple(self._generations.get(scope, 0) for scope in scopes)
+
+    def get(self, key: Tuple, company_ids=None, group_id=None) -> Optional[Dict[str, Any]]:
+        """Cached payload for key, or None when missing, expired or invalidated."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            generations, payload = entry
+            if generations == self._current_generations(self._scopes(company_ids, group_id)):
+                with self._lock:
+                    self.hits += 1
+                return copy.deepcopy(payload)
+            self._entries.delete(key)
+            with self._lock:
+                self.stale += 1
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: Tuple, payload: Dict[str, Any], company_ids=None, group_id=None, generations: Optional[Tuple] = None):
+        """Store payload; pass the generations read before computing it to avoid caching stale data."""
+        if generations is None:
+            generations = self._current_generations(self._scopes(company_ids, group_id))
+        self._entries.set(key, (generations, copy.deepcopy(payload)))
+
+    def generations_for(self, company_ids=None, group_id=None) -> Tuple:
+        return self._current_generations(self._scopes(company_ids, group_id))
+
+    def invalidate(self, company_id: Optional[int] = None, group_id: Optional[int] = None):
+        """Mark every entry covering this company or group as stale."""
+        scopes = []
+        if company_id is not None:
+            scopes.append(f"company:{company_id}")
+        if group_id:
+            scopes.append(f"group:{group_id}")
+        if not scopes:
+            return
+
+        if self._redis is not None:
+            pipeline = self._redis.pipeline(transaction=False)
+            for scope in scopes:
+                pipeline.hincrby(self.GENERATIONS_KEY, scope, 1)
+            pipeline.execute()
+            with self._lock:
+                self.invalidations += 1
+        else:
+            with self._lock:
+                for scope in scopes:
+                    self._generations[scope] = self._generations.get(scope, 0) + 1
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size, for sizing the cache."""
+        with self._lock:
+            hits, misses, stale, invalidations = self.hits, self.misses, self.stale, self.invalidations
+        lookups = hits + misses
+        stats = self._entries.stats()
+        stats.update({
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stale": stale,
+            "invalidations": invalidations,
+            "backend": "redis" if self._redis is not None else "memory"
+        })
+        return stats
+
+
+mood_statistics_cache = MoodStatisticsCache(
+    maxsize=int(os.getenv("MOOD_STATS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("MOOD_STATS_CACHE_TTL", "300")),
+    # Share invalidations across workers through the pooled Redis client when enabled
+    redis_client=get_redis_client() if os.getenv("MOOD_STATS_CACHE_BACKEND", "memory") == "redis" else None
+)
+
+
+# Invalidate after the writing transaction commits, so a concurrent reader cannot
+# re-cache the old numbers between the flush and the commit.
+_PENDING_KEY = "mood_statistics_cache_pending"
+
+
+def _queue_invalidation(connection, target: MoodCheck):
+    # Statistics scope by the employee's company and group, which may differ from MoodCheck.company_id
+    employee = connection.execute(
+        select(Employee.company_id, Employee.group_id).where(Employee.id == target.employee_id)
+    ).first()
+    scopes = {(target.company_id, None)}
+    if employee is not None:
+        scopes.add((employee.company_id, employee.group_id))
+    _queue_scopes(target, scopes)
+
+
+def _queue_scopes(target, scopes):
+    session = object_session(target)
+    if session is None:
+        for company_id, group_id in scopes:
+            mood_statistics_cache.invalidate(company_id, group_id)
+        return
+    session.info.setdefault(_PENDING_KEY, set()).update(scopes)
+
+
+@event.listens_for(MoodCheck, "after_insert")
+def _invalidate_on_insert(mapper, connection, target):
+    _queue_invalidation(connection, target)
+
+
+@event.listens_for(MoodCheck, "after_update")
+def _invalidate_on_update(mapper, connection, target):
+    _queue_invalidation(connection, target)
+
+
+@event.listens_for(MoodCheck, "after_delete")
+def _invalidate_on_delete(mapper, connection, target):
+    _queue_invalidation(connection, target)
+
+
+def _previous_value(target, attribute: str):
+    history = get_history(target, attribute)
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+# Employee changes alter total_employees and which checks a company/group counts
+@event.listens_for(Employee, "after_insert")
+@event.listens_for(Employee, "after_delete")
+def _invalidate_on_employee_insert_or_delete(mapper, connection, target):
+    _queue_scopes(target, {(target.company_id, target.group_id)})
+
+
+@event.listens_for(Employee, "after_update")
+def _invalidate_on_employee_update(mapper, connection, target):
+    old = tuple(_previous_value(target, attribute) for attribute in ('company_id', 'group_id', 'is_deleted'))
+    if old != (target.company_id, target.group_id, target.is_deleted):
+        _queue_scopes(target, {old[:2], (target.company_id, target.group_id)})
+
+
+def _invalidate_scopes(scopes):
+    for company_id, group_id in scopes:
+        mood_statistics_cache.invalidate(company_id, group_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending_invalidations(session):
+    scopes = session.info.pop(_PENDING_KEY, set())
+    if scopes:
+        # Inside a unit of work this commit only released a savepoint
+        run_after_commit(session, partial(_invalidate_scopes, scopes))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
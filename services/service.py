@@ -1,22 +1,33 @@
-import re
 from sqlalchemy.orm import Session
 from Files.SQLAlchemyModels import Employee
+from services.employee_record_cache import EmployeeSnapshot, employee_record_cache, UNKNOWN_CONTACT, contact_key
 
 
 
 class EmployeeService:
 
     @staticmethod
-    def get_employee_record(contact_number: str, db_session: Session):
+    def get_employee_record(contact_number: str, db_session: Session) -> EmployeeSnapshot:
         #gets all the record of the employee based on their contact number
-        contact_number = None if contact_number is None else re.sub(r'[^\d]', '', str(contact_number))
+        # Served from employee_record_cache; a miss queries the row and caches a snapshot
+        contact_number = contact_key(contact_number)
+        cached = employee_record_cache.get(contact_number) if contact_number is not None else UNKNOWN_CONTACT
+        if cached is UNKNOWN_CONTACT:
+            raise Exception(f"Error retrieving employee by contact number {contact_number}: No employee found with contact number: {contact_number}")
+        if cached is not None:
+            return cached
+        generation = employee_record_cache.generation
         try:
+            # One probe of ix_employee_contact_no_normalized, however the number was entered
             employee = db_session.query(Employee).filter(
-                Employee.contactNo == contact_number
+                Employee.contact_no_normalized == contact_number
             ).first()
             if employee is None:
+                employee_record_cache.set(contact_number, None, generation)
                 raise ValueError(f"No employee found with contact number: {contact_number}")
-            return employee
+            snapshot = EmployeeSnapshot.from_employee(employee)
+            employee_record_cache.set(contact_number, snapshot, generation)
+            return snapshot
         except Exception as e:
             raise Exception(f"Error retrieving employee by contact number {contact_number}: {str(e)}")
         
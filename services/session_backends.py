@@ -0,0 +1,1211 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from services.session_key_migration import MOVE_TO_TAGGED_KEYS, plain_key_moves
+from services.session_unit_of_work import PendingResult
+from utils.redis_client import get_redis_client, get_async_redis_client, is_cluster_client
+from utils.session_keys import (
+    SESSION_TTL, SESSION_BULK_CHUNK_SIZE, TAGGED_SESSION_KEYS, LEGACY_SESSION_FALLBACK, PLAIN_SESSION_FALLBACK, LEGACY_FIELD_KEYS,
+    session_key, legacy_key,
+    messages_key, contact_list_key, field_confirmation_key
+)
+
+# Outcomes of start_feedback_turn
+FEEDBACK_ASK = "ask"        # feedback was not asked yet: the prompt was recorded, send it
+FEEDBACK_ANSWER = "answer"  # this message answers the prompt and this worker owns it
+FEEDBACK_BUSY = "busy"      # another worker is already handling the answer
+
+# Seconds after which an answer claim is considered abandoned (e.g. the worker crashed)
+FEEDBACK_CLAIM_TIMEOUT = 120
+
+FEEDBACK_FIELD = "employee_asked_user_feedback"
+CLAIM_FIELD = "feedback_answer_claimed_at"
+MESSAGES = "messages"
+
+# Lists and maps kept next to the session fields
+SESSION_COLLECTIONS = {
+    MESSAGES: messages_key,
+    "contact_list": contact_list_key,
+    "field_confirmation_list": field_confirmation_key,
+}
+
+
+class SessionBackend(ABC):
+    """
+    Storage behind the session services.
+
+    Values are the encoded strings produced by utils.session_state. Fields and
+    collections expire SESSION_TTL seconds after they were last written. The
+    feedback transitions must be atomic per contact.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def get_field(self, contact_number, field: str) -> Optional[str]:
+        """One session field, or None when missing."""
+
+    @abstractmethod
+    def get_fields(self, contact_number) -> Dict[str, str]:
+        """Every session field of a contact."""
+
+    @abstractmethod
+    def set_field(self, contact_number, field: str, value: str):
+        """Set one session field and refresh the session TTL."""
+
+    @abstractmethod
+    def delete_fields(self, contact_number, *fields: str):
+        """Remove session fields."""
+
+    @abstractmethod
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        """Append to a list, keeping its newest max_length items."""
+
+    @abstractmethod
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        """Items start..end inclusive, with negative indexes counting from the end (LRANGE)."""
+
+    @abstractmethod
+    def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        """Every entry of a map."""
+
+    @abstractmethod
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        """Set one map entry and refresh the map TTL."""
+
+    @abstractmethod
+    def delete_map_field(self, contact_number, name: str, field: str):
+        """Remove one map entry."""
+
+    @abstractmethod
+    def delete_collection(self, contact_number, name: str):
+        """Remove a whole list or map."""
+
+    @abstractmethod
+    def clear_session(self, contact_number):
+        """Remove every field, list and map of a contact."""
+
+    @abstractmethod
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        """Atomic ask/answer/busy transition (see EmployeeMoodSessionService.start_feedback_turn)."""
+
+    @abstractmethod
+    def finish_feedback_turn(self, contact_number):
+        """Atomically drop the feedback flag, the answer claim and the messages."""
+
+    def release_feedback_answer(self, contact_number):
+        self.delete_fields(contact_number, CLAIM_FIELD)
+
+    # Bulk operations on many contacts; backends override them to batch the work
+
+    def get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Optional[str]]:
+        """One session field of each contact."""
+        return {contact_number: self.get_field(contact_number, field) for contact_number in contact_numbers}
+
+    def get_fields_many(self, contact_numbers: List[str]) -> Dict[str, Dict[str, str]]:
+        """Every session field of each contact."""
+        return {contact_number: self.get_fields(contact_number) for contact_number in contact_numbers}
+
+    def set_field_many(self, contact_numbers: List[str], field: str, value: str):
+        """Set one session field of every contact."""
+        for contact_number in contact_numbers:
+            self.set_field(contact_number, field, value)
+
+    def delete_fields_many(self, contact_numbers: List[str], *fields: str):
+        """Remove session fields of every contact."""
+        for contact_number in contact_numbers:
+            self.delete_fields(contact_number, *fields)
+
+    def clear_sessions(self, contact_numbers: List[str]):
+        """Remove the whole session of every contact."""
+        for contact_number in contact_numbers:
+            self.clear_session(contact_number)
+
+    def batch(self) -> "SessionBatch":
+        """Queue of backend operations for a unit of work."""
+        return SessionBatch(self)
+
+
+class SessionBatch:
+    """
+    Queues backend operations and runs them in order on execute().
+
+    Same operations as SessionBackend; reads return a PendingResult instead of the
+    value. Backends that can pipeline return a subclass that sends everything in
+    one round trip.
+    """
+
+    def __init__(self, backend: SessionBackend):
+        self._backend = backend
+        # (backend method name, args, result or None for writes)
+        self._operations = []
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def _read(self, operation: str, *args) -> PendingResult:
+        result = PendingResult(lambda value: value)
+        self._operations.append((operation, args, result))
+        return result
+
+    def _write(self, operation: str, *args):
+        self._operations.append((operation, args, None))
+
+    def execute(self) -> int:
+        """Run the queued operations in order; returns how many ran."""
+        operations, self._operations = self._operations, []
+        for operation, args, result in operations:
+            value = getattr(self._backend, operation)(*args)
+            if result is not None:
+                result._resolve(value)
+        return len(operations)
+
+    def discard(self):
+        self._operations = []
+
+    def get_field(self, contact_number, field: str) -> PendingResult:
+        return self._read("get_field", contact_number, field)
+
+    def get_fields(self, contact_number) -> PendingResult:
+        return self._read("get_fields", contact_number)
+
+    def set_field(self, contact_number, field: str, value: str):
+        self._write("set_field", contact_number, field, value)
+
+    def delete_fields(self, contact_number, *fields: str):
+        self._write("delete_fields", contact_number, *fields)
+
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        self._write("push_list", contact_number, name, values, max_length)
+
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> PendingResult:
+        return self._read("get_list", contact_number, name, start, end)
+
+    def get_map(self, contact_number, name: str) -> PendingResult:
+        return self._read("get_map", contact_number, name)
+
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        self._write("set_map_field", contact_number, name, field, value)
+
+    def delete_map_field(self, contact_number, name: str, field: str):
+        self._write("delete_map_field", contact_number, name, field)
+
+    def delete_collection(self, contact_number, name: str):
+        self._write("delete_collection", contact_number, name)
+
+    def clear_session(self, contact_number):
+        self._write("clear_session", contact_number)
+
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> PendingResult:
+        return self._read("start_feedback_turn", contact_number, prompt, max_messages, last_messages)
+
+    def release_feedback_answer(self, contact_number):
+        self._write("release_feedback_answer", contact_number)
+
+    def finish_feedback_turn(self, contact_number):
+        self._write("finish_feedback_turn", contact_number)
+
+
+def _chunks(contact_numbers: List[str]) -> List[List[str]]:
+    """Distinct contact numbers in chunks of SESSION_BULK_CHUNK_SIZE."""
+    contact_numbers = list(dict.fromkeys(contact_numbers))
+    return [contact_numbers[start:start + SESSION_BULK_CHUNK_SIZE] for start in range(0, len(contact_numbers), SESSION_BULK_CHUNK_SIZE)]
+
+
+def _list_slice(items, start: int, end: int) -> list:
+    """Python slice with LRANGE's inclusive, negative-aware bounds."""
+    length = len(items)
+    start = max(start + length, 0) if start < 0 else start
+    end = end + length if end < 0 else min(end, length - 1)
+    if start > end:
+        return []
+    return list(items[start:end + 1])
+
+
+# KEYS: session hash, messages list[, legacy asked_user_feedback key]
+# ARGV: prompt message JSON, TTL, claim timeout, max messages kept, messages returned
+_START_FEEDBACK_TURN = """
+local asked = redis.call('HGET', KEYS[1], 'employee_asked_user_feedback')
+if not asked and KEYS[3] then
+    asked = redis.call('GET', KEYS[3])
+    if asked then
+        redis.call('HSET', KEYS[1], 'employee_asked_user_feedback', asked)
+        redis.call('DEL', KEYS[3])
+    end
+end
+
+if asked ~= '1' then
+    redis.call('HSET', KEYS[1], 'employee_asked_user_feedback', '1')
+    redis.call('HDEL', KEYS[1], 'feedback_answer_claimed_at')
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+    redis.call('LTRIM', KEYS[2], -tonumber(ARGV[4]), -1)
+    redis.call('EXPIRE', KEYS[1], ARGV[2])
+    redis.call('EXPIRE', KEYS[2], ARGV[2])
+    return {'ask', {}}
+end
+
+local now = tonumber(redis.call('TIME')[1])
+local claimed_at = tonumber(redis.call('HGET', KEYS[1], 'feedback_answer_claimed_at') or '0')
+if claimed_at > 0 and now - claimed_at < tonumber(ARGV[3]) then
+    return {'busy', {}}
+end
+
+redis.call('HSET', KEYS[1], 'feedback_answer_claimed_at', now)
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if tonumber(ARGV[5]) <= 0 then
+    return {'answer', {}}
+end
+return {'answer', redis.call('LRANGE', KEYS[2], -tonumber(ARGV[5]), -1)}
+"""
+
+# KEYS: session hash, messages list[, legacy asked_user_feedback key]
+_FINISH_FEEDBACK_TURN = """
+redis.call('HDEL', KEYS[1], 'employee_asked_user_feedback', 'feedback_answer_claimed_at')
+redis.call('DEL', KEYS[2])
+if KEYS[3] then
+    redis.call('DEL', KEYS[3])
+end
+return 1
+"""
+
+
+class RedisSessionCommands:
+    """
+    The Redis session layout: one hash per contact with a single TTL, refreshed on
+    each write, and lists and maps in their own keys. Fields written in the old
+    one-key-per-flag layout are still read until they expire.
+
+    Each _queue_* method adds one operation's commands to a pipeline (sync or asyncio)
+    and returns the function turning their replies into the result (None for writes),
+    so the sync and asyncio backends and their batches share the key logic.
+    """
+
+    def _register_scripts(self):
+        self._cluster = is_cluster_client(self.redis_client)
+        self._plain_fallback = PLAIN_SESSION_FALLBACK and not self._cluster
+        self._start_feedback_turn = self.redis_client.register_script(_START_FEEDBACK_TURN)
+        self._finish_feedback_turn = self.redis_client.register_script(_FINISH_FEEDBACK_TURN)
+        self._move_to_tagged_keys = self.redis_client.register_script(MOVE_TO_TAGGED_KEYS)
+
+    def _queue_plain_fallback(self, pipeline, contact_numbers: List[str]) -> int:
+        """
+        Queue the move of the contacts' plain keys to their tagged names, ahead of an
+        operation (see PLAIN_SESSION_FALLBACK); returns how many replies to skip.
+        """
+        if not self._plain_fallback:
+            return 0
+        for contact_number in contact_numbers:
+            keys, args = plain_key_moves(contact_number)
+            # EVAL rather than EVALSHA: a pipeline with scripts checks they are loaded first
+            pipeline.eval(MOVE_TO_TAGGED_KEYS, len(keys), *keys, *args)
+        return len(contact_numbers)
+
+    # Fields of the per-contact session hash
+
+    def _queue_get_field(self, pipeline, contact_number, field: str) -> Callable[[list], Optional[str]]:
+        pipeline.hget(session_key(contact_number), field)
+        if not LEGACY_SESSION_FALLBACK or field not in LEGACY_FIELD_KEYS:
+            return lambda replies: replies[0]
+        pipeline.get(legacy_key(field, contact_number))
+        return lambda replies: replies[0] if replies[0] is not None else replies[1]
+
+    def _queue_get_fields(self, pipeline, contact_number) -> Callable[[list], Dict[str, str]]:
+        pipeline.hgetall(session_key(contact_number))
+        if LEGACY_SESSION_FALLBACK:
+            pipeline.mget([legacy_key(field, contact_number) for field in LEGACY_FIELD_KEYS])
+
+        def decode(replies):
+            raw, legacy = self._split_legacy_fields(replies)
+            return {**legacy, **raw}
+        return decode
+
+    @staticmethod
+    def _split_legacy_fields(replies) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """The hash fields and the old-layout values of fields missing from the hash."""
+        raw = replies[0]
+        if not LEGACY_SESSION_FALLBACK:
+            return raw, {}
+        legacy = {
+            field: value for field, value in zip(LEGACY_FIELD_KEYS, replies[1])
+            if value is not None and field not in raw
+        }
+        return raw, legacy
+
+    @staticmethod
+    def _queue_migrate_legacy_fields(pipeline, contact_number, values: Dict[str, str]):
+        """Move old-layout values into the session hash without overwriting newer fields."""
+        key = session_key(contact_number)
+        for field, value in values.items():
+            pipeline.hsetnx(key, field, value)
+        pipeline.expire(key, SESSION_TTL)
+        pipeline.delete(*[legacy_key(field, contact_number) for field in values])
+
+    def _queue_set_field(self, pipeline, contact_number, field: str, value: str):
+        key = session_key(contact_number)
+        pipeline.hset(key, field, value)
+        pipeline.expire(key, SESSION_TTL)
+        if LEGACY_SESSION_FALLBACK and field in LEGACY_FIELD_KEYS:
+            pipeline.delete(legacy_key(field, contact_number))
+
+    def _queue_delete_fields(self, pipeline, contact_number, *fields: str):
+        pipeline.hdel(session_key(contact_number), *fields)
+        legacy_keys = [legacy_key(field, contact_number) for field in fields if field in LEGACY_FIELD_KEYS]
+        if LEGACY_SESSION_FALLBACK and legacy_keys:
+            pipeline.delete(*legacy_keys)
+
+    # Lists and maps
+
+    def _queue_push_list(self, pipeline, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        if not values:
+            return
+        key = SESSION_COLLECTIONS[name](contact_number)
+        pipeline.rpush(key, *values)
+        if max_length:
+            pipeline.ltrim(key, -max_length, -1)
+        pipeline.expire(key, SESSION_TTL)
+
+    def _queue_get_list(self, pipeline, contact_number, name: str, start: int = 0, end: int = -1) -> Callable[[list], List[str]]:
+        pipeline.lrange(SESSION_COLLECTIONS[name](contact_number), start, end)
+        return lambda replies: replies[0]
+
+    def _queue_get_map(self, pipeline, contact_number, name: str) -> Callable[[list], Dict[str, str]]:
+        pipeline.hgetall(SESSION_COLLECTIONS[name](contact_number))
+        return lambda replies: replies[0]
+
+    def _queue_set_map_field(self, pipeline, contact_number, name: str, field: str, value: str):
+        key = SESSION_COLLECTIONS[name](contact_number)
+        pipeline.hset(key, field, value)
+        pipeline.expire(key, SESSION_TTL)
+
+    def _queue_delete_map_field(self, pipeline, contact_number, name: str, field: str):
+        pipeline.hdel(SESSION_COLLECTIONS[name](contact_number), field)
+
+    def _queue_delete_collection(self, pipeline, contact_number, name: str):
+        pipeline.delete(SESSION_COLLECTIONS[name](contact_number))
+
+    def _queue_clear_session(self, pipeline, contact_number):
+        """Delete the hash and every collection with one DEL."""
+        keys = [session_key(contact_number)] + [key(contact_number) for key in SESSION_COLLECTIONS.values()]
+        if LEGACY_SESSION_FALLBACK:
+            keys.extend(legacy_key(field, contact_number) for field in LEGACY_FIELD_KEYS)
+        pipeline.delete(*keys)
+
+    # Bulk operations: one chunk of contacts per pipeline, legacy keys read with one
+    # MGET and removed with one UNLINK per chunk
+
+    def _queue_get_field_many(self, pipeline, contact_numbers: List[str], field: str) -> Callable[[list], Dict[str, Optional[str]]]:
+        for contact_number in contact_numbers:
+            pipeline.hget(session_key(contact_number), field)
+        legacy = LEGACY_SESSION_FALLBACK and field in LEGACY_FIELD_KEYS
+        if legacy:
+            pipeline.mget([legacy_key(field, contact_number) for contact_number in contact_numbers])
+
+        def decode(replies):
+            values = replies[:len(contact_numbers)]
+            if legacy:
+                values = [value if value is not None else legacy_value for value, legacy_value in zip(values, replies[-1])]
+            return dict(zip(contact_numbers, values))
+        return decode
+
+    def _queue_get_fields_many(self, pipeline, contact_numbers: List[str]) -> Callable[[list], Dict[str, Dict[str, str]]]:
+        for contact_number in contact_numbers:
+            pipeline.hgetall(session_key(contact_number))
+        if LEGACY_SESSION_FALLBACK:
+            pipeline.mget([legacy_key(field, contact_number) for contact_number in contact_numbers for field in LEGACY_FIELD_KEYS])
+
+        def decode(replies):
+            per_contact = len(LEGACY_FIELD_KEYS)
+            sessions = {}
+            for index, contact_number in enumerate(contact_numbers):
+                contact_replies = [replies[index]]
+                if LEGACY_SESSION_FALLBACK:
+                    contact_replies.append(replies[-1][index * per_contact:(index + 1) * per_contact])
+                raw, legacy = self._split_legacy_fields(contact_replies)
+                sessions[contact_number] = {**legacy, **raw}
+            return sessions
+        return decode
+
+    def _queue_set_field_many(self, pipeline, contact_numbers: List[str], field: str, value: str):
+        for contact_number in contact_numbers:
+            key = session_key(contact_number)
+            pipeline.hset(key, field, value)
+            pipeline.expire(key, SESSION_TTL)
+        if LEGACY_SESSION_FALLBACK and field in LEGACY_FIELD_KEYS:
+            pipeline.unlink(*[legacy_key(field, contact_number) for contact_number in contact_numbers])
+
+    def _queue_delete_fields_many(self, pipeline, contact_numbers: List[str], *fields: str):
+        for contact_number in contact_numbers:
+            pipeline.hdel(session_key(contact_number), *fields)
+        legacy_fields = [field for field in fields if field in LEGACY_FIELD_KEYS]
+        if LEGACY_SESSION_FALLBACK and legacy_fields:
+            pipeline.unlink(*[legacy_key(field, contact_number) for contact_number in contact_numbers for field in legacy_fields])
+
+    def _queue_clear_sessions(self, pipeline, contact_numbers: List[str]):
+        keys = []
+        for contact_number in contact_numbers:
+            contact_keys = [session_key(contact_number)] + [key(contact_number) for key in SESSION_COLLECTIONS.values()]
+            if LEGACY_SESSION_FALLBACK:
+                contact_keys.extend(legacy_key(field, contact_number) for field in LEGACY_FIELD_KEYS)
+            if TAGGED_SESSION_KEYS:
+                # A multi-key command must stay within one slot on Redis Cluster
+                pipeline.unlink(*contact_keys)
+            else:
+                keys.extend(contact_keys)
+        if keys:
+            pipeline.unlink(*keys)
+
+    # Feedback transitions
+
+    def _feedback_keys(self, contact_number) -> List[str]:
+        keys = [session_key(contact_number), messages_key(contact_number)]
+        if LEGACY_SESSION_FALLBACK:
+            keys.append(legacy_key(FEEDBACK_FIELD, contact_number))
+        return keys
+
+    @staticmethod
+    def _feedback_args(prompt: str, max_messages: int, last_messages: int) -> list:
+        return [prompt, SESSION_TTL, FEEDBACK_CLAIM_TIMEOUT, max_messages, last_messages]
+
+    def _queue_script(self, pipeline, script, keys: List[str], args: list):
+        if self._cluster:
+            # Cluster pipelines cannot preload scripts on the key's node, so send the source
+            pipeline.eval(script.script, len(keys), *keys, *args)
+            return
+        # What Script.__call__ does for a pipeline, without awaiting on asyncio pipelines
+        pipeline.scripts.add(script)
+        pipeline.evalsha(script.sha, len(keys), *keys, *args)
+
+    def _queue_start_feedback_turn(self, pipeline, contact_number, prompt: str, max_messages: int, last_messages: int):
+        self._queue_script(
+            pipeline, self._start_feedback_turn,
+            self._feedback_keys(contact_number), self._feedback_args(prompt, max_messages, last_messages)
+        )
+        return lambda replies: tuple(replies[0])
+
+    def _queue_release_feedback_answer(self, pipeline, contact_number):
+        self._queue_delete_fields(pipeline, contact_number, CLAIM_FIELD)
+
+    def _queue_finish_feedback_turn(self, pipeline, contact_number):
+        self._queue_script(pipeline, self._finish_feedback_turn, self._feedback_keys(contact_number), [])
+
+
+class RedisSessionBackend(RedisSessionCommands, SessionBackend):
+    """
+    Session backend on the Redis layout of RedisSessionCommands. Each call runs one
+    operation in its own pipeline; RedisSessionBatch queues many on one. get_fields
+    moves old-layout values into the hash. Feedback transitions are Lua scripts.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_client=None):
+        # Share the process-wide Redis connection pool unless a client is injected
+        self.redis_client = redis_client if redis_client is not None else get_redis_client()
+        self._register_scripts()
+
+    def batch(self) -> "RedisSessionBatch":
+        return RedisSessionBatch(self)
+
+    def _run(self, operation: str, contact_number, *args):
+        pipeline = self.redis_client.pipeline()
+        skip = self._queue_plain_fallback(pipeline, [contact_number])
+        decode = getattr(self, f"_queue_{operation}")(pipeline, contact_number, *args)
+        replies = pipeline.execute()[skip:] if len(pipeline) else []
+        return decode(replies) if decode is not None else None
+
+    def _move_plain_keys(self, contact_number):
+        """Operations not run through a pipeline move the plain keys first."""
+        if self._plain_fallback:
+            keys, args = plain_key_moves(contact_number)
+            self._move_to_tagged_keys(keys=keys, args=args)
+
+    def _run_many(self, operation: str, contact_numbers: List[str], *args) -> dict:
+        """Run a bulk operation with one pipeline per chunk of contacts; merges the chunk results."""
+        results = {}
+        for chunk in _chunks(contact_numbers):
+            pipeline = self.redis_client.pipeline(transaction=False)
+            skip = self._queue_plain_fallback(pipeline, chunk)
+            decode = getattr(self, f"_queue_{operation}")(pipeline, chunk, *args)
+            replies = pipeline.execute()[skip:]
+            if decode is not None:
+                results.update(decode(replies))
+        return results
+
+    def get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Optional[str]]:
+        return self._run_many("get_field_many", contact_numbers, field)
+
+    def get_fields_many(self, contact_numbers: List[str]) -> Dict[str, Dict[str, str]]:
+        return self._run_many("get_fields_many", contact_numbers)
+
+    def set_field_many(self, contact_numbers: List[str], field: str, value: str):
+        self._run_many("set_field_many", contact_numbers, field, value)
+
+    def delete_fields_many(self, contact_numbers: List[str], *fields: str):
+        self._run_many("delete_fields_many", contact_numbers, *fields)
+
+    def clear_sessions(self, contact_numbers: List[str]):
+        self._run_many("clear_sessions", contact_numbers)
+
+    def get_field(self, contact_number, field: str) -> Optional[str]:
+        return self._run("get_field", contact_number, field)
+
+    def get_fields(self, contact_number) -> Dict[str, str]:
+        pipeline = self.redis_client.pipeline(transaction=False)
+        skip = self._queue_plain_fallback(pipeline, [contact_number])
+        self._queue_get_fields(pipeline, contact_number)
+        raw, legacy = self._split_legacy_fields(pipeline.execute()[skip:])
+        if legacy:
+            pipeline = self.redis_client.pipeline()
+            self._queue_migrate_legacy_fields(pipeline, contact_number, legacy)
+            pipeline.execute()
+        return {**legacy, **raw}
+
+    def set_field(self, contact_number, field: str, value: str):
+        self._run("set_field", contact_number, field, value)
+
+    def delete_fields(self, contact_number, *fields: str):
+        self._run("delete_fields", contact_number, *fields)
+
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        self._run("push_list", contact_number, name, values, max_length)
+
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        self._move_plain_keys(contact_number)
+        return self.redis_client.lrange(SESSION_COLLECTIONS[name](contact_number), start, end)
+
+    def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        self._move_plain_keys(contact_number)
+        return self.redis_client.hgetall(SESSION_COLLECTIONS[name](contact_number))
+
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        self._run("set_map_field", contact_number, name, field, value)
+
+    def delete_map_field(self, contact_number, name: str, field: str):
+        self._move_plain_keys(contact_number)
+        self.redis_client.hdel(SESSION_COLLECTIONS[name](contact_number), field)
+
+    def delete_collection(self, contact_number, name: str):
+        self._move_plain_keys(contact_number)
+        self.redis_client.delete(SESSION_COLLECTIONS[name](contact_number))
+
+    def clear_session(self, contact_number):
+        self._run("clear_session", contact_number)
+
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        # Called directly rather than through _run: a pipeline would check the script
+        # is loaded first, costing a second round trip
+        self._move_plain_keys(contact_number)
+        state, messages = self._start_feedback_turn(
+            keys=self._feedback_keys(contact_number),
+            args=self._feedback_args(prompt, max_messages, last_messages)
+        )
+        return state, messages
+
+    def finish_feedback_turn(self, contact_number):
+        self._move_plain_keys(contact_number)
+        self._finish_feedback_turn(keys=self._feedback_keys(contact_number))
+
+
+class RedisSessionBatch(SessionBatch):
+    """
+    Queues the Redis backend's commands on one pipeline, so execute() is one round
+    trip (plus a SCRIPT EXISTS check when a feedback transition is queued). Legacy
+    values are read as by get_fields but not migrated.
+    """
+
+    def __init__(self, backend: RedisSessionCommands):
+        super().__init__(backend)
+        self._pipeline = backend.redis_client.pipeline(transaction=False)
+        # Per operation: (first command, end command, reply decoder, result or None)
+        self._queued = []
+
+    def _queue(self, operation: str, args: tuple) -> Tuple[int, int, Optional[Callable[[list], object]]]:
+        """Queue one operation's commands; returns their position and reply decoder."""
+        self._backend._queue_plain_fallback(self._pipeline, [args[0]])
+        start = len(self._pipeline)
+        decode = getattr(self._backend, f"_queue_{operation}")(self._pipeline, *args)
+        return start, len(self._pipeline), decode
+
+    def _read(self, operation: str, *args) -> PendingResult:
+        start, end, decode = self._queue(operation, args)
+        result = PendingResult(lambda value: value)
+        self._queued.append((start, end, decode, result))
+        return result
+
+    def _write(self, operation: str, *args):
+        start, end, _ = self._queue(operation, args)
+        self._queued.append((start, end, None, None))
+
+    def __len__(self) -> int:
+        return len(self._queued)
+
+    @staticmethod
+    def _resolve(queued: list, replies: list) -> int:
+        for start, end, decode, result in queued:
+            if result is not None:
+                result._resolve(decode(replies[start:end]))
+        return len(queued)
+
+    def execute(self) -> int:
+        """Send every queued command in one pipeline; returns how many operations ran."""
+        queued, self._queued = self._queued, []
+        if not queued:
+            return 0
+        return self._resolve(queued, self._pipeline.execute() if len(self._pipeline) else [])
+
+    def discard(self):
+        self._pipeline.reset()
+        self._queued = []
+
+
+class AsyncRedisSessionBatch(RedisSessionBatch):
+    """RedisSessionBatch on an asyncio pipeline: execute() and discard() are awaited."""
+
+    async def execute(self) -> int:
+        queued, self._queued = self._queued, []
+        if not queued:
+            return 0
+        return self._resolve(queued, await self._pipeline.execute() if len(self._pipeline) else [])
+
+    async def discard(self):
+        await self._pipeline.reset()
+        self._queued = []
+
+
+class AsyncRedisSessionBackend(RedisSessionCommands):
+    """
+    asyncio counterpart of RedisSessionBackend on redis.asyncio: the same operations
+    and Redis layout, each a coroutine. Uses the process's asyncio connection pool
+    (utils.redis_client.get_async_redis_client) unless a client is injected.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_client=None):
+        self.redis_client = redis_client if redis_client is not None else get_async_redis_client()
+        self._register_scripts()
+
+    def batch(self) -> AsyncRedisSessionBatch:
+        return AsyncRedisSessionBatch(self)
+
+    async def _run(self, operation: str, contact_number, *args):
+        pipeline = self.redis_client.pipeline()
+        skip = self._queue_plain_fallback(pipeline, [contact_number])
+        decode = getattr(self, f"_queue_{operation}")(pipeline, contact_number, *args)
+        replies = (await pipeline.execute())[skip:] if len(pipeline) else []
+        return decode(replies) if decode is not None else None
+
+    async def _move_plain_keys(self, contact_number):
+        if self._plain_fallback:
+            keys, args = plain_key_moves(contact_number)
+            await self._move_to_tagged_keys(keys=keys, args=args)
+
+    async def _run_many(self, operation: str, contact_numbers: List[str], *args) -> dict:
+        results = {}
+        for chunk in _chunks(contact_numbers):
+            pipeline = self.redis_client.pipeline(transaction=False)
+            skip = self._queue_plain_fallback(pipeline, chunk)
+            decode = getattr(self, f"_queue_{operation}")(pipeline, chunk, *args)
+            replies = (await pipeline.execute())[skip:]
+            if decode is not None:
+                results.update(decode(replies))
+        return results
+
+    async def get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Optional[str]]:
+        return await self._run_many("get_field_many", contact_numbers, field)
+
+    async def get_fields_many(self, contact_numbers: List[str]) -> Dict[str, Dict[str, str]]:
+        return await self._run_many("get_fields_many", contact_numbers)
+
+    async def set_field_many(self, contact_numbers: List[str], field: str, value: str):
+        await self._run_many("set_field_many", contact_numbers, field, value)
+
+    async def delete_fields_many(self, contact_numbers: List[str], *fields: str):
+        await self._run_many("delete_fields_many", contact_numbers, *fields)
+
+    async def clear_sessions(self, contact_numbers: List[str]):
+        await self._run_many("clear_sessions", contact_numbers)
+
+    async def get_field(self, contact_number, field: str) -> Optional[str]:
+        return await self._run("get_field", contact_number, field)
+
+    async def get_fields(self, contact_number) -> Dict[str, str]:
+        pipeline = self.redis_client.pipeline(transaction=False)
+        skip = self._queue_plain_fallback(pipeline, [contact_number])
+        self._queue_get_fields(pipeline, contact_number)
+        raw, legacy = self._split_legacy_fields((await pipeline.execute())[skip:])
+        if legacy:
+            pipeline = self.redis_client.pipeline()
+            self._queue_migrate_legacy_fields(pipeline, contact_number, legacy)
+            await pipeline.execute()
+        return {**legacy, **raw}
+
+    async def set_field(self, contact_number, field: str, value: str):
+        await self._run("set_field", contact_number, field, value)
+
+    async def delete_fields(self, contact_number, *fields: str):
+        await self._run("delete_fields", contact_number, *fields)
+
+    async def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        await self._run("push_list", contact_number, name, values, max_length)
+
+    async def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        await self._move_plain_keys(contact_number)
+        return await self.redis_client.lrange(SESSION_COLLECTIONS[name](contact_number), start, end)
+
+    async def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        await self._move_plain_keys(contact_number)
+        return await self.redis_client.hgetall(SESSION_COLLECTIONS[name](contact_number))
+
+    async def set_map_field(self, contact_number, name: str, field: str, value: str):
+        await self._run("set_map_field", contact_number, name, field, value)
+
+    async def delete_map_field(self, contact_number, name: str, field: str):
+        await self._move_plain_keys(contact_number)
+        await self.redis_client.hdel(SESSION_COLLECTIONS[name](contact_number), field)
+
+    async def delete_collection(self, contact_number, name: str):
+        await self._move_plain_keys(contact_number)
+        await self.redis_client.delete(SESSION_COLLECTIONS[name](contact_number))
+
+    async def clear_session(self, contact_number):
+        await self._run("clear_session", contact_number)
+
+    async def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        await self._move_plain_keys(contact_number)
+        state, messages = await self._start_feedback_turn(
+            keys=self._feedback_keys(contact_number),
+            args=self._feedback_args(prompt, max_messages, last_messages)
+        )
+        return state, messages
+
+    async def release_feedback_answer(self, contact_number):
+        await self.delete_fields(contact_number, CLAIM_FIELD)
+
+    async def finish_feedback_turn(self, contact_number):
+        await self._move_plain_keys(contact_number)
+        await self._finish_feedback_turn(keys=self._feedback_keys(contact_number))
+
+
+class _MemorySession:
+    __slots__ = ("fields", "collections", "expires_at")
+
+    def __init__(self, fields=None, collections=None, expires_at: float = 0):
+        self.fields = fields or {}
+        self.collections = collections or {}
+        self.expires_at = expires_at
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    In-process session store for single-node deployments and tests.
+
+    Each contact maps to an immutable _MemorySession snapshot. Writes build a new
+    snapshot under a lock and swap it in, so reads never take the lock.
+    """
+
+    name = "memory"
+
+    # Expired snapshots are swept after this many writes
+    PURGE_EVERY = 1000
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self._sessions: Dict[str, _MemorySession] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _live(self, contact_number) -> Optional[_MemorySession]:
+        session = self._sessions.get(contact_number)
+        if session is None or session.expires_at <= time.monotonic():
+            return None
+        return session
+
+    @contextmanager
+    def _write(self, contact_number):
+        """Yield a private copy of the contact's session and publish it afterwards."""
+        with self._lock:
+            current = self._live(contact_number) or _MemorySession()
+            draft = _MemorySession(dict(current.fields), dict(current.collections), time.monotonic() + self.ttl)
+            yield draft
+            self._sessions[contact_number] = draft
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                now = time.monotonic()
+                for key in [key for key, session in self._sessions.items() if session.expires_at <= now]:
+                    del self._sessions[key]
+
+    def get_field(self, contact_number, field: str) -> Optional[str]:
+        session = self._live(contact_number)
+        return session.fields.get(field) if session else None
+
+    def get_fields(self, contact_number) -> Dict[str, str]:
+        session = self._live(contact_number)
+        return dict(session.fields) if session else {}
+
+    def set_field(self, contact_number, field: str, value: str):
+        with self._write(contact_number) as session:
+            session.fields[field] = value
+
+    def delete_fields(self, contact_number, *fields: str):
+        with self._write(contact_number) as session:
+            for field in fields:
+                session.fields.pop(field, None)
+
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        if not values:
+            return
+        with self._write(contact_number) as session:
+            items = session.collections.get(name, ()) + tuple(values)
+            session.collections[name] = items[-max_length:] if max_length else items
+
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        session = self._live(contact_number)
+        return _list_slice(session.collections.get(name, ()), start, end) if session else []
+
+    def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        session = self._live(contact_number)
+        return dict(session.collections.get(name, {})) if session else {}
+
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        with self._write(contact_number) as session:
+            session.collections[name] = {**session.collections.get(name, {}), field: value}
+
+    def delete_map_field(self, contact_number, name: str, field: str):
+        with self._write(contact_number) as session:
+            values = dict(session.collections.get(name, {}))
+            values.pop(field, None)
+            session.collections[name] = values
+
+    def delete_collection(self, contact_number, name: str):
+        with self._write(contact_number) as session:
+            session.collections.pop(name, None)
+
+    def clear_session(self, contact_number):
+        with self._lock:
+            self._sessions.pop(contact_number, None)
+
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        with self._write(contact_number) as session:
+            if session.fields.get(FEEDBACK_FIELD) != "1":
+                session.fields[FEEDBACK_FIELD] = "1"
+                session.fields.pop(CLAIM_FIELD, None)
+                session.collections[MESSAGES] = (session.collections.get(MESSAGES, ()) + (prompt,))[-max_messages:]
+                return FEEDBACK_ASK, []
+
+            now = time.time()
+            claimed_at = float(session.fields.get(CLAIM_FIELD) or 0)
+            if claimed_at and now - claimed_at < FEEDBACK_CLAIM_TIMEOUT:
+                return FEEDBACK_BUSY, []
+
+            session.fields[CLAIM_FIELD] = str(int(now))
+            messages = session.collections.get(MESSAGES, ())
+            return FEEDBACK_ANSWER, list(messages[-last_messages:]) if last_messages > 0 else []
+
+    def finish_feedback_turn(self, contact_number):
+        with self._write(contact_number) as session:
+            session.fields.pop(FEEDBACK_FIELD, None)
+            session.fields.pop(CLAIM_FIELD, None)
+            session.collections.pop(MESSAGES, None)
+
+
+@contextmanager
+def _app_session():
+    """Database session in its own app context, committed when the block succeeds."""
+    from app import app, db
+    with app.app_context():
+        try:
+            yield db.session
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+class SqlSessionBackend(SessionBackend):
+    """
+    Session state in the session_state table: one row per (contact, field). Lists and
+    maps are JSON rows named "list:<name>" / "map:<name>". A row expires SESSION_TTL
+    seconds after its last write. Read-modify-write operations hold a per-contact
+    Postgres advisory lock so feedback transitions stay atomic across workers.
+
+    Reads ignore expired rows; they are deleted by purge_expired(), which a write runs
+    (PURGE_BATCH_SIZE rows at a time) at most once per purge_interval seconds, and by
+    `flask purge-session-state`.
+    """
+
+    name = "sql"
+    PURGE_BATCH_SIZE = 1000
+
+    def __init__(self, session_factory=None, ttl: float = SESSION_TTL, purge_interval: float = 300):
+        self._session_factory = session_factory or _app_session
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+
+    @staticmethod
+    def _collection_key(name: str) -> str:
+        return f"map:{name}" if name == "field_confirmation_list" else f"list:{name}"
+
+    def _cutoff(self) -> datetime:
+        return datetime.now() - timedelta(seconds=self.ttl)
+
+    @staticmethod
+    def _lock_contact(db, contact_number):
+        if db.get_bind().dialect.name == "postgresql":
+            from sqlalchemy import text
+            db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:contact_number))"), {"contact_number": str(contact_number)})
+
+    def _values_many(self, db, contact_numbers: List[str], keys: Optional[List[str]] = None) -> Dict[str, Dict[str, str]]:
+        from Files.SQLAlchemyModels import SessionState
+        query = db.query(SessionState.contact_number, SessionState.session_key, SessionState.session_value).filter(
+            SessionState.contact_number.in_([str(contact_number) for contact_number in contact_numbers]),
+            SessionState.updated_at >= self._cutoff()
+        )
+        if keys is not None:
+            query = query.filter(SessionState.session_key.in_(keys))
+        values = {str(contact_number): {} for contact_number in contact_numbers}
+        for contact_number, key, value in query.all():
+            values[contact_number][key] = value
+        return values
+
+    def _values(self, db, contact_number, keys: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        from Files.SQLAlchemyModels import SessionState
+        query = db.query(SessionState.session_key, SessionState.session_value).filter(
+            SessionState.contact_number == str(contact_number),
+            SessionState.updated_at >= self._cutoff()
+        )
+        if keys is not None:
+            query = query.filter(SessionState.session_key.in_(keys))
+        return {key: value for key, value in query.all()}
+
+    def _upsert(self, db, contact_number, values: Dict[str, str]):
+        self._upsert_rows(db, [(contact_number, key, value) for key, value in values.items()])
+
+    def _upsert_rows(self, db, rows: List[Tuple[str, str, str]]):
+        """Insert or update (contact_number, session_key, session_value) rows in one statement."""
+        from sqlalchemy.dialects.postgresql import insert
+        from Files.SQLAlchemyModels import SessionState
+        now = datetime.now()
+        stmt = insert(SessionState).values([
+            {"contact_number": str(contact_number), "session_key": key, "session_value": value, "created_at": now, "updated_at": now}
+            for contact_number, key, value in rows
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["contact_number", "session_key"],
+            set_={"session_value": stmt.excluded.session_value, "updated_at": stmt.excluded.updated_at}
+        ))
+        if time.monotonic() >= self._next_purge:
+            self._next_purge = time.monotonic() + self.purge_interval
+            self._purge(db, self.PURGE_BATCH_SIZE)
+
+    def _purge(self, db, batch_size: Optional[int] = None) -> int:
+        from sqlalchemy import delete, select
+        from Files.SQLAlchemyModels import SessionState
+        expired = select(SessionState.id).where(SessionState.updated_at < self._cutoff())
+        if batch_size is not None:
+            expired = expired.limit(batch_size)
+        return db.execute(delete(SessionState).where(SessionState.id.in_(expired))).rowcount
+
+    def purge_expired(self, batch_size: Optional[int] = None) -> int:
+        """Delete rows older than the TTL (at most batch_size of them); returns how many."""
+        with self._session_factory() as db:
+            return self._purge(db, batch_size)
+
+    @classmethod
+    def _delete(cls, db, contact_number, keys: Optional[List[str]] = None):
+        cls._delete_many(db, [contact_number], keys)
+
+    @staticmethod
+    def _delete_many(db, contact_numbers: List[str], keys: Optional[List[str]] = None):
+        from Files.SQLAlchemyModels import SessionState
+        query = db.query(SessionState).filter(SessionState.contact_number.in_([str(contact_number) for contact_number in contact_numbers]))
+        if keys is not None:
+            query = query.filter(SessionState.session_key.in_(keys))
+        query.delete(synchronize_session=False)
+
+    # Bulk operations: one statement per chunk of contacts, all in one transaction
+
+    def get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Optional[str]]:
+        values = {}
+        with self._session_factory() as db:
+            for chunk in _chunks(contact_numbers):
+                values.update({contact_number: fields.get(field) for contact_number, fields in self._values_many(db, chunk, [field]).items()})
+        return values
+
+    def get_fields_many(self, contact_numbers: List[str]) -> Dict[str, Dict[str, str]]:
+        sessions = {}
+        with self._session_factory() as db:
+            for chunk in _chunks(contact_numbers):
+                for contact_number, fields in self._values_many(db, chunk).items():
+                    sessions[contact_number] = {key: value for key, value in fields.items() if not key.startswith(("list:", "map:"))}
+        return sessions
+
+    def set_field_many(self, contact_numbers: List[str], field: str, value: str):
+        with self._session_factory() as db:
+            for chunk in _chunks(contact_numbers):
+                self._upsert_rows(db, [(contact_number, field, value) for contact_number in chunk])
+
+    def delete_fields_many(self, contact_numbers: List[str], *fields: str):
+        with self._session_factory() as db:
+            for chunk in _chunks(contact_numbers):
+                self._delete_many(db, chunk, list(fields))
+
+    def clear_sessions(self, contact_numbers: List[str]):
+        with self._session_factory() as db:
+            for chunk in _chunks(contact_numbers):
+                self._delete_many(db, chunk)
+
+    def get_field(self, contact_number, field: str) -> Optional[str]:
+        with self._session_factory() as db:
+            return self._values(db, contact_number, [field]).get(field)
+
+    def get_fields(self, contact_number) -> Dict[str, str]:
+        with self._session_factory() as db:
+            return {
+                key: value for key, value in self._values(db, contact_number).items()
+                if not key.startswith(("list:", "map:"))
+            }
+
+    def set_field(self, contact_number, field: str, value: str):
+        with self._session_factory() as db:
+            self._upsert(db, contact_number, {field: value})
+
+    def delete_fields(self, contact_number, *fields: str):
+        with self._session_factory() as db:
+            self._delete(db, contact_number, list(fields))
+
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        if not values:
+            return
+        key = self._collection_key(name)
+        with self._session_factory() as db:
+            self._lock_contact(db, contact_number)
+            items = json.loads(self._values(db, contact_number, [key]).get(key) or "[]") + list(values)
+            self._upsert(db, contact_number, {key: json.dumps(items[-max_length:] if max_length else items)})
+
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        key = self._collection_key(name)
+        with self._session_factory() as db:
+            return _list_slice(json.loads(self._values(db, contact_number, [key]).get(key) or "[]"), start, end)
+
+    def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        key = self._collection_key(name)
+        with self._session_factory() as db:
+            return json.loads(self._values(db, contact_number, [key]).get(key) or "{}")
+
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        key = self._collection_key(name)
+        with self._session_factory() as db:
+            self._lock_contact(db, contact_number)
+            values = json.loads(self._values(db, contact_number, [key]).get(key) or "{}")
+            values[field] = value
+            self._upsert(db, contact_number, {key: json.dumps(values)})
+
+    def delete_map_field(self, contact_number, name: str, field: str):
+        key = self._collection_key(name)
+        with self._session_factory() as db:
+            self._lock_contact(db, contact_number)
+            values = json.loads(self._values(db, contact_number, [key]).get(key) or "{}")
+            if values.pop(field, None) is not None:
+                self._upsert(db, contact_number, {key: json.dumps(values)})
+
+    def delete_collection(self, contact_number, name: str):
+        with self._session_factory() as db:
+            self._delete(db, contact_number, [self._collection_key(name)])
+
+    def clear_session(self, contact_number):
+        with self._session_factory() as db:
+            self._delete(db, contact_number)
+
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        messages_row = self._collection_key(MESSAGES)
+        with self._session_factory() as db:
+            self._lock_contact(db, contact_number)
+            values = self._values(db, contact_number, [FEEDBACK_FIELD, CLAIM_FIELD, messages_row])
+            messages = json.loads(values.get(messages_row) or "[]")
+
+            if values.get(FEEDBACK_FIELD) != "1":
+                self._delete(db, contact_number, [CLAIM_FIELD])
+                self._upsert(db, contact_number, {FEEDBACK_FIELD: "1", messages_row: json.dumps((messages + [prompt])[-max_messages:])})
+                return FEEDBACK_ASK, []
+
+            now = time.time()
+            claimed_at = float(values.get(CLAIM_FIELD) or 0)
+            if claimed_at and now - claimed_at < FEEDBACK_CLAIM_TIMEOUT:
+                return FEEDBACK_BUSY, []
+
+            self._upsert(db, contact_number, {CLAIM_FIELD: str(int(now))})
+            return FEEDBACK_ANSWER, messages[-last_messages:] if last_messages > 0 else []
+
+    def finish_feedback_turn(self, contact_number):
+        with self._session_factory() as db:
+            self._delete(db, contact_number, [FEEDBACK_FIELD, CLAIM_FIELD, self._collection_key(MESSAGES)])
+
+
+SESSION_BACKENDS = {
+    "redis": RedisSessionBackend,
+    "memory": MemorySessionBackend,
+    "sql": SqlSessionBackend,
+}
+
+# asyncio implementations of the SESSION_BACKEND choices
+ASYNC_SESSION_BACKENDS = {
+    "redis": AsyncRedisSessionBackend,
+}
+
+_backend: Optional[SessionBackend] = None
+_async_backend: Optional[AsyncRedisSessionBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_session_backend(name: str) -> SessionBackend:
+    if name not in SESSION_BACKENDS:
+        raise ValueError(f"Unknown session backend: {name} (expected one of {', '.join(SESSION_BACKENDS)})")
+    return SESSION_BACKENDS[name]()
+
+
+def get_session_backend() -> SessionBackend:
+    """
+    The process-wide session backend chosen by SESSION_BACKEND (default "redis"),
+    behind an in-process near cache of the session fields when SESSION_NEAR_CACHE=1.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = create_session_backend(os.getenv("SESSION_BACKEND", "redis"))
+                if os.getenv("SESSION_NEAR_CACHE", "0") == "1":
+                    from services.session_near_cache import create_near_cache
+                    backend = create_near_cache(
+                        backend,
+                        maxsize=int(os.getenv("SESSION_NEAR_CACHE_SIZE", "10000")),
+                        ttl=float(os.getenv("SESSION_NEAR_CACHE_TTL", "30"))
+                    )
+                _backend = backend
+    return _backend
+
+
+def get_async_session_backend() -> AsyncRedisSessionBackend:
+    """
+    The process-wide asyncio session backend for the same SESSION_BACKEND as
+    get_session_backend(). The near cache is not used: its keyspace listener sees
+    asyncio writes like any other client's, so sync reads stay consistent.
+    """
+    global _async_backend
+    if _async_backend is None:
+        name = os.getenv("SESSION_BACKEND", "redis")
+        if name not in ASYNC_SESSION_BACKENDS:
+            raise ValueError(
+                f"SESSION_BACKEND={name} has no asyncio implementation "
+                f"(asyncio services support: {', '.join(ASYNC_SESSION_BACKENDS)})"
+            )
+        with _backend_lock:
+            if _async_backend is None:
+                _async_backend = ASYNC_SESSION_BACKENDS[name]()
+    return _async_backend
@@ -0,0 +1,105 @@
+import re
+from typing import Dict, Iterator, List, Tuple
+from utils.session_keys import SESSION_TTL, SESSION_MAX_MESSAGES, SESSION_KEY_FORMATS, LEGACY_FIELD_KEYS, contact_tag
+
+# KEYS: plain keys, then their tagged names in the same order
+# ARGV: per key, how many list items to keep when merging lists (0 keeps all)
+# Moves each plain key that exists to its tagged name in one step, keeping its TTL.
+# When the tagged key exists too it was written after the switch: hash fields it
+# lacks are copied over, and the older plain list items go before its own.
+MOVE_TO_TAGGED_KEYS = """
+local count = #KEYS / 2
+local moved = 0
+for i = 1, count do
+    local source, target = KEYS[i], KEYS[count + i]
+    local kind = redis.call('TYPE', source)['ok']
+    if kind ~= 'none' then
+        if redis.call('EXISTS', target) == 0 then
+            redis.call('RENAME', source, target)
+        else
+            if kind == 'hash' then
+                local entries = redis.call('HGETALL', source)
+                for j = 1, #entries, 2 do
+                    redis.call('HSETNX', target, entries[j], entries[j + 1])
+                end
+            elseif kind == 'list' then
+                local items = redis.call('LRANGE', source, 0, -1)
+                for j = #items, 1, -1 do
+                    redis.call('LPUSH', target, items[j])
+                end
+                local keep = tonumber(ARGV[i])
+                if keep > 0 then
+                    redis.call('LTRIM', target, -keep, -1)
+                end
+            end
+            redis.call('DEL', source)
+        end
+        moved = moved + 1
+    end
+end
+return moved
+"""
+
+# List items kept per structure when a plain list is merged into a tagged one
+_KEEP = {"messages": SESSION_MAX_MESSAGES}
+
+
+def plain_key_moves(contact_number) -> Tuple[List[str], List[int]]:
+    """KEYS and ARGV of MOVE_TO_TAGGED_KEYS for every session key of one contact."""
+    plain = [key_format.format(contact=contact_tag(contact_number, tagged=False)) for key_format in SESSION_KEY_FORMATS.values()]
+    tagged = [key_format.format(contact=contact_tag(contact_number, tagged=True)) for key_format in SESSION_KEY_FORMATS.values()]
+    return plain + tagged, [_KEEP.get(name, 0) for name in SESSION_KEY_FORMATS]
+
+
+def _plain_pattern(key_format: str, placeholder: str) -> Tuple[str, "re.Pattern"]:
+    """SCAN pattern and parser of a plain (untagged) key format."""
+    prefix, suffix = key_format.split(placeholder)
+    return prefix + "*" + suffix, re.compile(re.escape(prefix) + r"([^{}]+)" + re.escape(suffix) + "$")
+
+
+def _plain_keys(redis_client, key_format: str, placeholder: str, count: int) -> Iterator[Tuple[str, str]]:
+    """(key, contact number) of every plain key of one format."""
+    pattern, parser = _plain_pattern(key_format, placeholder)
+    for key in redis_client.scan_iter(match=pattern, count=count):
+        match = parser.match(key)
+        # Skips tagged keys ({...}) and keys of other formats sharing the pattern
+        if match:
+            yield key, match.group(1)
+
+
+def migrate_session_keys(redis_client, dry_run: bool = False, count: int = 500) -> Dict[str, int]:
+    """
+    Move sessions from plain keys to hash-tagged keys (SESSION_KEY_SCHEME=tagged).
+
+    Every plain session hash, message list, contact list and field confirmation map
+    is renamed to its tagged name by MOVE_TO_TAGGED_KEYS, atomically and keeping the
+    TTL. A tagged key that already exists was written after the switch: session
+    hashes and maps are merged field by field (the tagged value wins) and the plain
+    list items are put before the tagged ones. Old one-key-per-flag values are
+    folded into the tagged session hash. Runs against standalone Redis only (the two
+    names of a key are in different slots); safe to run more than once and while
+    workers are serving. Returns the number of plain keys found per structure.
+    """
+    move = redis_client.register_script(MOVE_TO_TAGGED_KEYS)
+    moved: Dict[str, int] = {}
+    for name, key_format in SESSION_KEY_FORMATS.items():
+        moved[name] = 0
+        for key, contact_number in list(_plain_keys(redis_client, key_format, "{contact}", count)):
+            target = key_format.format(contact=contact_tag(contact_number, tagged=True))
+            moved[name] += 1
+            if not dry_run:
+                move(keys=[key, target], args=[_KEEP.get(name, 0)])
+
+    moved["legacy_flags"] = 0
+    for field, key_format in LEGACY_FIELD_KEYS.items():
+        for key, contact_number in list(_plain_keys(redis_client, key_format, "{contact_number}", count)):
+            moved["legacy_flags"] += 1
+            if dry_run:
+                continue
+            value = redis_client.get(key)
+            if value is not None:
+                target = SESSION_KEY_FORMATS["session"].format(contact=contact_tag(contact_number, tagged=True))
+                redis_client.hsetnx(target, field, value)
+                redis_client.expire(target, SESSION_TTL)
+            redis_client.unlink(key)
+    return moved
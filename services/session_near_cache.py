@@ -0,0 +1,413 @@
+import itertools
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from services.session_backends import SessionBackend, SessionBatch, RedisSessionBackend
+from utils.redis_client import is_cluster_client
+from utils.session_keys import SESSION_KEY_FORMATS, contact_from_tag
+from utils.ttl_cache import TTLCache
+
+# Keyspace events that do not change a session hash's fields
+_IGNORED_EVENTS = {"expire"}
+
+
+class _CachedFields:
+    """Known session fields of one contact; a field missing from `fields` is unknown."""
+    __slots__ = ("generation", "fields", "complete")
+
+    def __init__(self, generation: int, fields: Optional[Dict[str, Optional[str]]] = None, complete: bool = False):
+        self.generation = generation
+        self.fields = fields or {}
+        # get_fields filled every field: missing ones are known to be unset
+        self.complete = complete
+
+
+class NearCacheSessionBackend(SessionBackend):
+    """
+    In-process LRU/TTL cache of the session hash fields in front of another backend.
+
+    Field reads are served locally once seen; writes made through this backend update
+    the cached fields directly. Writes from other processes are picked up through
+    invalidate(), called by KeyspaceInvalidationListener on Redis, or otherwise when
+    the entry's TTL expires. Lists, maps and messages are not cached.
+
+    A read only stores what it fetched if the contact was not written or invalidated
+    meanwhile, so an invalidation racing a read cannot leave a stale entry behind.
+
+    The keyspace event of this process's own field write is skipped rather than
+    invalidating the entry the write just updated: each HSET announces the one event
+    it is sure to cause before it is sent (see skip_own_event).
+    """
+
+    def __init__(self, backend: SessionBackend, maxsize: int = 10000, ttl: float = 30):
+        self.backend = backend
+        self.name = backend.name
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generations = itertools.count(1)
+        # While the invalidation listener is disconnected, reads bypass the cache
+        self.enabled = True
+        # Set by KeyspaceInvalidationListener; own keyspace events expected per contact
+        self.track_own_events = False
+        self._own_events: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def redis_client(self):
+        return getattr(self.backend, "redis_client", None)
+
+    # Cache bookkeeping
+
+    def _entry_for_read(self, contact_number) -> Optional[_CachedFields]:
+        with self._lock:
+            entry = self._entries.get(contact_number)
+            if entry is None:
+                entry = _CachedFields(next(self._generations))
+                self._entries.set(contact_number, entry)
+            return entry
+
+    def _store(self, contact_number, generation: int, fields: Dict[str, Optional[str]], complete: bool = False):
+        with self._lock:
+            entry = self._entries.get(contact_number)
+            if entry is None or entry.generation != generation:
+                return
+            # Replace rather than mutate, so lock-free readers see a consistent entry
+            self._entries.set(contact_number, _CachedFields(
+                generation, {**entry.fields, **fields}, complete or entry.complete
+            ))
+
+    def _written(self, contact_number, fields: Dict[str, Optional[str]]):
+        """Apply this process's own write; reads in flight for the contact are not stored."""
+        with self._lock:
+            entry = self._entries.get(contact_number)
+            if entry is None:
+                return
+            self._entries.set(contact_number, _CachedFields(
+                next(self._generations), {**entry.fields, **fields}, entry.complete
+            ))
+
+    def invalidate(self, contact_number=None):
+        """Forget one contact's cached fields, or every contact's."""
+        with self._lock:
+            if contact_number is None:
+                self._entries.clear()
+            else:
+                self._entries.delete(contact_number)
+            self.invalidations += 1
+
+    def _expect_own_events(self, contact_numbers: List[str]):
+        if not (self.track_own_events and self.enabled):
+            return
+        with self._lock:
+            for contact_number in contact_numbers:
+                key = str(contact_number)
+                self._own_events[key] = self._own_events.get(key, 0) + 1
+
+    def _cancel_own_events(self, contact_numbers: List[str]):
+        with self._lock:
+            for contact_number in contact_numbers:
+                key = str(contact_number)
+                count = self._own_events.get(key, 0)
+                if count <= 1:
+                    self._own_events.pop(key, None)
+                else:
+                    self._own_events[key] = count - 1
+
+    def skip_own_event(self, contact_number) -> bool:
+        """
+        Consume one expected own event of the contact; True if there was one.
+
+        Only events a write is certain to cause are expected (an HSET always
+        announces "hset"), so a skipped event is never left unmatched. If another
+        client's event is consumed first, the own write's event invalidates instead.
+        """
+        with self._lock:
+            count = self._own_events.get(str(contact_number))
+        if not count:
+            return False
+        self._cancel_own_events([contact_number])
+        return True
+
+    def reset_own_events(self):
+        with self._lock:
+            self._own_events.clear()
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, object]:
+        """Field reads served locally vs. fetched, and the cache size."""
+        with self._lock:
+            hits, misses, invalidations = self.hits, self.misses, self.invalidations
+        lookups = hits + misses
+        stats = self._entries.stats()
+        stats.update({
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "invalidations": invalidations,
+            "enabled": self.enabled
+        })
+        return stats
+
+    # Cached field operations
+
+    def get_field(self, contact_number, field: str) -> Optional[str]:
+        if not self.enabled:
+            return self.backend.get_field(contact_number, field)
+        entry = self._entry_for_read(contact_number)
+        if field in entry.fields or entry.complete:
+            self._count(hit=True)
+            return entry.fields.get(field)
+        self._count(hit=False)
+        value = self.backend.get_field(contact_number, field)
+        self._store(contact_number, entry.generation, {field: value})
+        return value
+
+    def get_fields(self, contact_number) -> Dict[str, str]:
+        if not self.enabled:
+            return self.backend.get_fields(contact_number)
+        entry = self._entry_for_read(contact_number)
+        if entry.complete:
+            self._count(hit=True)
+            return {field: value for field, value in entry.fields.items() if value is not None}
+        self._count(hit=False)
+        values = self.backend.get_fields(contact_number)
+        self._store(contact_number, entry.generation, dict(values), complete=True)
+        return values
+
+    def set_field(self, contact_number, field: str, value: str):
+        self._expect_own_events([contact_number])
+        try:
+            self.backend.set_field(contact_number, field, value)
+        except Exception:
+            # If the write did reach Redis, its event now invalidates instead
+            self._cancel_own_events([contact_number])
+            raise
+        self._written(contact_number, {field: value})
+
+    def delete_fields(self, contact_number, *fields: str):
+        self.backend.delete_fields(contact_number, *fields)
+        self._written(contact_number, dict.fromkeys(fields))
+
+    def clear_session(self, contact_number):
+        self.backend.clear_session(contact_number)
+        self.invalidate(contact_number)
+
+    def start_feedback_turn(self, contact_number, prompt: str, max_messages: int, last_messages: int) -> Tuple[str, List[str]]:
+        try:
+            return self.backend.start_feedback_turn(contact_number, prompt, max_messages, last_messages)
+        finally:
+            # The transition sets the feedback flag or the answer claim
+            self.invalidate(contact_number)
+
+    def release_feedback_answer(self, contact_number):
+        self.backend.release_feedback_answer(contact_number)
+        self.invalidate(contact_number)
+
+    def finish_feedback_turn(self, contact_number):
+        self.backend.finish_feedback_turn(contact_number)
+        self.invalidate(contact_number)
+
+    # Bulk operations
+
+    def get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Optional[str]]:
+        if not self.enabled:
+            return self.backend.get_field_many(contact_numbers, field)
+        values, missing = {}, {}
+        for contact_number in contact_numbers:
+            entry = self._entry_for_read(contact_number)
+            if field in entry.fields or entry.complete:
+                values[contact_number] = entry.fields.get(field)
+            else:
+                missing[contact_number] = entry.generation
+        with self._lock:
+            self.hits += len(values)
+            self.misses += len(missing)
+        if missing:
+            fetched = self.backend.get_field_many(list(missing), field)
+            for contact_number, value in fetched.items():
+                self._store(contact_number, missing[contact_number], {field: value})
+            values.update(fetched)
+        return values
+
+    def get_fields_many(self, contact_numbers: List[str]) -> Dict[str, Dict[str, str]]:
+        return self.backend.get_fields_many(contact_numbers)
+
+    def set_field_many(self, contact_numbers: List[str], field: str, value: str):
+        self._expect_own_events(contact_numbers)
+        try:
+            self.backend.set_field_many(contact_numbers, field, value)
+        except Exception:
+            self._cancel_own_events(contact_numbers)
+            raise
+        for contact_number in contact_numbers:
+            self._written(contact_number, {field: value})
+
+    def delete_fields_many(self, contact_numbers: List[str], *fields: str):
+        self.backend.delete_fields_many(contact_numbers, *fields)
+        for contact_number in contact_numbers:
+            self._written(contact_number, dict.fromkeys(fields))
+
+    def clear_sessions(self, contact_numbers: List[str]):
+        self.backend.clear_sessions(contact_numbers)
+        for contact_number in contact_numbers:
+            self.invalidate(contact_number)
+
+    # Collections are passed through
+
+    def push_list(self, contact_number, name: str, values: List[str], max_length: Optional[int] = None):
+        self.backend.push_list(contact_number, name, values, max_length)
+
+    def get_list(self, contact_number, name: str, start: int = 0, end: int = -1) -> List[str]:
+        return self.backend.get_list(contact_number, name, start, end)
+
+    def get_map(self, contact_number, name: str) -> Dict[str, str]:
+        return self.backend.get_map(contact_number, name)
+
+    def set_map_field(self, contact_number, name: str, field: str, value: str):
+        self.backend.set_map_field(contact_number, name, field, value)
+
+    def delete_map_field(self, contact_number, name: str, field: str):
+        self.backend.delete_map_field(contact_number, name, field)
+
+    def delete_collection(self, contact_number, name: str):
+        self.backend.delete_collection(contact_number, name)
+
+    def batch(self) -> "NearCacheSessionBatch":
+        return NearCacheSessionBatch(self)
+
+
+class NearCacheSessionBatch(SessionBatch):
+    """
+    The wrapped backend's batch (one pipeline on Redis); reads go to the backend and
+    contacts whose fields were written are invalidated once the batch has run.
+    """
+
+    # Operations that change session hash fields
+    FIELD_WRITES = {"set_field", "delete_fields", "clear_session", "start_feedback_turn",
+                    "release_feedback_answer", "finish_feedback_turn"}
+
+    def __init__(self, backend: NearCacheSessionBackend):
+        super().__init__(backend)
+        self._batch = backend.backend.batch()
+        self._written = set()
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def _read(self, operation: str, *args):
+        if operation in self.FIELD_WRITES:
+            self._written.add(args[0])
+        return getattr(self._batch, operation)(*args)
+
+    def _write(self, operation: str, *args):
+        if operation in self.FIELD_WRITES:
+            self._written.add(args[0])
+        getattr(self._batch, operation)(*args)
+
+    def execute(self) -> int:
+        written, self._written = self._written, set()
+        try:
+            return self._batch.execute()
+        finally:
+            for contact_number in written:
+                self._backend.invalidate(contact_number)
+
+    def discard(self):
+        self._batch.discard()
+        self._written = set()
+
+
+class KeyspaceInvalidationListener:
+    """
+    Invalidates a NearCacheSessionBackend when another client changes a session hash.
+
+    Subscribes to Redis keyspace notifications for session:* keys on a background
+    thread. The server must publish hash and generic events (notify-keyspace-events
+    "Khgxe"); the listener tries to enable them with CONFIG SET. While it is
+    disconnected the cache is bypassed and emptied, since events may have been missed.
+    """
+
+    RETRY_SECONDS = 1.0
+
+    def __init__(self, cache: NearCacheSessionBackend, redis_client, db: int = 0):
+        self.cache = cache
+        self.redis_client = redis_client
+        prefix = f"__keyspace@{db}__:" + SESSION_KEY_FORMATS["session"].split("{contact}")[0]
+        self.pattern = prefix + "*"
+        self._prefix_length = len(prefix)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> "KeyspaceInvalidationListener":
+        self.cache.track_own_events = True
+        self._thread = threading.Thread(target=self._run, name="session-near-cache-invalidation", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _enable_notifications(self):
+        try:
+            self.redis_client.config_set("notify-keyspace-events", "Khgxe")
+        except Exception as e:
+            # Managed Redis often forbids CONFIG; the setting must then be made server-side
+            print(f"[SessionNearCache] Could not enable keyspace notifications: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.cache.enabled = False
+            self.cache.invalidate()
+            self.cache.reset_own_events()
+            try:
+                self._enable_notifications()
+                pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(self.pattern)
+                self.cache.enabled = True
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self.handle(message)
+                pubsub.close()
+            except Exception as e:
+                print(f"[SessionNearCache] Invalidation listener disconnected: {e}")
+                time.sleep(self.RETRY_SECONDS)
+        self.cache.enabled = False
+        self.cache.track_own_events = False
+
+    def handle(self, message: dict):
+        """Invalidate the contact named by one keyspace notification."""
+        if message.get("type") != "pmessage" or message.get("data") in _IGNORED_EVENTS:
+            return
+        tag = message["channel"][self._prefix_length:]
+        if ":" in tag:
+            # Another structure of the contact (e.g. session:{contact}:...), not the hash
+            return
+        contact_number = contact_from_tag(tag)
+        if message.get("data") == "hset" and self.cache.skip_own_event(contact_number):
+            return
+        self.cache.invalidate(contact_number)
+
+
+def create_near_cache(backend: SessionBackend, maxsize: int, ttl: float) -> SessionBackend:
+    """
+    Wrap backend in a near cache; on standalone Redis, start the keyspace invalidation
+    listener. On Redis Cluster, keyspace notifications are per node and the listener
+    would miss other nodes' writes, so the backend is returned uncached.
+    """
+    if isinstance(backend, RedisSessionBackend) and is_cluster_client(backend.redis_client):
+        print("[SessionNearCache] SESSION_NEAR_CACHE is not supported on Redis Cluster; session fields are not cached")
+        return backend
+    cache = NearCacheSessionBackend(backend, maxsize=maxsize, ttl=ttl)
+    if isinstance(backend, RedisSessionBackend):
+        db = backend.redis_client.connection_pool.connection_kwargs.get("db", 0)
+        KeyspaceInvalidationListener(cache, backend.redis_client, db=db).start()
+    return cache
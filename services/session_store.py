@@ -0,0 +1,124 @@
+from typing import Any, Awaitable, Callable, Dict, List, Union
+from services.session_backends import SessionBackend, SessionBatch, RedisSessionBackend, AsyncRedisSessionBackend, get_session_backend, get_async_session_backend
+from services.session_unit_of_work import PendingResult, SessionUnitOfWork, AsyncSessionUnitOfWork
+from utils.session_state import EmployeeSession, encode_session_field, decode_session_field
+
+
+class SessionStore:
+    """
+    Base class of the session services.
+
+    Session state lives in a SessionBackend (Redis, SQL or in-process), chosen by the
+    SESSION_BACKEND environment variable unless a backend is injected. Passing only a
+    redis_client keeps the Redis backend with that client. Bound to a SessionBatch
+    (see unit_of_work) the same methods queue their work and reads return PendingResult.
+    """
+
+    def __init__(self, redis_client=None, backend: Union[SessionBackend, SessionBatch] = None):
+        if backend is None:
+            backend = RedisSessionBackend(redis_client) if redis_client is not None else get_session_backend()
+        self.backend = backend
+
+    @property
+    def redis_client(self):
+        """The Redis client of the Redis backend; None for other backends."""
+        return getattr(self.backend, "redis_client", None)
+
+    def unit_of_work(self):
+        """Queue several session calls and run them together (one round trip on Redis)."""
+        return SessionUnitOfWork(type(self), self.backend)
+
+    def _result(self, raw: Any, decode: Callable[[Any], Any]) -> Any:
+        """decode(raw), or a PendingResult that decodes once a queued read has run."""
+        if isinstance(raw, PendingResult):
+            return raw.then(decode)
+        return decode(raw)
+
+    def _value(self, value: Any) -> Any:
+        """A value known without reading the backend, in the shape the caller expects."""
+        return PendingResult.resolved(value) if isinstance(self.backend, SessionBatch) else value
+
+    def get_session(self, contact_number) -> EmployeeSession:
+        """All session fields of a contact in one round trip."""
+        return self._result(self.backend.get_fields(contact_number), lambda raw: EmployeeSession(contact_number, raw))
+
+    def clear_session(self, contact_number):
+        """Delete the whole session of a contact, including messages and lists."""
+        return self.backend.clear_session(contact_number)
+
+    def get_sessions(self, contact_numbers: List[str]) -> Dict[str, EmployeeSession]:
+        """The sessions of many contacts, one pipeline (or query) per chunk of contacts."""
+        return self._result(
+            self.backend.get_fields_many(contact_numbers),
+            lambda sessions: {contact_number: EmployeeSession(contact_number, raw) for contact_number, raw in sessions.items()}
+        )
+
+    def clear_sessions(self, contact_numbers: List[str]):
+        """Delete the whole session of many contacts (batched UNLINK on Redis)."""
+        return self.backend.clear_sessions(contact_numbers)
+
+    def _get_field(self, contact_number, field: str) -> Any:
+        return self._result(self.backend.get_field(contact_number, field), lambda value: decode_session_field(field, value))
+
+    def _set_field(self, contact_number, field: str, value: Any):
+        return self.backend.set_field(contact_number, field, encode_session_field(field, value))
+
+    def _clear_fields(self, contact_number, *fields: str):
+        return self.backend.delete_fields(contact_number, *fields)
+
+    def _get_field_many(self, contact_numbers: List[str], field: str) -> Dict[str, Any]:
+        return self._result(
+            self.backend.get_field_many(contact_numbers, field),
+            lambda values: {contact_number: decode_session_field(field, value) for contact_number, value in values.items()}
+        )
+
+    def _set_field_many(self, contact_numbers: List[str], field: str, value: Any):
+        return self.backend.set_field_many(contact_numbers, field, encode_session_field(field, value))
+
+    def _clear_fields_many(self, contact_numbers: List[str], *fields: str):
+        return self.backend.delete_fields_many(contact_numbers, *fields)
+
+
+class AsyncSessionStore(SessionStore):
+    """
+    Base of the asyncio session services, on the asyncio backend for SESSION_BACKEND
+    (get_async_session_backend; only Redis has one).
+
+    Mixed in ahead of a session service, it gives that service's methods asyncio
+    semantics: every call returns an awaitable. Inside unit_of_work() the methods
+    queue as usual and reads return PendingResult. Without an injected backend or
+    client, the backend (and the asyncio connection pool) is created on first use.
+    """
+
+    def __init__(self, redis_client=None, backend: Union[AsyncRedisSessionBackend, SessionBatch] = None):
+        if backend is None and redis_client is not None:
+            backend = AsyncRedisSessionBackend(redis_client)
+        self._backend = backend
+
+    @property
+    def backend(self) -> Union[AsyncRedisSessionBackend, SessionBatch]:
+        if self._backend is None:
+            self._backend = get_async_session_backend()
+        return self._backend
+
+    def unit_of_work(self) -> AsyncSessionUnitOfWork:
+        """Queue several session calls and send them in one pipeline (async with)."""
+        return AsyncSessionUnitOfWork(type(self), self.backend)
+
+    def _result(self, raw: Any, decode: Callable[[Any], Any]) -> Any:
+        if isinstance(self.backend, SessionBatch):
+            return super()._result(raw, decode)
+        return self._decoded(raw, decode)
+
+    @staticmethod
+    async def _decoded(raw: Awaitable, decode: Callable[[Any], Any]) -> Any:
+        return decode(await raw)
+
+    def _value(self, value: Any) -> Any:
+        if isinstance(self.backend, SessionBatch):
+            return super()._value(value)
+        return self._resolved(value)
+
+    @staticmethod
+    async def _resolved(value: Any) -> Any:
+        return value
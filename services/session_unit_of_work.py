@@ -0,0 +1,103 @@
+from typing import Any, Callable
+
+
+class PendingResult:
+    """Value of a queued read; available once the unit of work has executed."""
+    __slots__ = ("_decode", "_commands", "_value", "_ready")
+
+    def __init__(self, decode: Callable[[Any], Any], commands: int = 1):
+        self._decode = decode
+        # Reads spanning several commands get a tuple of their replies
+        self._commands = commands
+        self._value = None
+        self._ready = False
+
+    @classmethod
+    def resolved(cls, value: Any) -> "PendingResult":
+        """A result that needs no round trip."""
+        result = cls(lambda raw: raw)
+        result._resolve(value)
+        return result
+
+    def then(self, decode: Callable[[Any], Any]) -> "PendingResult":
+        """Apply decode to the value once it is available; returns this result."""
+        previous = self._decode
+        self._decode = lambda raw: decode(previous(raw))
+        if self._ready:
+            self._value = decode(self._value)
+        return self
+
+    def _resolve(self, raw: Any):
+        self._value = self._decode(raw)
+        self._ready = True
+
+    @property
+    def value(self) -> Any:
+        if not self._ready:
+            raise RuntimeError("Session unit of work has not been executed yet")
+        return self._value
+
+
+class SessionUnitOfWork:
+    """
+    Queues session service calls on the backend's SessionBatch and runs them on
+    execute(); reads return a PendingResult whose value is set then. On Redis every
+    call goes out in one pipeline. Used as a context manager, the queue is executed on
+    exit and dropped if the block raises.
+
+        with EmployeeSessionProxy.unit_of_work() as session:
+            shift = session.get_shift_time(contact_number)
+            session.add_to_list(contact_number, ["a", "b"])
+        shift.value
+    """
+
+    def __init__(self, service_class, backend):
+        self._batch = backend.batch()
+        # The service's own methods, writing to the batch instead of the backend
+        self.session = service_class(backend=self._batch)
+
+    def __enter__(self):
+        return self.session
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.execute()
+        else:
+            self.discard()
+        return False
+
+    def __len__(self) -> int:
+        return len(self._batch)
+
+    def execute(self) -> int:
+        return self._batch.execute()
+
+    def discard(self):
+        self._batch.discard()
+
+
+class AsyncSessionUnitOfWork(SessionUnitOfWork):
+    """
+    SessionUnitOfWork for the asyncio session services: queued calls are sent in one
+    pipeline when the block exits.
+
+        async with AsyncEmployeeSessionProxy.unit_of_work() as session:
+            asked = session.get_employee_asked_user_feedback(contact_number)
+        asked.value
+    """
+
+    async def __aenter__(self):
+        return self.session
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.execute()
+        else:
+            await self.discard()
+        return False
+
+    async def execute(self) -> int:
+        return await self._batch.execute()
+
+    async def discard(self):
+        await self._batch.discard()
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+import pytest
+import fakeredis
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def redis_client():
+    """An in-memory Redis speaking the same protocol as the process pool's clients."""
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def db_session(app):
+    """
+    A session on DATABASE_URL (migrated to head) whose work is rolled back after the
+    test; its commit() only releases a savepoint. Skips when Postgres is unreachable.
+    """
+    from database import db
+    with app.app_context():
+        try:
+            connection = db.engine.connect()
+        except OperationalError as e:
+            pytest.skip(f"Postgres is not reachable: {e.orig}")
+        transaction = connection.begin()
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        try:
+            yield session
+        finally:
+            session.close()
+            transaction.rollback()
+            connection.close()
+
+
+@pytest.fixture(params=["memory", "sql", "redis"])
+def session_backend(request, redis_client):
+    """Each session backend; sql runs in the rolled-back db_session."""
+    from services.session_backends import MemorySessionBackend, RedisSessionBackend, SqlSessionBackend
+    if request.param == "memory":
+        return MemorySessionBackend()
+    if request.param == "redis":
+        return RedisSessionBackend(redis_client)
+    db_session = request.getfixturevalue("db_session")
+
+    @contextmanager
+    def session_factory():
+        try:
+            yield db_session
+            db_session.commit()
+        except Exception:
+            db_session.rollback()
+            raise
+    return SqlSessionBackend(session_factory)
@@ -0,0 +1,95 @@
+import time
+import pytest
+from Files.SQLAlchemyModels import Employee
+from services.employee_record_cache import UNKNOWN_CONTACT, EmployeeRecordCache, EmployeeSnapshot, contact_key, employee_record_cache
+from services.service import EmployeeService
+
+
+@pytest.fixture
+def cache():
+    """The process-wide cache, emptied around the test."""
+    employee_record_cache.invalidate()
+    yield employee_record_cache
+    employee_record_cache.invalidate()
+
+
+def test_contact_numbers_share_a_key_however_entered():
+    assert contact_key("+971 50 123 4567") == contact_key("00971501234567") == contact_key("971-50-123-4567") == "971501234567"
+    assert contact_key("") is None
+    assert contact_key(None) is None
+
+
+def test_lookups_started_before_an_invalidation_are_not_cached():
+    cache = EmployeeRecordCache(maxsize=10, ttl=60)
+    snapshot = EmployeeSnapshot(id=1, name="Ann")
+
+    generation = cache.generation
+    cache.invalidate("971500000001")
+    cache.set("971500000001", snapshot, generation)
+    assert cache.get("971500000001") is None
+
+    cache.set("971500000001", snapshot, cache.generation)
+    assert cache.get("971500000001") is snapshot
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_unknown_numbers_expire_after_the_negative_ttl():
+    cache = EmployeeRecordCache(maxsize=10, ttl=60, negative_ttl=0.05)
+    cache.set("971500000002", None, cache.generation)
+    assert cache.get("971500000002") is UNKNOWN_CONTACT
+    time.sleep(0.06)
+    assert cache.get("971500000002") is None
+    assert cache.stats()["negative_hits"] == 1
+
+
+def test_snapshots_copy_the_row_without_credentials():
+    snapshot = EmployeeSnapshot.from_employee(Employee(id=3, name="Ann", contactNo="+971500000003", is_hr=True))
+    assert snapshot.to_dict()["contactNo"] == "+971500000003"
+    assert not hasattr(snapshot, "password")
+
+
+def _employee(db_session, contact_number):
+    employee = Employee(name="cache test", contactNo=contact_number, is_deleted=False)
+    db_session.add(employee)
+    db_session.commit()
+    return employee
+
+
+def test_get_employee_record_is_cached_and_invalidated_on_commit(db_session, cache):
+    employee = _employee(db_session, "+971 50 000 0444")
+
+    first = EmployeeService.get_employee_record("00971500000444", db_session)
+    assert isinstance(first, EmployeeSnapshot) and first.id == employee.id
+    assert EmployeeService.get_employee_record("+971500000444", db_session) is first
+
+    employee.contactNo = "+971500000445"
+    db_session.flush()
+    # Not committed yet: the cached snapshot is still served
+    assert EmployeeService.get_employee_record("+971500000444", db_session) is first
+    db_session.commit()
+
+    with pytest.raises(Exception, match="No employee found"):
+        EmployeeService.get_employee_record("+971500000444", db_session)
+    assert EmployeeService.get_employee_record("+971500000445", db_session).contactNo == "+971500000445"
+
+
+def test_unknown_numbers_are_cached_until_an_employee_is_added(db_session, cache):
+    with pytest.raises(Exception, match="No employee found"):
+        EmployeeService.get_employee_record("+971500000446", db_session)
+    assert cache.get(contact_key("+971500000446")) is UNKNOWN_CONTACT
+
+    _employee(db_session, "+971500000446")
+    assert EmployeeService.get_employee_record("+971500000446", db_session).name == "cache test"
+
+
+def test_rolled_back_changes_do_not_invalidate(db_session, cache):
+    employee = _employee(db_session, "+971500000447")
+    snapshot = EmployeeService.get_employee_record("+971500000447", db_session)
+    invalidations = cache.invalidations
+
+    employee.name = "renamed"
+    db_session.flush()
+    db_session.rollback()
+
+    assert cache.invalidations == invalidations
+    assert EmployeeService.get_employee_record("+971500000447", db_session) is snapshot
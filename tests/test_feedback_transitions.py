@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from services.session_backends import (
+    CLAIM_FIELD, FEEDBACK_ANSWER, FEEDBACK_ASK, FEEDBACK_BUSY, FEEDBACK_CLAIM_TIMEOUT, FEEDBACK_FIELD, MESSAGES,
+    MemorySessionBackend, RedisSessionBackend
+)
+
+CONTACT = "+971500000123"
+
+
+def test_ask_then_answer_then_busy(session_backend):
+    session_backend.push_list(CONTACT, MESSAGES, ["earlier"])
+
+    assert session_backend.start_feedback_turn(CONTACT, "prompt", 10, 5) == (FEEDBACK_ASK, [])
+    assert session_backend.get_field(CONTACT, FEEDBACK_FIELD) == "1"
+    assert session_backend.get_list(CONTACT, MESSAGES) == ["earlier", "prompt"]
+
+    state, messages = session_backend.start_feedback_turn(CONTACT, "prompt", 10, 1)
+    assert (state, list(messages)) == (FEEDBACK_ANSWER, ["prompt"])
+    assert session_backend.get_field(CONTACT, CLAIM_FIELD) is not None
+
+    assert session_backend.start_feedback_turn(CONTACT, "prompt", 10, 1) == (FEEDBACK_BUSY, [])
+
+
+def test_ask_keeps_only_the_newest_messages(session_backend):
+    session_backend.push_list(CONTACT, MESSAGES, ["a", "b", "c"])
+    session_backend.start_feedback_turn(CONTACT, "prompt", 2, 0)
+    assert session_backend.get_list(CONTACT, MESSAGES) == ["c", "prompt"]
+
+
+def test_answer_without_messages(session_backend):
+    session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    state, messages = session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    assert (state, list(messages)) == (FEEDBACK_ANSWER, [])
+
+
+def test_released_or_abandoned_claims_can_be_taken_again(session_backend):
+    session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+
+    session_backend.release_feedback_answer(CONTACT)
+    assert session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)[0] == FEEDBACK_ANSWER
+
+    session_backend.set_field(CONTACT, CLAIM_FIELD, str(int(time.time()) - FEEDBACK_CLAIM_TIMEOUT - 1))
+    assert session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)[0] == FEEDBACK_ANSWER
+
+
+def test_finish_resets_the_flow(session_backend):
+    session_backend.set_field(CONTACT, "employee_id", "7")
+    session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+
+    session_backend.finish_feedback_turn(CONTACT)
+
+    assert session_backend.get_fields(CONTACT) == {"employee_id": "7"}
+    assert session_backend.get_list(CONTACT, MESSAGES) == []
+    assert session_backend.start_feedback_turn(CONTACT, "prompt", 10, 0) == (FEEDBACK_ASK, [])
+
+
+def test_batched_transition(session_backend):
+    batch = session_backend.batch()
+    asked = batch.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    batch.set_field(CONTACT, "shift_time", "9-5")
+    batch.execute()
+
+    assert tuple(asked.value) == (FEEDBACK_ASK, [])
+    assert session_backend.get_field(CONTACT, "shift_time") == "9-5"
+
+
+@pytest.mark.parametrize("make_backend", [MemorySessionBackend, "redis"])
+def test_concurrent_answers_have_one_owner(make_backend, redis_client):
+    backend = RedisSessionBackend(redis_client) if make_backend == "redis" else make_backend()
+    backend.start_feedback_turn(CONTACT, "prompt", 10, 0)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        states = list(pool.map(lambda _: backend.start_feedback_turn(CONTACT, "prompt", 10, 0)[0], range(16)))
+
+    assert states.count(FEEDBACK_ANSWER) == 1
+    assert states.count(FEEDBACK_BUSY) == 15
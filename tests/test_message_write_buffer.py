@@ -0,0 +1,105 @@
+import threading
+import time
+import pytest
+import services.employee_message_service as message_service
+from services.employee_message_service import EmployeeMessageHistoryService
+from services.message_write_buffer import MessageWriteBuffer
+
+CONTACT = "+971500000555"
+
+
+def _buffer(monkeypatch, fail=False, **options):
+    """A buffer whose bulk INSERTs are recorded (or fail) instead of reaching Postgres."""
+    buffer = MessageWriteBuffer(**options)
+    buffer.written = []
+
+    def write(rows):
+        if buffer.fail:
+            raise RuntimeError("database unavailable")
+        buffer.written.append([row["content"] for row in rows])
+
+    buffer.fail = fail
+    monkeypatch.setattr(buffer, "_write", write)
+    return buffer
+
+
+def test_inline_mode_flushes_once_max_size_is_queued(monkeypatch):
+    buffer = _buffer(monkeypatch, mode="inline", max_size=3, flush_interval=60)
+    buffer.save(CONTACT, "user", "a")
+    buffer.save("+1", "user", "b")
+
+    assert buffer.written == []
+    assert [row["content"] for row in buffer.pending(CONTACT)] == ["a"]
+
+    buffer.save(CONTACT, "assistant", "c")
+    assert buffer.written == [["a", "b", "c"]]
+    assert buffer.pending(CONTACT) == []
+    assert buffer._thread is None
+    assert buffer.stats()["flushed"] == 3
+
+
+def test_inline_mode_flushes_once_the_oldest_has_waited(monkeypatch):
+    buffer = _buffer(monkeypatch, mode="inline", max_size=100, flush_interval=0.01)
+    buffer.save(CONTACT, "user", "a")
+    time.sleep(0.02)
+    buffer.save(CONTACT, "user", "b")
+    assert buffer.written == [["a", "b"]]
+
+
+def test_failed_flush_keeps_messages_for_the_next(monkeypatch):
+    buffer = _buffer(monkeypatch, fail=True, mode="inline", max_size=100, flush_interval=60)
+    buffer.save(CONTACT, "user", "a")
+
+    assert buffer.flush() == 0
+    with pytest.raises(RuntimeError):
+        buffer.flush(raise_errors=True)
+    assert [row["content"] for row in buffer.pending(CONTACT)] == ["a"]
+
+    buffer.save(CONTACT, "user", "b")
+    buffer.fail = False
+    assert buffer.flush() == 2
+    assert buffer.written == [["a", "b"]]
+    assert buffer.stats()["failures"] == 2
+
+
+def test_unwritten_messages_are_capped(monkeypatch):
+    buffer = _buffer(monkeypatch, fail=True, mode="inline", max_size=100, flush_interval=60, max_pending=3)
+    for content in "abcde":
+        buffer.save(CONTACT, "user", content)
+    buffer.flush()
+
+    assert [row["content"] for row in buffer.pending(CONTACT)] == ["c", "d", "e"]
+    assert buffer.stats()["dropped"] == 2
+
+
+def test_background_mode_starts_one_flusher(monkeypatch):
+    buffer = _buffer(monkeypatch, mode="background", max_size=1000, flush_interval=0.05)
+    started = []
+    start = threading.Thread.start
+    monkeypatch.setattr(threading.Thread, "start", lambda thread: (started.append(thread.name), start(thread)))
+
+    savers = [threading.Thread(target=buffer.save, args=(CONTACT, "user", str(index))) for index in range(20)]
+    for saver in savers:
+        saver.start()
+    for saver in savers:
+        saver.join()
+    time.sleep(0.2)
+    buffer.close()
+
+    assert started.count("message-write-buffer") == 1
+    assert sorted(content for batch in buffer.written for content in batch) == sorted(str(index) for index in range(20))
+    assert buffer.stats()["pending"] == 0
+
+
+def test_clear_is_aborted_when_queued_messages_cannot_be_written(monkeypatch):
+    buffer = _buffer(monkeypatch, fail=True, mode="inline", max_size=100, flush_interval=60)
+    buffer.save(CONTACT, "user", "a")
+    monkeypatch.setattr(message_service, "message_write_buffer", buffer)
+
+    class NoQueries:
+        def query(self, *args):
+            raise AssertionError("history deleted although the flush failed")
+
+    with pytest.raises(RuntimeError):
+        EmployeeMessageHistoryService.clear_message_history(NoQueries(), CONTACT)
+    assert [row["content"] for row in buffer.pending(CONTACT)] == ["a"]
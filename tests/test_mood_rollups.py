@@ -0,0 +1,110 @@
+from datetime import date
+import pytest
+from Files.SQLAlchemyModels import Company, Employee, Group, MoodCheck, MoodDailyRollup, MoodEmployeeRollup
+from services.employee_mood_rollup_service import COUNTER_COLUMNS, EmployeeMoodRollupService
+from services.employee_mood_service import EmployeeMoodService
+
+
+@pytest.fixture
+def company(db_session):
+    """A company with two groups and three employees, no mood checks yet."""
+    groups = [Group(name="rollup test A"), Group(name="rollup test B")]
+    db_session.add_all(groups)
+    db_session.flush()
+    company = Company(name="rollup test", group_id=groups[0].id)
+    db_session.add(company)
+    db_session.flush()
+    employees = [
+        Employee(name=f"rollup test {index}", company_id=company.id, group_id=groups[index % 2].id, is_deleted=False)
+        for index in range(3)
+    ]
+    db_session.add_all(employees)
+    db_session.flush()
+    company.groups, company.employees = groups, employees
+    return company
+
+
+def _check(db_session, company, employee, mood, day, comments=None):
+    check = MoodCheck(employee_id=employee.id, company_id=company.id, mood=mood, date=day, comments=comments)
+    db_session.add(check)
+    db_session.flush()
+    return check
+
+
+def _rollups(db_session, company_id):
+    """Non-zero daily and employee counters of a company."""
+    daily = {
+        (row.group_id, row.date): tuple(getattr(row, column) for column in COUNTER_COLUMNS)
+        for row in db_session.query(MoodDailyRollup).filter(MoodDailyRollup.company_id == company_id)
+    }
+    employees = {
+        (row.group_id, row.employee_id, row.month): tuple(getattr(row, column) for column in COUNTER_COLUMNS)
+        for row in db_session.query(MoodEmployeeRollup).filter(MoodEmployeeRollup.company_id == company_id)
+    }
+    return (
+        {key: counts for key, counts in daily.items() if any(counts)},
+        {key: counts for key, counts in employees.items() if any(counts)},
+    )
+
+
+def _assert_matches_rebuild(db_session, company):
+    incremental = _rollups(db_session, company.id)
+    EmployeeMoodRollupService.rebuild_rollups(db_session, [company.id])
+    assert _rollups(db_session, company.id) == incremental
+
+
+def test_inserts_update_daily_and_monthly_counters(db_session, company):
+    first, second, _ = company.employees
+    _check(db_session, company, first, "1", date(2026, 3, 2), "fine")
+    _check(db_session, company, first, "3", date(2026, 3, 2))
+    _check(db_session, company, second, "4", date(2026, 3, 20))
+
+    daily, employees = _rollups(db_session, company.id)
+    assert daily == {
+        (first.group_id, date(2026, 3, 2)): (1, 0, 1, 0, 1),
+        (second.group_id, date(2026, 3, 20)): (0, 0, 0, 1, 0),
+    }
+    assert employees[(first.group_id, first.id, date(2026, 3, 1))] == (1, 0, 1, 0, 1)
+    _assert_matches_rebuild(db_session, company)
+
+
+def test_updates_and_deletes_move_counters(db_session, company):
+    first, second, third = company.employees
+    check = _check(db_session, company, first, "2", date(2026, 4, 30))
+    removed = _check(db_session, company, second, "1", date(2026, 5, 1))
+    _check(db_session, company, third, "3", date(2026, 5, 1))
+
+    check.mood, check.date, check.comments = "4", date(2026, 5, 1), "a comment"
+    db_session.delete(removed)
+    db_session.flush()
+    _assert_matches_rebuild(db_session, company)
+
+    daily, _ = _rollups(db_session, company.id)
+    assert (first.group_id, date(2026, 4, 30)) not in daily
+
+
+def test_employee_scope_changes_move_counters(db_session, company):
+    first, second, _ = company.employees
+    _check(db_session, company, first, "1", date(2026, 6, 3))
+    _check(db_session, company, second, "2", date(2026, 6, 4))
+
+    first.group_id = second.group_id
+    second.is_deleted = True
+    db_session.flush()
+
+    daily, employees = _rollups(db_session, company.id)
+    assert daily == {(second.group_id, date(2026, 6, 3)): (1, 0, 0, 0, 0)}
+    assert list(employees) == [(second.group_id, first.id, date(2026, 6, 1))]
+    _assert_matches_rebuild(db_session, company)
+
+
+def test_statistics_from_rollups_match_raw_rows(db_session, company):
+    for index, (mood, day) in enumerate([("1", 3), ("2", 3), ("2", 15), ("4", 28), ("3", 28), ("1", 31)]):
+        _check(db_session, company, company.employees[index % 3], mood, date(2026, 7, day))
+    EmployeeMoodRollupService.rebuild_rollups(db_session, [company.id])
+    _check(db_session, company, company.employees[0], "4", date(2026, 8, 2))
+
+    for start, end in [(None, None), (date(2026, 7, 2), date(2026, 8, 10)), (date(2026, 7, 1), date(2026, 7, 31))]:
+        from_rollups = EmployeeMoodService.get_mood_check_statistics(db_session, [company.id], start_date=start, end_date=end)
+        from_rows = EmployeeMoodService.get_mood_check_statistics(db_session, [company.id], start_date=start, end_date=end, use_rollups=False)
+        assert from_rollups == from_rows
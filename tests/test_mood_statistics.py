@@ -0,0 +1,67 @@
+import pytest
+from utils.mood_statistics import MOOD_VALUES, OUTLIER_VALUES_LIMIT, MoodHistogram, linear_trend_slope
+
+np = pytest.importorskip("numpy")
+stats = pytest.importorskip("scipy.stats")
+
+HISTOGRAMS = [
+    {"1": 3, "2": 10, "3": 5, "4": 1},
+    {"1": 1, "2": 0, "3": 0, "4": 7},
+    {"2": 2, "3": 1},
+    {"1": 40, "4": 1},
+]
+
+
+def _values(counts):
+    return np.repeat(MOOD_VALUES, [counts.get(str(value), 0) for value in MOOD_VALUES])
+
+
+@pytest.mark.parametrize("counts", HISTOGRAMS)
+def test_histogram_matches_numpy_and_scipy(counts):
+    histogram, values = MoodHistogram(counts), _values(counts)
+
+    assert histogram.total == len(values)
+    assert histogram.mean() == pytest.approx(values.mean())
+    assert histogram.variance() == pytest.approx(values.var(ddof=1))
+    assert histogram.std() == pytest.approx(values.std(ddof=1))
+    assert (histogram.min(), histogram.max()) == (values.min(), values.max())
+    assert histogram.mode() == stats.mode(values).mode
+    for q in (10, 25, 50, 75, 90):
+        assert histogram.percentile(q) == pytest.approx(np.percentile(values, q))
+    assert histogram.skewness() == pytest.approx(stats.skew(values))
+    assert histogram.kurtosis() == pytest.approx(stats.kurtosis(values))
+
+
+def test_single_value_and_constant_data_are_nan():
+    assert np.isnan(MoodHistogram({"3": 1}).variance())
+    constant = MoodHistogram({"2": 5})
+    assert np.isnan(constant.skewness())
+    assert np.isnan(constant.kurtosis())
+    block = MoodHistogram({"2": 2}).statistics_block()
+    assert block["skewness"] is None and block["kurtosis"] is None
+
+
+def test_outliers_are_counted_per_value():
+    histogram = MoodHistogram({"2": 50, "4": 3})
+    values = _values({"2": 50, "4": 3})
+    q1, q3 = np.percentile(values, [25, 75])
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+
+    block = histogram.outliers_block()
+    assert block["count"] == int(((values < lower) | (values > upper)).sum()) == 3
+    assert block["value_counts"] == {"4": 3}
+    assert block["values"] == [4, 4, 4]
+    assert block["values_truncated"] is False
+
+
+def test_outlier_values_are_capped():
+    block = MoodHistogram({"2": 100000, "4": OUTLIER_VALUES_LIMIT + 5}).outliers_block()
+    assert block["count"] == OUTLIER_VALUES_LIMIT + 5
+    assert len(block["values"]) == OUTLIER_VALUES_LIMIT
+    assert block["values_truncated"] is True
+
+
+@pytest.mark.parametrize("values", [[], [3.0], [1.0, 2.0], [2.5, 1.0, 3.5, 3.0, 4.0], [2.0] * 7])
+def test_linear_trend_slope_matches_polyfit(values):
+    expected = np.polyfit(range(len(values)), values, 1)[0] if len(values) >= 2 else 0.0
+    assert linear_trend_slope(values) == pytest.approx(expected, abs=1e-12)
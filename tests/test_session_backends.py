@@ -0,0 +1,117 @@
+import time
+from contextlib import contextmanager
+from services.session_backends import MESSAGES, MemorySessionBackend, SqlSessionBackend
+
+CONTACT = "+971500000321"
+OTHER = "+971500000322"
+
+
+def test_fields(session_backend):
+    session_backend.set_field(CONTACT, "employee_id", "5")
+    session_backend.set_field(CONTACT, "shift_time", "9-5")
+    session_backend.set_field(OTHER, "employee_id", "6")
+
+    assert session_backend.get_field(CONTACT, "employee_id") == "5"
+    assert session_backend.get_field(CONTACT, "missing") is None
+    assert session_backend.get_fields(CONTACT) == {"employee_id": "5", "shift_time": "9-5"}
+
+    session_backend.delete_fields(CONTACT, "shift_time", "missing")
+    assert session_backend.get_fields(CONTACT) == {"employee_id": "5"}
+    assert session_backend.get_fields(OTHER) == {"employee_id": "6"}
+
+
+def test_lists_keep_the_newest_items(session_backend):
+    session_backend.push_list(CONTACT, MESSAGES, ["a", "b"])
+    session_backend.push_list(CONTACT, MESSAGES, ["c", "d"], max_length=3)
+    session_backend.push_list(CONTACT, MESSAGES, [])
+
+    assert session_backend.get_list(CONTACT, MESSAGES) == ["b", "c", "d"]
+    assert session_backend.get_list(CONTACT, MESSAGES, -2, -1) == ["c", "d"]
+    assert session_backend.get_list(CONTACT, MESSAGES, 0, 0) == ["b"]
+
+    session_backend.delete_collection(CONTACT, MESSAGES)
+    assert session_backend.get_list(CONTACT, MESSAGES) == []
+
+
+def test_maps(session_backend):
+    session_backend.set_map_field(CONTACT, "field_confirmation_list", "name", "Ann")
+    session_backend.set_map_field(CONTACT, "field_confirmation_list", "shift", "9-5")
+    session_backend.delete_map_field(CONTACT, "field_confirmation_list", "shift")
+
+    assert session_backend.get_map(CONTACT, "field_confirmation_list") == {"name": "Ann"}
+    # Collections are not session fields
+    assert session_backend.get_fields(CONTACT) == {}
+
+
+def test_clear_session(session_backend):
+    session_backend.set_field(CONTACT, "employee_id", "5")
+    session_backend.push_list(CONTACT, "contact_list", ["x"])
+    session_backend.set_field(OTHER, "employee_id", "6")
+
+    session_backend.clear_session(CONTACT)
+
+    assert session_backend.get_fields(CONTACT) == {}
+    assert session_backend.get_list(CONTACT, "contact_list") == []
+    assert session_backend.get_field(OTHER, "employee_id") == "6"
+
+
+def test_bulk_operations(session_backend):
+    contacts = [f"+97150000{index:04d}" for index in range(5)]
+    session_backend.set_field_many(contacts, "employee_asked_user_feedback", "1")
+    session_backend.set_field(contacts[0], "employee_id", "1")
+
+    assert session_backend.get_field_many(contacts + ["+1"], "employee_asked_user_feedback") == {
+        **{contact: "1" for contact in contacts}, "+1": None
+    }
+    assert session_backend.get_fields_many(contacts[:2]) == {
+        contacts[0]: {"employee_asked_user_feedback": "1", "employee_id": "1"},
+        contacts[1]: {"employee_asked_user_feedback": "1"},
+    }
+
+    session_backend.delete_fields_many(contacts[:3], "employee_asked_user_feedback")
+    assert session_backend.get_field_many(contacts, "employee_asked_user_feedback") == {
+        **{contact: None for contact in contacts[:3]}, **{contact: "1" for contact in contacts[3:]}
+    }
+
+    session_backend.clear_sessions(contacts)
+    assert all(not fields for fields in session_backend.get_fields_many(contacts).values())
+
+
+def test_batch_reads_see_earlier_writes(session_backend):
+    batch = session_backend.batch()
+    batch.set_field(CONTACT, "employee_id", "5")
+    batch.push_list(CONTACT, MESSAGES, ["m"])
+    employee_id = batch.get_field(CONTACT, "employee_id")
+    messages = batch.get_list(CONTACT, MESSAGES)
+    assert len(batch) == 4
+    assert batch.execute() == 4
+
+    assert employee_id.value == "5"
+    assert messages.value == ["m"]
+
+
+def test_memory_sessions_expire():
+    backend = MemorySessionBackend(ttl=0.05)
+    backend.set_field(CONTACT, "employee_id", "5")
+    assert backend.get_field(CONTACT, "employee_id") == "5"
+    time.sleep(0.06)
+    assert backend.get_fields(CONTACT) == {}
+
+
+def test_sql_expired_rows_are_ignored_and_purged(db_session):
+    @contextmanager
+    def session_factory():
+        yield db_session
+        db_session.commit()
+
+    backend = SqlSessionBackend(session_factory, purge_interval=3600)
+    backend.set_field(CONTACT, "employee_id", "5")
+    backend.push_list(CONTACT, MESSAGES, ["m"])
+    assert backend.get_field(CONTACT, "employee_id") == "5"
+
+    expired = SqlSessionBackend(session_factory, ttl=0)
+    assert expired.get_fields(CONTACT) == {}
+    assert expired.purge_expired(batch_size=1) == 1
+    assert expired.purge_expired() >= 1
+    assert backend.get_fields(CONTACT) == {}
+    assert backend.get_list(CONTACT, MESSAGES) == []
@@ -0,0 +1,58 @@
+import json
+import pytest
+from utils import session_codec as codec_module
+from utils.session_codec import COMPACT_TAG, ZSTD_TAG, SessionCodec, decode_session_payload
+
+MESSAGE = {"role": "user", "content": "كيف حالك؟ 😊", "timestamp": "2026-10-18T09:00:00"}
+
+
+def test_json_codec_writes_the_legacy_format():
+    assert SessionCodec("json").encode(MESSAGE) == json.dumps(MESSAGE)
+
+
+@pytest.mark.parametrize("name", ["json", "compact", "compact+zstd"])
+def test_round_trip(name):
+    codec = SessionCodec(name, compress_min_bytes=64)
+    for value in (MESSAGE, [MESSAGE] * 20, ["a", "b"], [], "text"):
+        assert decode_session_payload(codec.encode(value)) == value
+
+
+def test_compact_is_tagged_and_smaller():
+    encoded = SessionCodec("compact").encode(MESSAGE)
+    assert encoded[:1] == COMPACT_TAG
+    assert len(encoded.encode()) < len(json.dumps(MESSAGE).encode())
+
+
+def test_every_format_decodes_whatever_codec_is_configured():
+    payloads = [SessionCodec(name, compress_min_bytes=0).encode(MESSAGE) for name in ("json", "compact", "compact+zstd")]
+    for name in ("json", "compact", "compact+zstd"):
+        assert [SessionCodec(name).decode(payload) for payload in payloads] == [MESSAGE] * 3
+
+
+def test_without_orjson(monkeypatch):
+    monkeypatch.setattr(codec_module, "orjson", None)
+    encoded = SessionCodec("compact").encode(MESSAGE)
+    assert encoded == COMPACT_TAG + json.dumps(MESSAGE, separators=(",", ":"), ensure_ascii=False)
+    assert decode_session_payload(encoded) == MESSAGE
+
+
+def test_without_zstandard_nothing_is_compressed(monkeypatch):
+    monkeypatch.setattr(codec_module, "zstandard", None)
+    assert SessionCodec("compact+zstd", compress_min_bytes=0).encode(MESSAGE)[:1] == COMPACT_TAG
+    with pytest.raises(RuntimeError):
+        decode_session_payload(ZSTD_TAG + "abc")
+
+
+def test_large_payloads_are_compressed():
+    pytest.importorskip("zstandard")
+    codec = SessionCodec("compact+zstd", compress_min_bytes=256)
+    assert codec.encode(MESSAGE)[:1] == COMPACT_TAG
+    encoded = codec.encode([MESSAGE] * 50)
+    assert encoded[:1] == ZSTD_TAG
+    assert len(encoded) < len(SessionCodec("compact").encode([MESSAGE] * 50))
+    assert decode_session_payload(encoded) == [MESSAGE] * 50
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        SessionCodec("msgpack")
@@ -0,0 +1,114 @@
+import pytest
+from redis.crc import key_slot
+import services.session_backends as session_backends
+import utils.session_keys as session_keys
+from services.session_backends import FEEDBACK_ANSWER, FEEDBACK_ASK, MESSAGES, RedisSessionBackend
+from services.session_key_migration import migrate_session_keys
+from utils.session_keys import SESSION_KEY_FORMATS, contact_from_tag, contact_tag
+
+CONTACT = "+971501234567"
+
+
+@pytest.fixture
+def tagged(monkeypatch):
+    """Run with SESSION_KEY_SCHEME=tagged (old one-key-per-flag keys are then not read)."""
+    monkeypatch.setattr(session_keys, "TAGGED_SESSION_KEYS", True)
+    monkeypatch.setattr(session_backends, "TAGGED_SESSION_KEYS", True)
+    monkeypatch.setattr(session_backends, "LEGACY_SESSION_FALLBACK", False)
+    monkeypatch.setattr(session_backends, "PLAIN_SESSION_FALLBACK", True)
+
+
+def _key(name, tagged):
+    return SESSION_KEY_FORMATS[name].format(contact=contact_tag(CONTACT, tagged=tagged))
+
+
+def test_tagged_keys_of_a_contact_share_a_slot():
+    assert contact_tag(CONTACT, tagged=True) == "{" + CONTACT + "}"
+    assert contact_from_tag(contact_tag(CONTACT, tagged=True)) == CONTACT
+    assert contact_from_tag(CONTACT) == CONTACT
+    assert len({key_slot(_key(name, True).encode()) for name in SESSION_KEY_FORMATS}) == 1
+    assert len({key_slot(_key(name, False).encode()) for name in SESSION_KEY_FORMATS}) > 1
+
+
+def test_cluster_pipelines_send_scripts_with_eval(redis_client):
+    backend = RedisSessionBackend(redis_client)
+    backend._cluster = True
+    batch = backend.batch()
+    asked = batch.start_feedback_turn(CONTACT, "prompt", 10, 0)
+    batch.set_field(CONTACT, "shift_time", "9-5")
+
+    assert batch._pipeline.command_stack[0][0][0] == "EVAL"
+    assert not batch._pipeline.scripts
+    batch.execute()
+    assert tuple(asked.value) == (FEEDBACK_ASK, [])
+
+    batch = backend.batch()
+    answered = batch.start_feedback_turn(CONTACT, "prompt", 10, 1)
+    batch.finish_feedback_turn(CONTACT)
+    batch.execute()
+    assert (answered.value[0], list(answered.value[1])) == (FEEDBACK_ANSWER, ["prompt"])
+    assert backend.get_fields(CONTACT) == {"shift_time": "9-5"}
+
+
+def test_plain_keys_are_read_until_migrated(tagged, redis_client):
+    redis_client.hset(_key("session", False), mapping={"employee_id": "5"})
+    redis_client.expire(_key("session", False), 1000)
+    redis_client.rpush(_key("messages", False), "old")
+    backend = RedisSessionBackend(redis_client)
+
+    assert backend.get_field(CONTACT, "employee_id") == "5"
+    assert redis_client.ttl(_key("session", True)) == 1000
+    assert not redis_client.exists(_key("session", False))
+
+    # A worker still on the plain scheme appends while the tagged list exists
+    backend.push_list(CONTACT, MESSAGES, ["new"])
+    redis_client.rpush(_key("messages", False), "late")
+    assert backend.get_list(CONTACT, MESSAGES) == ["late", "old", "new"]
+
+    redis_client.hset(_key("field_confirmation_list", False), mapping={"a": "plain", "b": "plain"})
+    backend.set_map_field(CONTACT, "field_confirmation_list", "a", "tagged")
+    assert backend.get_map(CONTACT, "field_confirmation_list") == {"a": "tagged", "b": "plain"}
+
+
+def test_plain_keys_are_moved_by_batches_and_bulk_reads(tagged, redis_client):
+    backend = RedisSessionBackend(redis_client)
+    redis_client.hset(_key("session", False), "employee_id", "5")
+    batch = backend.batch()
+    employee_id = batch.get_field(CONTACT, "employee_id")
+    batch.execute()
+    assert employee_id.value == "5"
+
+    redis_client.hset("session:+2", "employee_id", "6")
+    assert backend.get_field_many([CONTACT, "+2", "+3"], "employee_id") == {CONTACT: "5", "+2": "6", "+3": None}
+
+
+def test_no_plain_fallback_on_a_cluster(tagged, monkeypatch, redis_client):
+    monkeypatch.setattr(session_backends, "is_cluster_client", lambda client: True)
+    redis_client.hset(_key("session", False), "employee_id", "5")
+    assert RedisSessionBackend(redis_client).get_field(CONTACT, "employee_id") is None
+
+
+def test_migration_moves_and_merges(redis_client):
+    redis_client.hset(_key("session", False), mapping={"employee_id": "old", "shift_time": "8"})
+    redis_client.expire(_key("session", False), 500)
+    redis_client.hset(_key("session", True), "employee_id", "new")
+    redis_client.rpush(_key("messages", False), "o1", "o2")
+    redis_client.rpush(_key("messages", True), "n1")
+    redis_client.rpush(_key("contact_list", False), "x")
+    redis_client.expire(_key("contact_list", False), 700)
+    redis_client.set(f"contact:{CONTACT}:shift_time", "ignored")
+    redis_client.set(f"employee:{CONTACT}:asked_user_feedback", "1")
+
+    counts = migrate_session_keys(redis_client, dry_run=True)
+    assert counts == {"session": 1, "messages": 1, "contact_list": 1, "field_confirmation_list": 0, "legacy_flags": 2}
+    assert redis_client.exists(_key("session", False))
+
+    assert migrate_session_keys(redis_client) == counts
+    assert redis_client.hgetall(_key("session", True)) == {
+        "employee_id": "new", "shift_time": "8", "employee_asked_user_feedback": "1"
+    }
+    assert redis_client.lrange(_key("messages", True), 0, -1) == ["o1", "o2", "n1"]
+    assert redis_client.lrange(_key("contact_list", True), 0, -1) == ["x"]
+    assert 0 < redis_client.ttl(_key("contact_list", True)) <= 700
+    assert sorted(redis_client.keys()) == sorted(_key(name, True) for name in ("session", "messages", "contact_list"))
+    assert migrate_session_keys(redis_client) == dict.fromkeys(counts, 0)
@@ -0,0 +1,18 @@
+import re
+from typing import Optional
+
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+
+def normalize_contact_number(contact_number) -> Optional[str]:
+    """
+    Digits-only E.164 form of a contact number: "+971 50-123 4567" and "00971501234567"
+    both give "971501234567". None, or a number without digits, gives None.
+    """
+    if contact_number is None:
+        return None
+    digits = _NON_DIGITS.sub('', str(contact_number))
+    # "00" is the international dialling prefix written in place of "+"
+    if digits.startswith('00'):
+        digits = digits[2:]
+    return digits or None
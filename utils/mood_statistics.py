@@ -0,0 +1,184 @@
+import math
+from typing import Dict, List, Any
+
+# 1=Great, 2=Good, 3=Okay, 4=Not so good
+MOOD_VALUES = (1, 2, 3, 4)
+
+# The outliers block still lists one value per outlier record for existing clients;
+# the list is capped here, and value_counts carries the exact per-value totals
+OUTLIER_VALUES_LIMIT = 1000
+
+
+class MoodHistogram:
+    """Exact descriptive statistics for the 4-value mood scale.
+
+    Everything is derived from the four bin counts, so memory use is constant no
+    matter how many mood checks are summarised. Results match numpy/scipy
+    (linear percentiles, sample std/variance, biased skewness and Fisher kurtosis).
+    Works the same for the whole data set, a single date or a single employee.
+    """
+
+    def __init__(self, counts: Dict[str, int]):
+        self.counts = [int(counts.get(str(value), 0) or 0) for value in MOOD_VALUES]
+        self.total = sum(self.counts)
+
+    def mean(self) -> float:
+        return sum(value * count for value, count in zip(MOOD_VALUES, self.counts)) / self.total
+
+    def _central_moment(self, power: int, mean: float) -> float:
+        return sum(count * (value - mean) ** power for value, count in zip(MOOD_VALUES, self.counts))
+
+    def variance(self) -> float:
+        """Sample variance (ddof=1); NaN for a single value, like numpy."""
+        if self.total < 2:
+            return float('nan')
+        return self._central_moment(2, self.mean()) / (self.total - 1)
+
+    def std(self) -> float:
+        return math.sqrt(self.variance())
+
+    def min(self) -> int:
+        return next(value for value, count in zip(MOOD_VALUES, self.counts) if count)
+
+    def max(self) -> int:
+        return next(value for value, count in zip(reversed(MOOD_VALUES), reversed(self.counts)) if count)
+
+    def mode(self) -> int:
+        """Most frequent mood; ties resolve to the smallest value like scipy.stats.mode."""
+        best = max(self.counts)
+        return MOOD_VALUES[self.counts.index(best)]
+
+    def _value_at(self, position: int) -> int:
+        """Value at a 0-based position of the sorted mood values."""
+        cumulative = 0
+        for value, count in zip(MOOD_VALUES, self.counts):
+            cumulative += count
+            if position < cumulative:
+                return value
+        return self.max()
+
+    def percentile(self, q: float) -> float:
+        """Linear-interpolated percentile, same as numpy.percentile's default method."""
+        position = (self.total - 1) * q / 100
+        lower = math.floor(position)
+        fraction = position - lower
+        lower_value = self._value_at(lower)
+        if fraction == 0:
+            return float(lower_value)
+        upper_value = self._value_at(lower + 1)
+        return lower_value + fraction * (upper_value - lower_value)
+
+    def median(self) -> float:
+        return self.percentile(50)
+
+    def _biased_moments(self):
+        mean = self.mean()
+        m2 = self._central_moment(2, mean) / self.total
+        # scipy returns NaN when the data is (numerically) constant
+        is_constant = m2 <= (1e-15 * mean) ** 2
+        return mean, m2, is_constant
+
+    def skewness(self) -> float:
+        mean, m2, is_constant = self._biased_moments()
+        if is_constant:
+            return float('nan')
+        return (self._central_moment(3, mean) / self.total) / m2 ** 1.5
+
+    def kurtosis(self) -> float:
+        """Fisher (excess) kurtosis."""
+        mean, m2, is_constant = self._biased_moments()
+        if is_constant:
+            return float('nan')
+        return (self._central_moment(4, mean) / self.total) / m2 ** 2 - 3.0
+
+    def outlier_bounds(self):
+        q1 = self.percentile(25)
+        q3 = self.percentile(75)
+        iqr = q3 - q1
+        return q1 - 1.5 * iqr, q3 + 1.5 * iqr
+
+    def outlier_counts(self) -> Dict[int, int]:
+        lower_bound, upper_bound = self.outlier_bounds()
+        return {
+            value: count
+            for value, count in zip(MOOD_VALUES, self.counts)
+            if count and (value < lower_bound or value > upper_bound)
+        }
+
+    def statistics_block(self) -> Dict[str, Any]:
+        """The `statistics` section of the mood statistics payload."""
+        q1 = self.percentile(25)
+        q2 = self.percentile(50)
+        q3 = self.percentile(75)
+        iqr = q3 - q1
+        min_mood = self.min()
+        max_mood = self.max()
+        skewness = self.skewness() if self.total >= 3 else None
+        kurtosis = self.kurtosis() if self.total >= 3 else None
+
+        return {
+            "mean": round(self.mean(), 2),
+            "median": round(q2, 2),
+            "mode": self.mode(),
+            "std_deviation": round(self.std(), 4),
+            "variance": round(self.variance(), 4),
+            "min": min_mood,
+            "max": max_mood,
+            "range": max_mood - min_mood,
+            "quartiles": {
+                "q1": round(q1, 2),
+                "q2": round(q2, 2),
+                "q3": round(q3, 2)
+            },
+            "iqr": round(iqr, 2),
+            "percentiles": {
+                "p10": round(self.percentile(10), 2),
+                "p25": round(q1, 2),
+                "p50": round(q2, 2),
+                "p75": round(q3, 2),
+                "p90": round(self.percentile(90), 2)
+            },
+            "skewness": round(skewness, 4) if skewness is not None else None,
+            "kurtosis": round(kurtosis, 4) if kurtosis is not None else None
+        }
+
+    def outliers_block(self) -> Dict[str, Any]:
+        """The `outliers` section of the mood statistics payload.
+
+        value_counts maps each outlying mood to its number of records. values repeats
+        each outlying mood once per record, for JSON compatibility with older clients,
+        and holds at most OUTLIER_VALUES_LIMIT items (values_truncated tells when).
+        """
+        lower_bound, upper_bound = self.outlier_bounds()
+        outlier_counts = self.outlier_counts()
+        total = sum(outlier_counts.values())
+        values: List[int] = []
+        for value, count in outlier_counts.items():
+            values.extend([value] * min(count, OUTLIER_VALUES_LIMIT - len(values)))
+
+        return {
+            "count": total,
+            "value_counts": {str(value): count for value, count in outlier_counts.items()},
+            "values": values,
+            "values_truncated": total > len(values),
+            "bounds": {
+                "lower": round(lower_bound, 2),
+                "upper": round(upper_bound, 2)
+            }
+        }
+
+
+def linear_trend_slope(values: List[float]) -> float:
+    """Least-squares slope of values over x = 0..n-1 (same as numpy.polyfit degree 1).
+
+    Uses the closed form (n*Σxy - Σx*Σy) / (n*Σx² - (Σx)²), where the x sums are
+    known exactly, so only Σy and Σxy have to be accumulated.
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    sum_y = sum(values)
+    sum_xy = sum(x * y for x, y in enumerate(values))
+    return (n * sum_xy - sum_x * sum_y) / (n * sum_xx - sum_x ** 2)
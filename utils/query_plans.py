@@ -0,0 +1,42 @@
+import json
+from typing import Any, Dict, List, Set
+from sqlalchemy.orm import Session
+
+
+def explain_query(db: Session, query, disable_seqscan: bool = False) -> Dict[str, Any]:
+    """Run EXPLAIN (FORMAT JSON) for an ORM query and return the top plan node.
+
+    disable_seqscan makes Postgres prefer any usable index, which shows whether an
+    index applies on small development databases where a seq scan is cheaper.
+    """
+    statement = query.statement if hasattr(query, "statement") else query
+    compiled = statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True})
+
+    connection = db.connection()
+    try:
+        if disable_seqscan:
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        result = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+    finally:
+        db.rollback()
+
+    plan = json.loads(result) if isinstance(result, str) else result
+    return plan[0]["Plan"]
+
+
+def plan_index_names(plan: Dict[str, Any]) -> Set[str]:
+    """All index names used anywhere in a plan tree."""
+    names = set()
+    if plan.get("Index Name"):
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= plan_index_names(child)
+    return names
+
+
+def plan_node_types(plan: Dict[str, Any]) -> List[str]:
+    """Node types of a plan tree in depth-first order."""
+    types = [plan.get("Node Type")]
+    for child in plan.get("Plans", []):
+        types.extend(plan_node_types(child))
+    return types
@@ -0,0 +1,168 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Union
+import redis
+import redis.asyncio
+import redis.asyncio.cluster
+import redis.cluster
+
+# Local development defaults; deployments set REDIS_HOST/REDIS_PORT and credentials
+REDIS_DEFAULTS = {
+    "host": "localhost",
+    "port": 6379,
+}
+
+_pool: Optional[redis.BlockingConnectionPool] = None
+_client: Optional[Union[redis.Redis, redis.cluster.RedisCluster]] = None
+_async_pool: Optional[redis.asyncio.BlockingConnectionPool] = None
+_async_client: Optional[Union[redis.asyncio.Redis, redis.asyncio.cluster.RedisCluster]] = None
+_lock = threading.Lock()
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def redis_pool_settings() -> Dict[str, Any]:
+    """Connection pool settings from the REDIS_* environment variables."""
+    settings = {
+        "host": os.getenv("REDIS_HOST", REDIS_DEFAULTS["host"]),
+        "port": int(os.getenv("REDIS_PORT", REDIS_DEFAULTS["port"])),
+        "username": os.getenv("REDIS_USERNAME") or None,
+        "password": os.getenv("REDIS_PASSWORD") or None,
+        "db": int(os.getenv("REDIS_DB", "0")),
+        "decode_responses": True,
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        # Seconds a caller waits for a free connection once max_connections are in use
+        "timeout": _env_float("REDIS_POOL_TIMEOUT", 5.0),
+        "socket_timeout": _env_float("REDIS_SOCKET_TIMEOUT", 5.0),
+        "socket_connect_timeout": _env_float("REDIS_SOCKET_CONNECT_TIMEOUT", 5.0),
+        "socket_keepalive": _env_bool("REDIS_SOCKET_KEEPALIVE", True),
+        "health_check_interval": int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")),
+    }
+    if _env_bool("REDIS_SSL", False):
+        settings["connection_class"] = redis.SSLConnection
+    return settings
+
+
+def redis_cluster_enabled() -> bool:
+    """REDIS_CLUSTER=1 connects to a Redis Cluster; sessions then need hash-tagged keys."""
+    if not _env_bool("REDIS_CLUSTER", False):
+        return False
+    from utils.session_keys import TAGGED_SESSION_KEYS
+    if not TAGGED_SESSION_KEYS:
+        raise ValueError("REDIS_CLUSTER=1 requires SESSION_KEY_SCHEME=tagged")
+    return True
+
+
+def redis_cluster_settings() -> Dict[str, Any]:
+    """redis_pool_settings() for RedisCluster: no database number, pool sizes are per node."""
+    settings = redis_pool_settings()
+    ssl = settings.pop("connection_class", None) is redis.SSLConnection
+    settings.pop("db")
+    settings.pop("timeout")
+    if ssl:
+        settings["ssl"] = True
+    return settings
+
+
+def is_cluster_client(client) -> bool:
+    return isinstance(client, (redis.cluster.RedisCluster, redis.asyncio.cluster.RedisCluster))
+
+
+def get_redis_pool() -> redis.BlockingConnectionPool:
+    """The process-wide Redis connection pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = redis.BlockingConnectionPool(**redis_pool_settings())
+    return _pool
+
+
+def get_redis_client() -> Union[redis.Redis, redis.cluster.RedisCluster]:
+    """A Redis client backed by the shared pool (per node with REDIS_CLUSTER=1)."""
+    global _client
+    if _client is None:
+        if redis_cluster_enabled():
+            with _lock:
+                if _client is None:
+                    _client = redis.cluster.RedisCluster(**redis_cluster_settings())
+            return _client
+        pool = get_redis_pool()
+        with _lock:
+            if _client is None:
+                _client = redis.Redis(connection_pool=pool)
+    return _client
+
+
+def get_async_redis_client() -> Union[redis.asyncio.Redis, redis.asyncio.cluster.RedisCluster]:
+    """
+    A redis.asyncio client backed by a process-wide asyncio pool with the same settings
+    as the sync pool. Its connections belong to the event loop that opens them, so use
+    it from one loop (e.g. the worker's main loop) and close it with close_async_redis_pool.
+    """
+    global _async_pool, _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None and redis_cluster_enabled():
+                _async_client = redis.asyncio.cluster.RedisCluster(**redis_cluster_settings())
+            elif _async_client is None:
+                settings = redis_pool_settings()
+                if settings.get("connection_class") is redis.SSLConnection:
+                    settings["connection_class"] = redis.asyncio.SSLConnection
+                _async_pool = redis.asyncio.BlockingConnectionPool(**settings)
+                _async_client = redis.asyncio.Redis(connection_pool=_async_pool)
+    return _async_client
+
+
+def get_redis_pool_stats() -> Dict[str, Any]:
+    """Size and usage of the shared pool, for tuning REDIS_MAX_CONNECTIONS."""
+    if is_cluster_client(_client):
+        return {"created": True, "cluster": True, "nodes": len(_client.get_nodes())}
+    if _pool is None:
+        return {"created": False}
+    created = len(getattr(_pool, "_connections", []))
+    idle = sum(1 for connection in list(getattr(_pool, "pool").queue) if connection is not None)
+    kwargs = _pool.connection_kwargs
+    return {
+        "created": True,
+        "host": kwargs.get("host"),
+        "port": kwargs.get("port"),
+        "ssl": _pool.connection_class is redis.SSLConnection,
+        "max_connections": _pool.max_connections,
+        "connections": created,
+        "in_use": created - idle,
+        "idle": idle,
+        "pid": _pool.pid,
+    }
+
+
+def close_redis_pool():
+    """Disconnect and drop the shared pool (e.g. after forking or in shutdown hooks)."""
+    global _pool, _client
+    with _lock:
+        if _pool is not None:
+            _pool.disconnect()
+        elif is_cluster_client(_client):
+            _client.close()
+        _pool = None
+        _client = None
+
+
+async def close_async_redis_pool():
+    """Disconnect and drop the asyncio pool (call before the event loop closes)."""
+    global _async_pool, _async_client
+    pool, client, _async_pool, _async_client = _async_pool, _async_client, None, None
+    if pool is not None:
+        await pool.disconnect()
+    elif is_cluster_client(client):
+        await client.aclose()
@@ -0,0 +1,83 @@
+import base64
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: compact JSON falls back to the json module
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # optional: payloads are then never compressed
+    zstandard = None
+
+# Version tags. Legacy payloads are untagged JSON, which never starts with these.
+COMPACT_TAG = "J"   # compact UTF-8 JSON
+ZSTD_TAG = "Z"      # zstd-compressed compact JSON, base85 text
+
+SESSION_CODECS = ("json", "compact", "compact+zstd")
+
+
+def _compact_dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _loads(raw: str) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class SessionCodec:
+    """
+    Encodes session payloads (messages, JSON list fields) as strings.
+
+    "json" writes the original untagged json.dumps output. "compact" writes
+    COMPACT_TAG + compact UTF-8 JSON (orjson when installed). "compact+zstd" also
+    compresses payloads of at least compress_min_bytes when zstandard is installed.
+    decode() reads every format, whichever codec is configured.
+    """
+
+    def __init__(self, name: str = "json", compress_min_bytes: int = 1024):
+        if name not in SESSION_CODECS:
+            raise ValueError(f"Unknown session codec: {name} (expected one of {', '.join(SESSION_CODECS)})")
+        self.name = name
+        self.compress_min_bytes = compress_min_bytes
+        self._compress = name == "compact+zstd" and zstandard is not None
+
+    def encode(self, value: Any) -> str:
+        if self.name == "json":
+            return json.dumps(value)
+        payload = _compact_dumps(value)
+        if self._compress and len(payload) >= self.compress_min_bytes:
+            compressed = zstandard.ZstdCompressor().compress(payload.encode())
+            return ZSTD_TAG + base64.b85encode(compressed).decode()
+        return COMPACT_TAG + payload
+
+    @staticmethod
+    def decode(raw: str) -> Any:
+        if raw[:1] == COMPACT_TAG:
+            return _loads(raw[1:])
+        if raw[:1] == ZSTD_TAG:
+            if zstandard is None:
+                raise RuntimeError("zstd-compressed session payload found but zstandard is not installed")
+            return _loads(zstandard.ZstdDecompressor().decompress(base64.b85decode(raw[1:])))
+        return _loads(raw)
+
+
+session_codec = SessionCodec(
+    os.getenv("SESSION_CODEC", "json"),
+    compress_min_bytes=int(os.getenv("SESSION_CODEC_COMPRESS_MIN", "1024"))
+)
+
+
+def encode_session_payload(value: Any) -> str:
+    """Session payload in the configured SESSION_CODEC format."""
+    return session_codec.encode(value)
+
+
+def decode_session_payload(raw: str) -> Any:
+    """Value of a session payload in any codec format, including legacy JSON."""
+    return SessionCodec.decode(raw)
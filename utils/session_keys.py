@@ -0,0 +1,92 @@
+import os
+
+# Session data lives for 24 hours (86400 seconds) after the last write
+SESSION_TTL = 86400
+
+# Session message lists keep only the newest SESSION_MAX_MESSAGES entries
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "50"))
+
+# Bulk operations on many contacts send one pipeline (or statement) per chunk of contacts
+SESSION_BULK_CHUNK_SIZE = int(os.getenv("SESSION_BULK_CHUNK_SIZE", "500"))
+
+# "plain" keys embed the contact number as is. "tagged" wraps it in a Redis Cluster
+# hash tag ({contact_number}), so every key of a contact lives in one slot and
+# multi-key pipelines, transactions and Lua scripts work on a sharded Redis.
+# Switching schemes: see `flask migrate-session-keys`.
+SESSION_KEY_SCHEMES = ("plain", "tagged")
+SESSION_KEY_SCHEME = os.getenv("SESSION_KEY_SCHEME", "plain")
+if SESSION_KEY_SCHEME not in SESSION_KEY_SCHEMES:
+    raise ValueError(f"Unknown SESSION_KEY_SCHEME: {SESSION_KEY_SCHEME} (expected one of {', '.join(SESSION_KEY_SCHEMES)})")
+TAGGED_SESSION_KEYS = SESSION_KEY_SCHEME == "tagged"
+
+# While sessions written in the old one-key-per-flag layout can still exist (at most
+# SESSION_TTL after deploying the hash layout), reads also look at the old keys. The
+# old keys are in other slots, so the tagged scheme never reads them; the key
+# migration folds them into the session hash instead.
+LEGACY_SESSION_FALLBACK = os.getenv("SESSION_LEGACY_FALLBACK", "1") == "1" and not TAGGED_SESSION_KEYS
+
+# After the switch to the tagged scheme on standalone Redis, a contact's plain keys
+# (written before the switch, or by workers not switched yet) are moved to its tagged
+# keys whenever the contact's session is used, so sessions do not look empty until
+# `flask migrate-session-keys` has run. This costs a script call per operation; turn
+# it off once the migration is done. Plain and tagged keys hash to different slots,
+# so it never runs on Redis Cluster.
+PLAIN_SESSION_FALLBACK = os.getenv("SESSION_PLAIN_FALLBACK", "1") == "1" and TAGGED_SESSION_KEYS
+
+# Old key of every field that now lives in the per-contact session hash
+LEGACY_FIELD_KEYS = {
+    "employee_identified": "employee:identified:{contact_number}",
+    "employee_id": "employee:id:{contact_number}",
+    "multiple_office_locations": "contact:{contact_number}:multiple_office_locations",
+    "asked_confirmation": "contact:{contact_number}:asked_confirmation",
+    "employee_asked_confirmation": "employee:{contact_number}:asked_confirmation",
+    "employee_asked_user_feedback": "employee:{contact_number}:asked_user_feedback",
+    "update_agent_confirmation": "contact:{contact_number}:update_agent_confirmation",
+    "user_trying_to_add_new_employee": "contact:{contact_number}:user_trying_to_add_new_employee",
+    "asked_user_draft_continuation": "contact:{contact_number}:asked_user_draft_continuation",
+    "correcting_final_confirmation_changes": "contact:{contact_number}:correcting_final_confirmation_changes",
+    "name_extracted": "contact:{contact_number}:name_extracted",
+    "shift_time": "contact:{contact_number}:shift_time",
+}
+
+
+# Key of each per-contact structure; {contact} is the contact number, hash-tagged
+# under the tagged scheme
+SESSION_KEY_FORMATS = {
+    "session": "session:{contact}",
+    "messages": "contact:{contact}:messages",
+    "contact_list": "contact_list:{contact}",
+    "field_confirmation_list": "contact:{contact}:field_confirmation_list",
+}
+
+
+def contact_tag(contact_number, tagged: bool = None) -> str:
+    """The contact number as it appears in keys: {contact_number} under the tagged scheme."""
+    tagged = TAGGED_SESSION_KEYS if tagged is None else tagged
+    return f"{{{contact_number}}}" if tagged else str(contact_number)
+
+
+def contact_from_tag(tag: str) -> str:
+    """Inverse of contact_tag."""
+    return tag[1:-1] if tag.startswith("{") and tag.endswith("}") else tag
+
+
+def session_key(contact_number) -> str:
+    """Hash holding every scalar session field of a contact."""
+    return SESSION_KEY_FORMATS["session"].format(contact=contact_tag(contact_number))
+
+
+def legacy_key(field: str, contact_number) -> str:
+    return LEGACY_FIELD_KEYS[field].format(contact_number=contact_number)
+
+
+def messages_key(contact_number) -> str:
+    return SESSION_KEY_FORMATS["messages"].format(contact=contact_tag(contact_number))
+
+
+def contact_list_key(contact_number) -> str:
+    return SESSION_KEY_FORMATS["contact_list"].format(contact=contact_tag(contact_number))
+
+
+def field_confirmation_key(contact_number) -> str:
+    return SESSION_KEY_FORMATS["field_confirmation_list"].format(contact=contact_tag(contact_number))
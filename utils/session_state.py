@@ -0,0 +1,57 @@
+from typing import Any, Dict, Optional
+from utils.session_codec import encode_session_payload, decode_session_payload
+
+# Fields stored as "1"/"0"; a missing field reads as False
+BOOLEAN_FIELDS = (
+    "employee_identified",
+    "asked_confirmation",
+    "employee_asked_confirmation",
+    "employee_asked_user_feedback",
+    "update_agent_confirmation",
+    "user_trying_to_add_new_employee",
+    "asked_user_draft_continuation",
+    "correcting_final_confirmation_changes",
+    "name_extracted",
+)
+# Fields stored as plain strings; a missing field reads as None
+STRING_FIELDS = ("employee_id", "shift_time")
+# Fields stored as session payloads (utils.session_codec); a missing field reads as an empty list
+JSON_LIST_FIELDS = ("multiple_office_locations",)
+
+SESSION_FIELDS = BOOLEAN_FIELDS + STRING_FIELDS + JSON_LIST_FIELDS
+
+
+def encode_session_field(field: str, value: Any) -> str:
+    """Redis hash value for a session field."""
+    if field in BOOLEAN_FIELDS:
+        return "1" if value else "0"
+    if field in JSON_LIST_FIELDS:
+        return encode_session_payload(value)
+    return str(value)
+
+
+def decode_session_field(field: str, raw: Optional[str]) -> Any:
+    """Typed value of a session field from its Redis hash value (or None when unset)."""
+    if field in BOOLEAN_FIELDS:
+        return raw == "1"
+    if field in JSON_LIST_FIELDS:
+        return decode_session_payload(raw) if raw else []
+    return raw
+
+
+class EmployeeSession:
+    """Typed snapshot of a contact's session hash, read with one HGETALL."""
+
+    __slots__ = ("contact_number",) + SESSION_FIELDS
+
+    def __init__(self, contact_number, raw: Optional[Dict[str, str]] = None):
+        self.contact_number = contact_number
+        raw = raw or {}
+        for field in SESSION_FIELDS:
+            setattr(self, field, decode_session_field(field, raw.get(field)))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in SESSION_FIELDS}
+
+    def __repr__(self):
+        return f"<EmployeeSession(contact_number={self.contact_number!r}, employee_id={self.employee_id!r})>"